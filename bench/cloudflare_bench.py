@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Benchmark the DNS manager's list/create/update/bulk paths against the mock Cloudflare API
+
+    python bench/cloudflare_bench.py --sizes 10 100 1000 10000 --latency 0.01 --output cf_bench.json
+    python bench/cloudflare_bench.py --baseline cf_bench.json --output cf_bench_new.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import metrics
+from bot_config import BotConfig
+from dns_manager import CloudflareDNSManager
+from mock_cloudflare import MockCloudflare
+from structured_log import configure_logging
+
+ZONE = "bench.example"
+
+SEED_IP = "198.51.100.1"
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def _write_config(directory: str, api: MockCloudflare, args) -> str:
+    """モックを向いた設定ファイルを作成（レート制限はベンチマークの妨げにならない値にする）"""
+    path = os.path.join(directory, "bot_config.json")
+    config = {
+        "cloudflare": {
+            "zone_id": "",
+            "api_token": "bench",
+            "domain": ZONE,
+            "zone_cache_file": "zone_cache.json",
+            "base_url": api.base_url,
+            "request_timeout": 30,
+            "record_cache_ttl": 300,
+            "list_per_page": args.per_page,
+            "max_concurrency": args.concurrency,
+            "use_batch_api": True,
+            "batch_size": args.batch_size,
+            "rate_limit": {"requests": 1000000, "window": 1, "burst": 1000},
+            "retry": {"max_retries": args.max_retries, "base_delay": 0.01, "max_delay": 0.1},
+            "circuit_breaker": {"failure_threshold": 1000, "reset_timeout": 1},
+            "ip_timeout": 5,
+            "ip_quorum": 1,
+            "ip_cache_ttl": 3600,
+            "ip_services": [api.ip_url],
+        },
+        "dns": {"target_domains": []},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+    return path
+
+def _measure(api: MockCloudflare, name: str, size: int, func) -> dict:
+    """funcを1回実行し、経過時間とモック側・クライアント側のリクエスト数を記録"""
+    api.reset_stats()
+    metrics.REGISTRY.clear()
+    started = time.perf_counter()
+    ok = func()
+    wall = time.perf_counter() - started
+    stats = dict(api.stats)
+    return {
+        "scenario": name,
+        "size": size,
+        "ok": bool(ok),
+        "wall_seconds": round(wall, 4),
+        "requests": stats.pop("requests"),
+        "client_retries": int(metrics.API_RETRIES.total()),
+        "client_rate_limited": int(metrics.API_RATE_LIMITED.total()),
+        "mock": stats,
+    }
+
+def bench_size(api: MockCloudflare, manager: CloudflareDNSManager, zone_id: str, size: int, ops: int,
+               loop: asyncio.AbstractEventLoop) -> list:
+    """size件のレコードを投入したゾーンで各シナリオを実行"""
+    api.clear_records(zone_id)
+    names = api.seed_records(zone_id, size, content=SEED_IP)
+    zone = manager.zones.default
+    ops = min(ops, size)
+    run = loop.run_until_complete
+
+    def cold(func):
+        # 各シナリオはインデックスを読み直すところから計測する
+        def wrapper():
+            zone.record_index.invalidate()
+            return func()
+        return wrapper
+
+    new_names = [f"bulk{i}.{ZONE}" for i in range(size)]
+    results = [
+        _measure(api, "list", size, lambda: manager.list_records("A")[0]),
+        _measure(api, "load_index", size, lambda: manager.refresh_record_index(force=True)),
+        _measure(api, "create", size, cold(lambda: all(
+            [manager.create_record(f"single{i}.{ZONE}", "192.0.2.1") for i in range(ops)]))),
+        _measure(api, "update", size, cold(lambda: all(
+            [manager.update_record(name, "192.0.2.2") for name in names[:ops]]))),
+        _measure(api, "bulk_create", size, cold(lambda: run(
+            manager.bulk_create_records(new_names, "192.0.2.3"))[0])),
+        _measure(api, "bulk_update", size, cold(lambda: run(
+            manager.bulk_update_records(custom_domains=names))[0])),
+        _measure(api, "bulk_delete", size, cold(lambda: run(
+            manager.bulk_delete_records(new_names))[0])),
+    ]
+    for result in results:
+        print(f"{size:>6} {result['scenario']:<12} {result['wall_seconds']:>8.3f}s "
+              f"{result['requests']:>6} req {'ok' if result['ok'] else 'FAILED'}", file=sys.stderr)
+    return results
+
+def compare(baseline: dict, results: list, tolerance: float, min_delta: float) -> list:
+    """前回の結果と比べ、リクエスト数の増加と経過時間の悪化（tolerance超かつmin_delta秒超）を返す"""
+    previous = {(r["scenario"], r["size"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get((result["scenario"], result["size"]))
+        if before is None:
+            continue
+        if result["requests"] > before["requests"]:
+            regressions.append({"scenario": result["scenario"], "size": result["size"], "metric": "requests",
+                                "baseline": before["requests"], "current": result["requests"]})
+        slower = result["wall_seconds"] - before["wall_seconds"]
+        if slower > before["wall_seconds"] * tolerance and slower > min_delta:
+            regressions.append({"scenario": result["scenario"], "size": result["size"], "metric": "wall_seconds",
+                                "baseline": before["wall_seconds"], "current": result["wall_seconds"]})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="モックのCloudflare APIに対するDNS操作のベンチマーク")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000], help="ゾーンのレコード数")
+    parser.add_argument("--ops", type=int, default=20, help="単発のcreate/updateを繰り返す回数")
+    parser.add_argument("--latency", type=float, default=0.0, help="モックの応答遅延（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="応答遅延の揺らぎ（秒）")
+    parser.add_argument("--max-per-page", type=int, default=5000, help="モックが返す1ページの上限")
+    parser.add_argument("--per-page", type=int, default=100, help="cloudflare.list_per_page")
+    parser.add_argument("--batch-size", type=int, default=200, help="cloudflare.batch_size")
+    parser.add_argument("--concurrency", type=int, default=16, help="cloudflare.max_concurrency")
+    parser.add_argument("--max-retries", type=int, default=3, help="cloudflare.retry.max_retries")
+    parser.add_argument("--throttle-every", type=int, default=0, help="この回数ごとに429を返す（0で無効）")
+    parser.add_argument("--throttle-burst", type=int, default=1, help="続けて429を返す回数")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="5xxを返す確率")
+    parser.add_argument("--no-batch", action="store_true", help="batchエンドポイントを無効にする")
+    parser.add_argument("--seed", type=int, default=0, help="障害注入の乱数シード")
+    parser.add_argument("--baseline", help="比較する前回の結果JSON（悪化があれば終了コード1）")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="経過時間の悪化とみなす割合")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="悪化とみなす経過時間の最小差（秒）")
+    parser.add_argument("--output", help="結果JSONの出力先（省略時は標準出力）")
+    args = parser.parse_args()
+
+    configure_logging(level="WARNING", use_queue=False)
+    api = MockCloudflare(latency=args.latency, jitter=args.jitter, max_per_page=args.max_per_page,
+                         throttle_every=args.throttle_every, throttle_burst=args.throttle_burst,
+                         error_rate=args.error_rate, batch=not args.no_batch, seed=args.seed).start()
+    zone_id = api.add_zone(ZONE)
+    loop = asyncio.new_event_loop()
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="cf-bench-") as directory:
+            manager = CloudflareDNSManager(BotConfig(_write_config(directory, api, args)))
+            # Zone IDの取得は計測に含めない
+            manager.discover_zones()
+            try:
+                for size in args.sizes:
+                    results.extend(bench_size(api, manager, zone_id, size, args.ops, loop))
+            finally:
+                loop.run_until_complete(manager.aclose())
+    finally:
+        loop.close()
+        api.stop()
+
+    params = {key: value for key, value in vars(args).items() if key not in ("baseline", "output")}
+    report = {
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "params": params,
+        "results": results,
+    }
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.tolerance, args.min_delta)
+        report["baseline"] = {"revision": baseline.get("revision"), "regressions": regressions}
+        for item in regressions:
+            print(f"悪化: {item['scenario']} size={item['size']} {item['metric']} "
+                  f"{item['baseline']} -> {item['current']}", file=sys.stderr)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+    if regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
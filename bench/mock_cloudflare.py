@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+In-process mock of the Cloudflare zones and DNS records API with fault injection
+
+Implements the endpoints the bot uses (/zones?name=, /zones/{id}/dns_records
+with paging and filters, single-record GET/POST/PUT/PATCH/DELETE and
+/dns_records/batch) plus /ip for public IP discovery, so the DNS manager
+can be pointed at it with cloudflare.base_url:
+
+    python bench/mock_cloudflare.py --port 8082 --zone example.com --records 1000 --latency 0.02
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+API_PREFIX = "/client/v4"
+
+_RECORDS_PATH = re.compile(r"^/zones/([^/]+)/dns_records(?:/([^/]+))?$")
+
+def _error(code: int, message: str) -> Dict:
+    return {"success": False, "errors": [{"code": code, "message": message}], "messages": [], "result": None}
+
+def _ok(result, result_info: Optional[Dict] = None) -> Dict:
+    body = {"success": True, "errors": [], "messages": [], "result": result}
+    if result_info is not None:
+        body["result_info"] = result_info
+    return body
+
+class MockCloudflare:
+    """Cloudflare DNS APIのモックサーバー
+
+    latency: APIリクエストごとに加える遅延（秒）
+    jitter: 遅延に加える0〜jitter秒の揺らぎ
+    max_per_page: 一覧の1ページの上限（per_pageがこれを超えたら切り詰める）
+    throttle_every / throttle_burst: throttle_every回ごとに続くthrottle_burst回を429にする（0で無効）
+    retry_after: 429のRetry-Afterヘッダー（秒）
+    error_rate: 5xxを返す確率（0〜1）
+    batch: Falseならbatchエンドポイントを404にする（個別リクエストへのフォールバックの計測用）
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 max_per_page: int = 5000, throttle_every: int = 0, throttle_burst: int = 1, retry_after: int = 1,
+                 error_rate: float = 0.0, batch: bool = True, public_ip: str = "203.0.113.10", seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.max_per_page = max_per_page
+        self.throttle_every = throttle_every
+        self.throttle_burst = throttle_burst
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.batch = batch
+        self.public_ip = public_ip
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._zones: Dict[str, str] = {}
+        self._records: Dict[str, Dict[str, Dict]] = {}
+        self._api_requests = 0
+        self.stats: Dict[str, int] = {}
+        self.reset_stats()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    @property
+    def ip_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/ip"
+
+    def start(self) -> "MockCloudflare":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-cloudflare", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_stats(self):
+        """計測区間ごとのリクエスト数をリセット（障害注入の周期もリセットする）"""
+        with self._lock:
+            self._api_requests = 0
+            self.stats = {"requests": 0, "list": 0, "read": 0, "create": 0, "update": 0, "delete": 0,
+                          "batch": 0, "batch_operations": 0, "zones": 0, "throttled": 0, "errors": 0}
+
+    def add_zone(self, domain: str, zone_id: Optional[str] = None) -> str:
+        zone_id = zone_id or uuid.uuid4().hex
+        with self._lock:
+            self._zones[domain] = zone_id
+            self._records.setdefault(zone_id, {})
+        return zone_id
+
+    def seed_records(self, zone_id: str, count: int, prefix: str = "host", content: str = "198.51.100.1",
+                     record_type: str = "A") -> List[str]:
+        """レコードを直接投入し、作成した完全名を返す"""
+        domain = next(name for name, zid in self._zones.items() if zid == zone_id)
+        names = [f"{prefix}{i}.{domain}" for i in range(count)]
+        with self._lock:
+            records = self._records[zone_id]
+            for name in names:
+                record_id = uuid.uuid4().hex
+                records[record_id] = self._new_record(record_id, zone_id, {"type": record_type, "name": name,
+                                                                            "content": content, "ttl": 60})
+        return names
+
+    def clear_records(self, zone_id: str):
+        with self._lock:
+            self._records[zone_id] = {}
+
+    def records(self, zone_id: str) -> List[Dict]:
+        with self._lock:
+            return [dict(record) for record in self._records.get(zone_id, {}).values()]
+
+    @staticmethod
+    def _new_record(record_id: str, zone_id: str, data: Dict) -> Dict:
+        now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        return {
+            "id": record_id, "zone_id": zone_id,
+            "type": data.get("type", "A"), "name": data.get("name", ""), "content": data.get("content", ""),
+            "ttl": data.get("ttl", 1), "proxied": bool(data.get("proxied", False)),
+            "created_on": now, "modified_on": now,
+        }
+
+    def _inject_fault(self) -> Optional[Tuple[int, Dict, Dict[str, str]]]:
+        """429・5xxを返す場合は (ステータス, 本文, ヘッダー)"""
+        with self._lock:
+            self._api_requests += 1
+            # throttle_every回通した後にthrottle_burst回だけ429を返す周期
+            if self.throttle_every and (self._api_requests - 1) % (self.throttle_every + self.throttle_burst) >= self.throttle_every:
+                self.stats["throttled"] += 1
+                return 429, _error(10000, "Rate limited"), {"Retry-After": str(self.retry_after)}
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.stats["errors"] += 1
+                status = self._random.choice((500, 502, 503))
+                return status, _error(status, "Injected server error"), {}
+        return None
+
+    @staticmethod
+    def _matches(record: Dict, query: Dict[str, str]) -> bool:
+        checks = []
+        if "type" in query:
+            checks.append(record["type"] == query["type"])
+        if "name" in query:
+            checks.append(record["name"] == query["name"])
+        if "name.contains" in query:
+            checks.append(query["name.contains"] in record["name"])
+        if "content" in query:
+            checks.append(record["content"] == query["content"])
+        if "proxied" in query:
+            checks.append(record["proxied"] == (query["proxied"] == "true"))
+        if not checks:
+            return True
+        # typeはmatch=anyでも常に絞り込む（Cloudflareと同じ）
+        if query.get("match") == "any":
+            type_ok = "type" not in query or record["type"] == query["type"]
+            return type_ok and any(checks)
+        return all(checks)
+
+    def _list(self, zone_id: str, query: Dict[str, str]) -> Tuple[int, Dict]:
+        per_page = max(1, min(int(query.get("per_page", 100)), self.max_per_page))
+        page = max(1, int(query.get("page", 1)))
+        with self._lock:
+            self.stats["list"] += 1
+            matched = [dict(r) for r in self._records[zone_id].values() if self._matches(r, query)]
+        total_pages = max(1, (len(matched) + per_page - 1) // per_page)
+        result = matched[(page - 1) * per_page:page * per_page]
+        return 200, _ok(result, {"page": page, "per_page": per_page, "count": len(result),
+                                 "total_count": len(matched), "total_pages": total_pages})
+
+    def _batch(self, zone_id: str, body: Dict) -> Tuple[int, Dict]:
+        """batchは1トランザクション（存在しないIDが1つでもあれば何も変更しない）"""
+        with self._lock:
+            self.stats["batch"] += 1
+            records = self._records[zone_id]
+            for key in ("deletes", "patches", "puts"):
+                for op in body.get(key) or []:
+                    if op.get("id") not in records:
+                        return 400, _error(81044, f"Record not found: {op.get('id')}")
+
+            result: Dict[str, List[Dict]] = {"deletes": [], "patches": [], "puts": [], "posts": []}
+            for op in body.get("deletes") or []:
+                result["deletes"].append(records.pop(op["id"]))
+            for key in ("patches", "puts"):
+                for op in body.get(key) or []:
+                    record = records[op["id"]]
+                    changes = {k: v for k, v in op.items() if k != "id"}
+                    if key == "puts":
+                        record.update(self._new_record(op["id"], zone_id, changes), created_on=record["created_on"])
+                    else:
+                        record.update(changes)
+                    result[key].append(dict(record))
+            for op in body.get("posts") or []:
+                record_id = uuid.uuid4().hex
+                records[record_id] = self._new_record(record_id, zone_id, op)
+                result["posts"].append(dict(records[record_id]))
+            self.stats["batch_operations"] += sum(len(ops) for ops in result.values())
+        return 200, _ok(result)
+
+    def _single(self, method: str, zone_id: str, record_id: str, body: Dict) -> Tuple[int, Dict]:
+        with self._lock:
+            records = self._records[zone_id]
+            if record_id not in records:
+                return 404, _error(81044, "Record not found")
+            if method == "GET":
+                self.stats["read"] += 1
+                return 200, _ok(dict(records[record_id]))
+            if method == "DELETE":
+                self.stats["delete"] += 1
+                records.pop(record_id)
+                return 200, _ok({"id": record_id})
+            self.stats["update"] += 1
+            record = records[record_id]
+            if method == "PUT":
+                record.update(self._new_record(record_id, zone_id, body), created_on=record["created_on"])
+            else:
+                record.update({k: v for k, v in body.items() if k != "id"})
+            return 200, _ok(dict(record))
+
+    def handle(self, method: str, path: str, query: Dict[str, str], body: Dict) -> Tuple[int, Dict, Dict[str, str]]:
+        """APIリクエストを処理して (ステータス, 本文, ヘッダー) を返す"""
+        fault = self._inject_fault()
+        if fault is not None:
+            return fault
+
+        if path == "/zones" and method == "GET":
+            with self._lock:
+                self.stats["zones"] += 1
+                zone_id = self._zones.get(query.get("name", ""))
+            result = [{"id": zone_id, "name": query["name"], "status": "active"}] if zone_id else []
+            return 200, _ok(result, {"page": 1, "total_pages": 1, "count": len(result), "total_count": len(result)}), {}
+
+        match = _RECORDS_PATH.match(path)
+        if match is None or match.group(1) not in self._records:
+            return 404, _error(7003, "Could not route to " + path), {}
+        zone_id, record_id = match.groups()
+
+        if record_id == "batch":
+            if not self.batch:
+                return 404, _error(7000, "No route for that URI"), {}
+            if method != "POST":
+                return 405, _error(10000, "Method not allowed"), {}
+            status, response = self._batch(zone_id, body)
+            return status, response, {}
+        if record_id is None:
+            if method == "GET":
+                status, response = self._list(zone_id, query)
+                return status, response, {}
+            if method == "POST":
+                record_id = uuid.uuid4().hex
+                with self._lock:
+                    self.stats["create"] += 1
+                    self._records[zone_id][record_id] = self._new_record(record_id, zone_id, body)
+                    record = dict(self._records[zone_id][record_id])
+                return 200, _ok(record), {}
+            return 405, _error(10000, "Method not allowed"), {}
+        status, response = self._single(method, zone_id, record_id, body)
+        return status, response, {}
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # ヘッダーと本文を別々に書き込むため、Nagleによる遅延で計測が歪まないようにする
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body, headers: Optional[Dict[str, str]] = None,
+                      content_type: str = "application/json"):
+                payload = (body if isinstance(body, str) else json.dumps(body)).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _dispatch(self, method: str):
+                length = int(self.headers.get("Content-Length", "0") or 0)
+                raw = self.rfile.read(length) if length else b""
+                url = urlsplit(self.path)
+
+                if url.path == "/ip":
+                    self._send(200, api.public_ip + "\n", content_type="text/plain")
+                    return
+                if url.path == "/__stats":
+                    with api._lock:
+                        self._send(200, dict(api.stats))
+                    return
+                if not url.path.startswith(API_PREFIX):
+                    self._send(404, _error(7003, "Unknown path"))
+                    return
+
+                with api._lock:
+                    api.stats["requests"] += 1
+                if api.latency or api.jitter:
+                    time.sleep(api.latency + api._random.random() * api.jitter)
+
+                try:
+                    body = json.loads(raw) if raw else {}
+                except ValueError:
+                    self._send(400, _error(6007, "Malformed JSON in request body"))
+                    return
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                status, response, headers = api.handle(method, url.path[len(API_PREFIX):] or "/", query, body)
+                self._send(status, response, headers)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_PUT(self):
+                self._dispatch("PUT")
+
+            def do_PATCH(self):
+                self._dispatch("PATCH")
+
+            def do_DELETE(self):
+                self._dispatch("DELETE")
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Cloudflare DNS APIのモックサーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--zone", default="example.com", help="作成するゾーン")
+    parser.add_argument("--zone-id", default="0123456789abcdef0123456789abcdef")
+    parser.add_argument("--records", type=int, default=0, help="投入するAレコード数")
+    parser.add_argument("--latency", type=float, default=0.0, help="リクエストごとの遅延（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="遅延の揺らぎ（秒）")
+    parser.add_argument("--max-per-page", type=int, default=5000)
+    parser.add_argument("--throttle-every", type=int, default=0, help="この回数ごとに429を返す（0で無効）")
+    parser.add_argument("--throttle-burst", type=int, default=1, help="続けて429を返す回数")
+    parser.add_argument("--retry-after", type=int, default=1, help="429のRetry-After（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="5xxを返す確率")
+    parser.add_argument("--no-batch", action="store_true", help="batchエンドポイントを無効にする")
+    args = parser.parse_args()
+
+    api = MockCloudflare(args.host, args.port, args.latency, args.jitter, args.max_per_page, args.throttle_every,
+                         args.throttle_burst, args.retry_after, args.error_rate, not args.no_batch)
+    zone_id = api.add_zone(args.zone, args.zone_id)
+    api.seed_records(zone_id, args.records)
+    print(f"Mock Cloudflare API listening on {api.base_url} (zone {args.zone}: {zone_id})")
+    try:
+        api.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
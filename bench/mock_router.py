@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Local mock of the router admin UI for offline testing and benchmarks
+
+Serves the same element IDs the automation relies on (Frm_Username,
+Frm_Password, LoginId, mainNavigator, mgrAndDiag, Btn_restart,
+confirmLayer, confirmOK) so both the Selenium and the HTTP driver can be
+pointed at it:
+
+    python bench/mock_router.py --port 8081 --password secret
+    ROUTER_IP=127.0.0.1:8081 ROUTER_PASS=secret DEBUG=false python src/router_automation.py
+"""
+
+import argparse
+import json
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+ADMIN_PATH = "/getpage.gch?pid=1002&nextpage=manager_dev_conf_t.gch"
+
+_HEAD = """<html><head><meta charset="utf-8"><title>Mock Router</title>
+<script>function getObj(id) { return document.getElementById(id); }</script></head><body>"""
+
+LOGIN_PAGE = _HEAD + """
+<form id="fLogin" name="fLogin" method="post" action="/">
+<input type="hidden" name="action" value="login">
+<input type="hidden" id="Frm_Logintoken" name="Frm_Logintoken" value="">
+<input type="text" id="Frm_Username" name="Username" value="">
+<input type="password" id="Frm_Password" name="Password" value="">
+<input type="submit" id="LoginId" value="ログイン">
+</form>
+<script>getObj("Frm_Logintoken").value = "{token}";</script>
+</body></html>"""
+
+NAVIGATOR = """
+<div id="mainNavigator"><div id="mn_li">
+<a id="mgrAndDiag" menupage="manager_dev_conf_t.gch" href="#"
+   onclick="location.href='/getpage.gch?pid=1002&nextpage=' + this.getAttribute('menupage'); return false;">管理&amp;診断</a>
+</div></div>"""
+
+MAIN_PAGE = _HEAD + NAVIGATOR + "\n<p>status: online</p>\n</body></html>"
+
+ADMIN_PAGE = _HEAD + NAVIGATOR + """
+<form id="fSubmit" method="post" action="{action}">
+<input type="hidden" id="IF_ACTION" name="IF_ACTION" value="">
+<input type="hidden" id="_SESSION_TOKEN" name="_SESSION_TOKEN" value="">
+<input type="button" id="Btn_restart" class="Button" value="再起動" onclick="getObj('confirmLayer').style.display = 'block';">
+</form>
+<div id="confirmLayer" style="display: none">
+<p>再起動しますか？</p>
+<input type="button" id="confirmOK" value="OK" onclick="getObj('IF_ACTION').value = 'devrestart'; getObj('fSubmit').submit();">
+</div>
+<script>var _SESSION_TOKEN = "{token}"; getObj("_SESSION_TOKEN").value = _SESSION_TOKEN;</script>
+</body></html>""".replace("{action}", ADMIN_PATH.replace("&", "&amp;"))
+
+REBOOTING_PAGE = _HEAD + "\n<p>再起動中です...</p>\n</body></html>"
+
+class MockRouter:
+    """ルーター管理画面のモックサーバー
+
+    latency: 全リクエストに加える遅延（秒）
+    reboot_downtime: リブート後に接続を拒否する秒数
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, username: str = "admin",
+                 password: str = "password", latency: float = 0.0, reboot_downtime: float = 0.0):
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.reboot_downtime = reboot_downtime
+        self._lock = threading.Lock()
+        self._login_tokens: set = set()
+        self._sessions: Dict[str, str] = {}
+        self._down_until = 0.0
+        self.stats: Dict[str, int] = {"requests": 0, "logins": 0, "failed_logins": 0, "reboots": 0, "rejected": 0}
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def start(self) -> "MockRouter":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-router", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def is_down(self) -> bool:
+        return time.monotonic() < self._down_until
+
+    def _handler_class(self):
+        router = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _session_token(self) -> Optional[str]:
+                for part in self.headers.get("Cookie", "").split(";"):
+                    key, _, value = part.strip().partition("=")
+                    if key == "SID":
+                        with router._lock:
+                            return router._sessions.get(value)
+                return None
+
+            def _send(self, status: int, body: str = "", headers: Optional[Dict[str, str]] = None,
+                      content_type: str = "text/html; charset=utf-8"):
+                payload = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _redirect(self, location: str, headers: Optional[Dict[str, str]] = None):
+                self._send(302, "", dict(headers or {}, Location=location))
+
+            def _begin(self) -> bool:
+                """共通処理（遅延・リブート中の拒否）。処理を続ける場合True"""
+                with router._lock:
+                    router.stats["requests"] += 1
+                if router.latency:
+                    time.sleep(router.latency)
+                if router.is_down():
+                    with router._lock:
+                        router.stats["rejected"] += 1
+                    self.close_connection = True
+                    self._send(503, "rebooting")
+                    return False
+                return True
+
+            def _login_page(self):
+                token = secrets.token_hex(4)
+                with router._lock:
+                    router._login_tokens.add(token)
+                self._send(200, LOGIN_PAGE.replace("{token}", token))
+
+            def do_GET(self):
+                if not self._begin():
+                    return
+                path = self.path
+                if path == "/__stats":
+                    with router._lock:
+                        body = json.dumps(router.stats)
+                    self._send(200, body, content_type="application/json")
+                    return
+
+                token = self._session_token()
+                if token is None:
+                    if urlsplit(path).path == "/":
+                        self._login_page()
+                    else:
+                        self._redirect("/")
+                    return
+
+                if urlsplit(path).path in ("/", "/start.ghtml"):
+                    self._send(200, MAIN_PAGE)
+                elif path == ADMIN_PATH:
+                    self._send(200, ADMIN_PAGE.replace("{token}", token))
+                else:
+                    self._send(404, "not found")
+
+            def do_POST(self):
+                if not self._begin():
+                    return
+                length = int(self.headers.get("Content-Length", "0"))
+                form = {key: values[-1] for key, values in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+
+                if urlsplit(self.path).path == "/" and form.get("action") == "login":
+                    with router._lock:
+                        token_ok = form.get("Frm_Logintoken") in router._login_tokens
+                        router._login_tokens.discard(form.get("Frm_Logintoken"))
+                    if token_ok and form.get("Username") == router.username and form.get("Password") == router.password:
+                        sid = secrets.token_hex(16)
+                        with router._lock:
+                            router._sessions[sid] = secrets.token_hex(8)
+                            router.stats["logins"] += 1
+                        self._redirect("/start.ghtml", {"Set-Cookie": f"SID={sid}; Path=/; HttpOnly"})
+                    else:
+                        with router._lock:
+                            router.stats["failed_logins"] += 1
+                        self._login_page()
+                    return
+
+                token = self._session_token()
+                if self.path == ADMIN_PATH and token is not None:
+                    if form.get("_SESSION_TOKEN") != token or form.get("IF_ACTION") != "devrestart":
+                        self._send(403, "invalid session token")
+                        return
+                    self._send(200, REBOOTING_PAGE)
+                    with router._lock:
+                        router.stats["reboots"] += 1
+                        # リブートでセッションは全て失効する
+                        router._sessions.clear()
+                        router._down_until = time.monotonic() + router.reboot_downtime
+                    return
+
+                self._redirect("/")
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="ルーター管理画面のモックサーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--latency", type=float, default=0.0, help="リクエストごとの遅延（秒）")
+    parser.add_argument("--reboot-downtime", type=float, default=0.0, help="リブート後に応答しない秒数")
+    args = parser.parse_args()
+
+    router = MockRouter(args.host, args.port, args.username, args.password, args.latency, args.reboot_downtime)
+    print(f"Mock router listening on http://{router.address}")
+    try:
+        router.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
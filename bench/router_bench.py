@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Selenium and HTTP router drivers against the mock router
+
+    python bench/router_bench.py --runs 5 --drivers http selenium --output router_bench.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# router_automationは読み込み時にROUTER_OUTPUT_DIRを参照する
+os.environ.setdefault("ROUTER_OUTPUT_DIR", tempfile.mkdtemp(prefix="router-bench-"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import psutil
+
+import router_automation
+from mock_router import MockRouter
+from router_http import create_router_driver
+
+def _rss_mb() -> float:
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+def bench_driver(kind: str, router: MockRouter, runs: int, driver_path: str) -> dict:
+    """1種類のドライバーでruns回リブートを実行して計測"""
+    driver = create_router_driver(kind, router.address, router.username, router.password,
+                                  selenium_config={"driver_path": driver_path})
+    started = time.perf_counter()
+    driver.warm()
+    warm_up = time.perf_counter() - started
+
+    durations, peak_memory, failures = [], 0.0, 0
+    try:
+        for _ in range(runs):
+            lines = []
+            started = time.perf_counter()
+            if not driver.run_reboot(False, lines.append):
+                failures += 1
+                print("\n".join(lines), file=sys.stderr)
+            durations.append(time.perf_counter() - started)
+
+            _, browser_memory, _ = driver.status()
+            peak_memory = max(peak_memory, browser_memory + _rss_mb())
+    finally:
+        driver.close()
+
+    with open(os.path.join(router_automation.OUTPUT_DIR, "router_trace.json"), encoding="utf-8") as f:
+        last_trace = json.load(f)
+
+    return {
+        "driver": kind,
+        "runs": runs,
+        "failures": failures,
+        "warm_up_seconds": round(warm_up, 3),
+        "mean_seconds": round(statistics.mean(durations), 3),
+        "p50_seconds": round(statistics.median(durations), 3),
+        "max_seconds": round(max(durations), 3),
+        "peak_memory_mb": round(peak_memory, 1),
+        "last_trace": last_trace["steps"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="ルーター操作ドライバーのベンチマーク")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--drivers", nargs="+", choices=["http", "selenium"], default=["http"])
+    parser.add_argument("--latency", type=float, default=0.0, help="モックルーターの応答遅延（秒）")
+    parser.add_argument("--driver-path", default=router_automation.CHROMEDRIVER_PATH)
+    parser.add_argument("--output", help="結果JSONの出力先（省略時は標準出力）")
+    args = parser.parse_args()
+
+    router = MockRouter(latency=args.latency).start()
+    try:
+        results = [bench_driver(kind, router, args.runs, args.driver_path) for kind in args.drivers]
+    finally:
+        router.stop()
+
+    report = {"latency": args.latency, "router_stats": router.stats, "results": results}
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,539 @@
+#!/usr/bin/env python3
+"""
+Asyncio Cloudflare API client for Cloudflare DNS Manager
+"""
+
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlencode
+
+import httpx
+
+from bot_config import Config
+from metrics import API_RATE_LIMITED, API_REQUEST_SECONDS, API_REQUESTS, API_RETRIES, DNS_CHANGE_SECONDS, endpoint_label
+from rate_limiter import get_rate_limiter, parse_retry_after
+from record_index import ZoneRecordIndex, INDEX_PAGE_SIZE
+from retry import RetryPolicy, get_circuit_breaker
+from tracing import span
+from utils import log, validate_ipv4, CloudflareAPIError
+from zones import Zone, ZoneRegistry
+
+# batchエンドポイントが404/405を返した後、再び試すまでの秒数（一時的な障害で無効のままにしない）
+BATCH_RETRY_INTERVAL = 300
+
+# h2がインストールされていればHTTP/2を使用
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+class AsyncCloudflareClient:
+    """イベントループ上で動作するCloudflare APIクライアント
+
+    keep-alive接続プールを持つhttpx.AsyncClientを遅延生成し、
+    CloudflareDNSManagerとゾーン（レコードインデックス）を共有する。
+    レコード名は担当ゾーンに振り分け、全ゾーンの並列リクエストは
+    同じレート制限と同時実行数の上限を共有する。
+    """
+
+    def __init__(self, config: Config, zones: Optional[ZoneRegistry] = None):
+        self.config = config
+        self.zones = zones if zones is not None else ZoneRegistry(config.zones, config.zone_cache_path, config.record_cache_ttl)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._index_load_locks: Dict[str, asyncio.Lock] = {}
+        self._zone_discovery_locks: Dict[str, asyncio.Lock] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.rate_limiter = get_rate_limiter(*config.rate_limit)
+        self.retry_policy = RetryPolicy(*config.retry_settings)
+        # batchエンドポイントが使えなかった場合、この時刻（time.monotonic()）まで個別リクエストで処理する
+        self._batch_disabled_until = 0.0
+
+    @property
+    def batch_available(self) -> bool:
+        """batchエンドポイントを使うか（設定で有効かつ、直近に利用不可と判定されていない）"""
+        return self.config.use_batch_api and time.monotonic() >= self._batch_disabled_until
+
+    @property
+    def record_index(self) -> ZoneRecordIndex:
+        """既定ゾーンのレコードインデックス"""
+        return self.zones.default.record_index
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """全ゾーンで共有する同時リクエスト数の上限"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.config.max_concurrency)
+        return self._semaphore
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """接続プール付きHTTPクライアントを取得（初回のみ生成）"""
+        if self._client is None or self._client.is_closed:
+            max_connections = self.config.max_concurrency
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=self.config.request_timeout,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections
+                )
+            )
+        return self._client
+
+    async def aclose(self):
+        """接続プールを閉じる"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    async def request(self, method: str, endpoint: str, data: Optional[Dict] = None) -> Tuple[bool, Dict]:
+        """
+        Cloudflare APIへの非同期リクエスト実行（make_requestと同じ振る舞い）
+
+        Args:
+            method: HTTPメソッド (GET, POST, PUT, PATCH, DELETE)
+            endpoint: base_urlからの相対パス
+            data: リクエストデータ
+
+        Returns:
+            Tuple[成功フラグ, レスポンスデータ]
+        """
+        method = method.upper()
+        if method not in ("GET", "POST", "PUT", "PATCH", "DELETE"):
+            return False, {"error": f"Unsupported method: {method}"}
+
+        url = f"{self.config.base_url}{endpoint}"
+        client = self._get_client()
+        policy = self.retry_policy
+        breaker = get_circuit_breaker(url)
+        label = endpoint_label(url)
+
+        for attempt in range(policy.max_retries + 1):
+            # 障害中のホストには送らずに即座に失敗させる
+            if not breaker.allow():
+                return False, {"error": f"Circuit open for {breaker.name}", "circuit_open": True}
+
+            try:
+                with span("ratelimit.wait"):
+                    await self.rate_limiter.acquire_async()
+                started = time.perf_counter()
+                try:
+                    with span("cloudflare.request", method=method, endpoint=label):
+                        response = await client.request(
+                            method, url,
+                            headers=self.config.get_headers(),
+                            json=data if method in ("POST", "PUT", "PATCH") else None
+                        )
+                finally:
+                    API_REQUEST_SECONDS.observe(time.perf_counter() - started, method=method, endpoint=label)
+                API_REQUESTS.inc(method=method, endpoint=label, status=response.status_code)
+
+                if response.status_code == 429:
+                    API_RATE_LIMITED.inc(method=method, endpoint=label)
+                    breaker.record_success()
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    if attempt < policy.max_retries:
+                        breaker.record_retry()
+                        API_RETRIES.inc(method=method, endpoint=label, reason="rate_limited")
+                        # 次のacquire_asyncで全呼び出し元が待機する
+                        self.rate_limiter.pause(retry_after)
+                        continue
+                    return False, {"error": "Rate limited (HTTP 429)", "status_code": 429, "retry_after": retry_after}
+
+                if response.status_code >= 400:
+                    status_code = response.status_code
+                    if policy.is_retryable_status(status_code):
+                        breaker.record_failure(f"HTTP {status_code}")
+                        if attempt < policy.max_retries:
+                            breaker.record_retry()
+                            API_RETRIES.inc(method=method, endpoint=label, reason="status")
+                            with span("cloudflare.backoff"):
+                                wait_time = await policy.sleep_async(attempt)
+                            log(f"リクエスト失敗 (試行 {attempt + 1}/{policy.max_retries + 1}): HTTP {status_code}, {wait_time:.1f}秒後にリトライ", "WARNING")
+                            continue
+                    else:
+                        # 4xxはリクエスト側の問題なのでリトライしない
+                        breaker.record_success()
+                    try:
+                        result = response.json()
+                    except ValueError:
+                        result = {}
+                    result.setdefault("error", f"HTTP {status_code}: {result.get('errors') or response.reason_phrase}")
+                    result["status_code"] = status_code
+                    return False, result
+
+                breaker.record_success()
+                result = response.json()
+
+                return bool(result.get("success", False)), result
+
+            except json.JSONDecodeError as e:
+                return False, {"error": f"JSON decode error: {str(e)}"}
+            except httpx.HTTPError as e:
+                API_REQUESTS.inc(method=method, endpoint=label, status="error")
+                breaker.record_failure(str(e) or type(e).__name__)
+                if attempt < policy.max_retries:
+                    breaker.record_retry()
+                    API_RETRIES.inc(method=method, endpoint=label, reason="network")
+                    with span("cloudflare.backoff"):
+                        wait_time = await policy.sleep_async(attempt)
+                    log(f"リクエスト失敗 (試行 {attempt + 1}/{policy.max_retries + 1}): {str(e)}, {wait_time:.1f}秒後にリトライ", "WARNING")
+                    continue
+                return False, {"error": str(e) or type(e).__name__}
+            except BaseException:
+                # キャンセル・想定外の例外ではhalf_openの試行枠を解放してから伝える
+                breaker.release()
+                raise
+
+    def _full_name(self, name: str) -> str:
+        return self.zones.full_name(name)
+
+    async def ensure_zone(self, zone: Zone) -> bool:
+        """Zone IDが未設定なら /zones?name= で取得"""
+        if zone.zone_id:
+            return True
+
+        # 同じゾーンへの並列呼び出しでは1回だけ問い合わせ、他は結果を待つ
+        lock = self._zone_discovery_locks.setdefault(zone.domain, asyncio.Lock())
+        async with lock:
+            if zone.zone_id:
+                return True
+            success, response = await self.request("GET", self.zones.discovery_endpoint(zone))
+            return self.zones.record_discovery(zone, success, response)
+
+    async def iter_record_pages(self, record_type: Optional[str] = None, name: Optional[str] = None,
+                                name_contains: Optional[str] = None, content: Optional[str] = None,
+                                proxied: Optional[bool] = None, match: str = "all",
+                                per_page: Optional[int] = None, zone: Optional[Zone] = None) -> AsyncIterator[Tuple[List[Dict], Dict]]:
+        """DNSレコードをページ単位で取得する非同期ジェネレータ
+
+        zoneを省略した場合、nameがあればその担当ゾーン、なければ全ゾーンを順に取得する。
+        result_infoには取得元のゾーン（zone）を追加する。
+
+        Raises:
+            CloudflareAPIError: ページの取得に失敗した場合
+        """
+        params = {"per_page": per_page or self.config.list_per_page, "match": match}
+        if record_type:
+            params["type"] = record_type
+        if name:
+            zone, params["name"] = self.zones.route(name)
+        if name_contains:
+            params["name.contains"] = name_contains
+        if content:
+            params["content"] = content
+        if proxied is not None:
+            params["proxied"] = "true" if proxied else "false"
+
+        for target in [zone] if zone is not None else list(self.zones):
+            if not await self.ensure_zone(target):
+                raise CloudflareAPIError(f"Zone IDを取得できません: {target.domain}")
+
+            page = 1
+            while True:
+                params["page"] = page
+                endpoint = f"{target.dns_records_path}?{urlencode(params)}"
+                success, response = await self.request("GET", endpoint)
+
+                if not success:
+                    raise CloudflareAPIError(response.get('error') or response.get('errors') or 'Unknown error')
+
+                result_info = dict(response.get('result_info', {}), zone=target.domain)
+                yield response.get('result', []), result_info
+
+                if page >= result_info.get('total_pages', 1):
+                    break
+                page += 1
+
+    async def iter_records(self, *args, **kwargs) -> AsyncIterator[Dict]:
+        """DNSレコードを1件ずつ返す非同期ジェネレータ"""
+        async for records, _ in self.iter_record_pages(*args, **kwargs):
+            for record in records:
+                yield record
+
+    async def list_records(self, record_type: Optional[str] = None, name_filter: Optional[str] = None) -> Tuple[bool, List[Dict]]:
+        """DNSレコードの一覧を取得"""
+        try:
+            records = [r async for r in self.iter_records(record_type, name_contains=name_filter)]
+        except CloudflareAPIError as e:
+            log(f"DNSレコード取得に失敗: {e}", "ERROR")
+            return False, []
+        return True, records
+
+    async def refresh_record_index(self, force: bool = True, zone: Optional[Zone] = None) -> bool:
+        """レコードインデックスを再読み込み（force=FalseならTTL切れの場合のみ、zone省略時は全ゾーンを並列に）"""
+        if zone is None:
+            results = await asyncio.gather(*(self.refresh_record_index(force, z) for z in self.zones))
+            return all(results)
+
+        if not force and not zone.record_index.is_stale():
+            return True
+
+        lock = self._index_load_locks.setdefault(zone.domain, asyncio.Lock())
+        async with lock:
+            if not force and not zone.record_index.is_stale():
+                return True
+
+            log(f"ゾーンのレコードインデックスを読み込み中: {zone.domain}")
+            try:
+                records = [r async for r in self.iter_records(per_page=INDEX_PAGE_SIZE, zone=zone)]
+            except CloudflareAPIError as e:
+                log(f"DNSレコード取得に失敗: {zone.domain}: {e}", "ERROR")
+                return False
+
+            zone.record_index.replace(records)
+            log(f"レコードインデックスを読み込みました: {zone.domain} {len(records)}件")
+            return True
+
+    async def _find_records(self, zone: Zone, full_name: str, record_type: Optional[str] = None) -> Tuple[bool, List[Dict]]:
+        """レコードインデックスから対象レコードを検索"""
+        if not await self.refresh_record_index(force=False, zone=zone):
+            return False, []
+        return True, zone.record_index.lookup(full_name, record_type)
+
+    async def create_record(self, name: str, content: str, record_type: str = "A",
+                            ttl: int = 60, proxied: bool = False) -> bool:
+        """新しいDNSレコードを作成"""
+        zone, full_name = self.zones.route(name)
+
+        if record_type == "A" and not validate_ipv4(content):
+            log(f"無効なIPv4アドレス: {content}", "ERROR")
+            return False
+
+        success, existing = await self._find_records(zone, full_name)
+        if success and existing:
+            log(f"警告: レコード '{full_name}' は既に存在します", "WARNING")
+
+        data = {
+            "type": record_type,
+            "name": full_name,
+            "content": content,
+            "ttl": ttl,
+            "proxied": proxied
+        }
+
+        log(f"DNSレコードを作成中: {record_type} {full_name} {content}")
+        if not await self.ensure_zone(zone):
+            return False
+        success, response = await self.request("POST", zone.dns_records_path, data)
+
+        if success:
+            zone.record_index.upsert(response['result'])
+            log(f"✅ DNSレコードの作成が完了しました: {full_name}")
+            return True
+
+        log(f"DNSレコード作成に失敗: {response}", "ERROR")
+        return False
+
+    async def update_record(self, name: str, content: str, record_type: Optional[str] = None, batch_mode: bool = False) -> bool:
+        """既存のDNSレコードのIPアドレスを更新"""
+        zone, full_name = self.zones.route(name)
+        record_type = record_type or "A"
+
+        success, records = await self._find_records(zone, full_name, record_type)
+        if not success:
+            log("レコード検索に失敗しました", "ERROR")
+            return False
+
+        if not records:
+            if batch_mode:
+                log(f"レコードが見つかりません: {full_name} (スキップ)", "WARNING")
+            else:
+                log(f"レコードが見つかりません: {full_name}", "ERROR")
+            return False
+
+        if len(records) > 1:
+            log(f"複数のレコードが見つかりました。最初のレコードを更新します", "WARNING")
+        target_record = records[0]
+
+        if record_type == "A" and not validate_ipv4(content):
+            log(f"無効なIPv4アドレス: {content}", "ERROR")
+            return False
+
+        new_data = {
+            "type": target_record['type'],
+            "name": target_record['name'],
+            "content": content,
+            "ttl": target_record['ttl'],
+            "proxied": target_record['proxied']
+        }
+
+        if target_record['content'] == content:
+            log(f"変更なし: {full_name} は既に {content} です")
+            return True
+
+        if not batch_mode:
+            log(f"更新内容: {target_record['content']} -> {content}")
+
+        record_id = target_record['id']
+        with DNS_CHANGE_SECONDS.time(domain=full_name, operation="puts") as labels:
+            success, response = await self.request("PUT", f"{zone.dns_records_path}/{record_id}", new_data)
+            labels["result"] = "ok" if success else "failed"
+
+        if success:
+            zone.record_index.upsert(response['result'])
+            log(f"✅ DNSレコードのIPアドレス更新が完了しました: {full_name} {target_record['content']} -> {content}")
+            return True
+
+        zone.record_index.invalidate()
+        log(f"DNSレコード更新に失敗: {response}", "ERROR")
+        return False
+
+    async def delete_record(self, name: str, record_type: Optional[str] = None) -> bool:
+        """DNSレコードを削除"""
+        zone, full_name = self.zones.route(name)
+
+        success, records = await self._find_records(zone, full_name, record_type)
+        if not success:
+            log("レコード検索に失敗しました", "ERROR")
+            return False
+
+        if not records:
+            log(f"レコードが見つかりません: {full_name}", "ERROR")
+            return False
+
+        if len(records) > 1:
+            log(f"複数のレコードが見つかりました。最初のレコードを削除します", "WARNING")
+        target_record = records[0]
+
+        record_id = target_record['id']
+        success, response = await self.request("DELETE", f"{zone.dns_records_path}/{record_id}")
+
+        if success:
+            zone.record_index.discard(record_id)
+            log(f"✅ DNSレコードの削除が完了しました: {full_name}")
+            return True
+
+        zone.record_index.invalidate()
+        log(f"DNSレコード削除に失敗: {response}", "ERROR")
+        return False
+
+    async def batch(self, deletes: Sequence[Dict] = (), patches: Sequence[Dict] = (),
+                    puts: Sequence[Dict] = (), posts: Sequence[Dict] = (), zone: Optional[Zone] = None) -> Tuple[bool, Dict]:
+        """batchエンドポイントで複数の変更を1トランザクションとして送信（zone省略時は既定ゾーン）"""
+        zone = zone or self.zones.default
+        if not await self.ensure_zone(zone):
+            return False, {"error": f"Zone IDを取得できません: {zone.domain}"}
+
+        data = {}
+        for key, ops in (("deletes", deletes), ("patches", patches), ("puts", puts), ("posts", posts)):
+            if ops:
+                data[key] = list(ops)
+
+        success, response = await self.request("POST", f"{zone.dns_records_path}/batch", data)
+
+        if success:
+            result = response.get('result') or {}
+            for record in result.get('deletes') or []:
+                zone.record_index.discard(record['id'])
+            for key in ("patches", "puts", "posts"):
+                for record in result.get(key) or []:
+                    zone.record_index.upsert(record)
+        elif response.get('status_code') in (404, 405):
+            log(f"batchエンドポイントが利用できないため、{BATCH_RETRY_INTERVAL}秒間は個別リクエストで処理します", "WARNING")
+            self._batch_disabled_until = time.monotonic() + BATCH_RETRY_INTERVAL
+
+        return success, response
+
+    @staticmethod
+    def _batch_rejected(response: Dict) -> bool:
+        """Cloudflareがbatchを処理した上で拒否したか（4xx・検証エラー。429と通信障害は含まない）"""
+        status_code = response.get('status_code')
+        if status_code is not None:
+            return 400 <= status_code < 500 and status_code != 429
+        # 2xxでsuccess=false（トランザクション・検証エラー）の応答にはerrorsが含まれる
+        return "errors" in response
+
+    async def _apply_single(self, kind: str, payload: Dict, zone: Zone) -> bool:
+        """batchの1操作を個別リクエストで実行"""
+        base = zone.dns_records_path
+
+        if kind == "deletes":
+            success, response = await self.request("DELETE", f"{base}/{payload['id']}")
+            if success:
+                zone.record_index.discard(payload['id'])
+        else:
+            body = {k: v for k, v in payload.items() if k != "id"}
+            if kind == "posts":
+                success, response = await self.request("POST", base, body)
+            else:
+                method = "PATCH" if kind == "patches" else "PUT"
+                success, response = await self.request(method, f"{base}/{payload['id']}", body)
+            if success:
+                zone.record_index.upsert(response['result'])
+
+        if not success:
+            zone.record_index.invalidate()
+            log(f"DNSレコードの{kind}操作に失敗: {response}", "ERROR",
+                domain=payload.get('name'), record_id=payload.get('id'), zone=zone.domain)
+        return success
+
+    async def apply_changes(self, deletes: Sequence[Tuple[str, Dict]] = (), patches: Sequence[Tuple[str, Dict]] = (),
+                            puts: Sequence[Tuple[str, Dict]] = (), posts: Sequence[Tuple[str, Dict]] = (),
+                            zone: Optional[Zone] = None) -> Tuple[List[str], List[str]]:
+        """1つのゾーンへの変更をbatch_sizeごとにまとめて適用し、失敗したチャンクは個別リクエストで再試行
+
+        Args:
+            deletes/patches/puts/posts: (ラベル, batchの操作データ) のリスト
+            zone: 対象ゾーン（省略時は既定ゾーン）
+
+        Returns:
+            Tuple[成功したラベル, 失敗したラベル]
+        """
+        zone = zone or self.zones.default
+        ops = [(kind, label, payload)
+               for kind, items in (("deletes", deletes), ("patches", patches), ("puts", puts), ("posts", posts))
+               for label, payload in items]
+
+        succeeded: List[str] = []
+        failed: List[str] = []
+        batch_size = max(1, self.config.batch_size)
+        started = time.perf_counter()
+
+        def record(kind: str, label: str, ok: bool):
+            # 変更の確定までの時間（batchではチャンク全体の完了時刻）
+            DNS_CHANGE_SECONDS.observe(time.perf_counter() - started, domain=self.zones.full_name(label), operation=kind,
+                                       result="ok" if ok else "failed")
+            (succeeded if ok else failed).append(label)
+
+        if ops and not await self.ensure_zone(zone):
+            for kind, label, _ in ops:
+                record(kind, label, False)
+            return succeeded, failed
+
+        for start in range(0, len(ops), batch_size):
+            chunk = ops[start:start + batch_size]
+
+            if self.batch_available:
+                grouped: Dict[str, List[Dict]] = {}
+                for kind, _, payload in chunk:
+                    grouped.setdefault(kind, []).append(payload)
+
+                log(f"batchで{len(chunk)}件の変更を送信中: {zone.domain}")
+                success, response = await self.batch(zone=zone, **grouped)
+                if success:
+                    for kind, label, _ in chunk:
+                        record(kind, label, True)
+                    continue
+                error = response.get('error') or response.get('errors')
+                if not self._batch_rejected(response):
+                    # レート制限・ブレーカー・通信障害では個別に送り直すと負荷が倍増し、
+                    # 応答だけ失われた場合は作成が重複するため、残りも含めて失敗として呼び出し元に任せる
+                    zone.record_index.invalidate()
+                    log(f"batchの送信に失敗したため残り{len(ops) - start}件を失敗として扱います: {error}", "ERROR", zone=zone.domain)
+                    for kind, label, _ in ops[start:]:
+                        record(kind, label, False)
+                    break
+                log(f"batchが拒否されたため個別リクエストで再試行します: {error}", "WARNING")
+
+            semaphore = self._get_semaphore()
+
+            async def apply_one(kind: str, label: str, payload: Dict):
+                async with semaphore:
+                    ok = await self._apply_single(kind, payload, zone)
+                record(kind, label, ok)
+
+            await asyncio.gather(*(apply_one(kind, label, payload) for kind, label, payload in chunk))
+
+        return succeeded, failed
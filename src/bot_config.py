@@ -6,12 +6,198 @@
 import os
 import json
 import re
-from typing import Any, Dict, List, Optional
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Union
 from dotenv import load_dotenv
 
+from config_writer import ConfigMutation, ConfigWriter
+from structured_log import emit
+from utils import log
+
 # .envファイルを読み込む
 load_dotenv()
 
+DEFAULT_BASE_URL = "https://api.cloudflare.com/client/v4"
+DEFAULT_IP_SERVICES = (
+    "https://ipv4.icanhazip.com",
+    "https://api.ipify.org",
+    "https://checkip.amazonaws.com"
+)
+
+def _section(data: Mapping[str, Any], key: str) -> Mapping[str, Any]:
+    value = data.get(key)
+    return value if isinstance(value, Mapping) else MappingProxyType({})
+
+def _freeze(value: Any) -> Any:
+    """読み込んだJSONを再帰的に変更不可にする（dict→MappingProxyType、list→tuple）"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _configured(value: Optional[str]) -> Optional[str]:
+    """未置換の ${VAR} や空文字は未設定として扱う"""
+    if not value or "${" in value:
+        return None
+    return value
+
+def _zone_settings(cf: Mapping[str, Any]) -> Tuple[Tuple[str, Optional[str]], ...]:
+    """cloudflare.domain/zone_id（既定ゾーン）と cloudflare.zones を (ドメイン, Zone ID) の一覧にまとめる"""
+    zones: List[Tuple[str, Optional[str]]] = []
+    entries = [{"domain": cf.get('domain'), "zone_id": cf.get('zone_id')}] + list(cf.get('zones') or [])
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"domain": entry}
+        domain = _configured(entry.get('domain'))
+        if domain and all(domain.lower() != d.lower() for d, _ in zones):
+            zones.append((domain, _configured(entry.get('zone_id'))))
+    return tuple(zones)
+
+@dataclass(frozen=True)
+class CloudflareSettings:
+    """Cloudflare関連の設定値（ヘッダーとエンドポイントは事前に組み立て済み）"""
+    zone_id: Optional[str]
+    api_token: Optional[str]
+    domain: str
+    base_url: str
+    request_timeout: int
+    max_concurrency: int
+    rate_limit: Tuple[int, int, int]
+    retry_settings: Tuple[int, float, float]
+    circuit_breaker_settings: Tuple[int, float]
+    use_batch_api: bool
+    batch_size: int
+    list_per_page: int
+    record_cache_ttl: int
+    ip_services: Tuple[str, ...]
+    ip_timeout: float
+    ip_quorum: int
+    ip_cache_ttl: int
+    headers: Mapping[str, str]
+    zones: Tuple[Tuple[str, Optional[str]], ...]
+    zone_cache_file: str
+
+    @classmethod
+    def from_dict(cls, cf: Mapping[str, Any]) -> "CloudflareSettings":
+        rate_limit = _section(cf, 'rate_limit')
+        retry = _section(cf, 'retry')
+        breaker = _section(cf, 'circuit_breaker')
+        api_token = cf.get('api_token')
+        zones = _zone_settings(cf)
+        return cls(
+            zone_id=zones[0][1] if zones else cf.get('zone_id'),
+            api_token=api_token,
+            domain=zones[0][0] if zones else cf.get('domain', "example.com"),
+            base_url=cf.get('base_url', DEFAULT_BASE_URL),
+            request_timeout=cf.get('request_timeout', 30),
+            max_concurrency=cf.get('max_concurrency', 16),
+            rate_limit=(rate_limit.get('requests', 1200), rate_limit.get('window', 300), rate_limit.get('burst', 50)),
+            retry_settings=(retry.get('max_retries', 3), retry.get('base_delay', 0.5), retry.get('max_delay', 8.0)),
+            circuit_breaker_settings=(breaker.get('failure_threshold', 5), breaker.get('reset_timeout', 30)),
+            use_batch_api=cf.get('use_batch_api', True),
+            batch_size=cf.get('batch_size', 200),
+            list_per_page=cf.get('list_per_page', 100),
+            record_cache_ttl=cf.get('record_cache_ttl', 300),
+            ip_services=tuple(cf.get('ip_services', DEFAULT_IP_SERVICES)),
+            ip_timeout=cf.get('ip_timeout', 5),
+            ip_quorum=cf.get('ip_quorum', 1),
+            ip_cache_ttl=cf.get('ip_cache_ttl', 30),
+            headers=MappingProxyType({
+                "Authorization": f"Bearer {api_token}",
+                "Content-Type": "application/json"
+            }),
+            zones=zones,
+            zone_cache_file=cf.get('zone_cache_file', 'zone_cache.json')
+        )
+
+@dataclass(frozen=True)
+class ResyncSettings:
+    """ルーター再起動後のDNS再同期の設定値（router.resync）"""
+    gateway: Optional[str]
+    port: Optional[int]
+    interval: float
+    stable_checks: int
+    timeout: float
+
+    @classmethod
+    def from_dict(cls, resync: Mapping[str, Any]) -> "ResyncSettings":
+        port = resync.get('port')
+        return cls(
+            gateway=resync.get('gateway') or None,
+            port=int(port) if port else None,
+            interval=resync.get('interval', 5),
+            stable_checks=resync.get('stable_checks', 2),
+            timeout=resync.get('timeout', 600)
+        )
+
+@dataclass(frozen=True)
+class RouterSettings:
+    """ルーター操作の設定値（接続・ドライバー別の設定は変更不可のMappingのまま保持）"""
+    driver: str
+    execution: str
+    job_timeout: float
+    progress_interval: float
+    connection: Mapping[str, Any]
+    selenium: Mapping[str, Any]
+    http: Mapping[str, Any]
+    resync: ResyncSettings
+
+    @classmethod
+    def from_dict(cls, router: Mapping[str, Any]) -> "RouterSettings":
+        return cls(
+            driver=router.get('driver', 'selenium'),
+            execution=router.get('execution', 'in_process'),
+            job_timeout=router.get('job_timeout', 300),
+            progress_interval=router.get('progress_interval', 2.0),
+            connection=_section(router, 'connection'),
+            selenium=_section(router, 'selenium'),
+            http=_section(router, 'http'),
+            resync=ResyncSettings.from_dict(_section(router, 'resync'))
+        )
+
+@dataclass(frozen=True)
+class LoggingSettings:
+    """ログ出力の設定値（logging）"""
+    level: str
+    format: str
+    ring_size: int
+
+    @classmethod
+    def from_dict(cls, logging_config: Mapping[str, Any]) -> "LoggingSettings":
+        return cls(
+            level=logging_config.get('level') or 'INFO',
+            format=logging_config.get('format') or 'text',
+            ring_size=logging_config.get('ring_size') or 500
+        )
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """読み込んだ時点の設定（変更不可、再読み込み時は丸ごと差し替える）"""
+    raw: Mapping[str, Any]
+    cloudflare: CloudflareSettings
+    router: RouterSettings
+    logging: LoggingSettings
+    target_domains: Tuple[str, ...]
+    worker_threads: int
+    mtime: float
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], mtime: float = 0.0) -> "ConfigSnapshot":
+        # 呼び出し元に渡した設定を書き換えられないよう、元のdictは保持しない
+        raw = _freeze(data)
+        return cls(
+            raw=raw,
+            cloudflare=CloudflareSettings.from_dict(_section(raw, 'cloudflare')),
+            router=RouterSettings.from_dict(_section(raw, 'router')),
+            logging=LoggingSettings.from_dict(_section(raw, 'logging')),
+            target_domains=tuple(_section(raw, 'dns').get('target_domains', ())),
+            worker_threads=_section(raw, 'discord').get('worker_threads', 8),
+            mtime=mtime
+        )
+
 class BotConfig:
     """統合Bot設定管理クラス"""
     
@@ -26,18 +212,45 @@ class BotConfig:
         else:
             # フォールバック（ルートディレクトリ）
             self.config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), config_file)
-        self._config = self._load_config()
+        self._listeners: List[Callable[[ConfigSnapshot], None]] = []
+        self._reload_lock = threading.RLock()
+        self._seen_mtime = self._mtime()
+        self._swap(self._load_config(), self._seen_mtime)
+        self.writer = ConfigWriter(self.config_path, self.get('discord.config_write_window', 0.2))
+    
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        """現在の設定スナップショット"""
+        return self._snapshot
+    
+    def _mtime(self) -> float:
+        try:
+            return os.stat(self.config_path).st_mtime
+        except OSError:
+            return 0.0
+    
+    def _swap(self, config: Dict[str, Any], mtime: float):
+        """新しいスナップショットに差し替え（参照の代入1回なので読み手はロック不要）"""
+        self._snapshot = ConfigSnapshot.from_dict(config, mtime)
+    
+    def add_listener(self, listener: Callable[[ConfigSnapshot], None]):
+        """再読み込み時に呼ばれるコールバックを登録"""
+        self._listeners.append(listener)
+    
+    def _read_config(self) -> Dict[str, Any]:
+        """設定ファイルを読み込み、環境変数を置換（失敗時は例外を送出）"""
+        with open(self.config_path, 'r', encoding='utf-8') as f:
+            config_str = f.read()
+        
+        # 環境変数を置換
+        config_str = self._replace_env_vars(config_str)
+        
+        return json.loads(config_str)
     
     def _load_config(self) -> Dict[str, Any]:
         """設定ファイルを読み込み、環境変数を置換"""
         try:
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                config_str = f.read()
-                
-            # 環境変数を置換
-            config_str = self._replace_env_vars(config_str)
-            
-            return json.loads(config_str)
+            return self._read_config()
         except FileNotFoundError:
             print(f"設定ファイルが見つかりません: {self.config_path}")
             return {}
@@ -65,62 +278,69 @@ class BotConfig:
     def get(self, key_path: str, default: Any = None) -> Any:
         """ドット記法でネストした設定値を取得"""
         keys = key_path.split('.')
-        current = self._config
+        current = self._snapshot.raw
         
         for key in keys:
-            if isinstance(current, dict) and key in current:
+            if isinstance(current, Mapping) and key in current:
                 current = current[key]
             else:
                 return default
         
         return current
     
-    def get_cloudflare_config(self) -> Dict[str, Any]:
-        """Cloudflare設定を取得"""
-        return self.get('cloudflare', {})
+    def get_cloudflare_config(self) -> Mapping[str, Any]:
+        """Cloudflare設定を取得（変更不可）"""
+        return _section(self._snapshot.raw, 'cloudflare')
     
-    def get_dns_config(self) -> Dict[str, Any]:
-        """DNS設定を取得"""
-        return self.get('dns', {})
+    def get_dns_config(self) -> Mapping[str, Any]:
+        """DNS設定を取得（変更不可）"""
+        return _section(self._snapshot.raw, 'dns')
     
-    def get_router_config(self) -> Dict[str, Any]:
-        """Router設定を取得"""
-        return self.get('router', {})
+    def get_router_config(self) -> Mapping[str, Any]:
+        """Router設定を取得（変更不可）"""
+        return _section(self._snapshot.raw, 'router')
     
-    def get_discord_config(self) -> Dict[str, Any]:
-        """Discord設定を取得"""
-        return self.get('discord', {})
+    def get_discord_config(self) -> Mapping[str, Any]:
+        """Discord設定を取得（変更不可）"""
+        return _section(self._snapshot.raw, 'discord')
     
     def get_target_domains(self) -> List[str]:
         """対象ドメインリストを取得"""
-        return self.get('dns.target_domains', [])
+        return list(self._snapshot.target_domains)
     
     def get_default_domains(self) -> List[str]:
         """デフォルトドメインリストを取得"""
-        return self.get('dns.default_domains', [])
+        return list(self.get('dns.default_domains', ()))
     
-    def get_router_schedule_config(self) -> Dict[str, Any]:
-        """Routerスケジュール設定を取得"""
-        return self.get('router.schedule', {})
+    def get_schedule_jobs(self) -> Dict[str, Dict[str, Any]]:
+        """名前付きスケジュールジョブの設定を取得（旧形式のrouter.scheduleはrouter_rebootとして扱う）"""
+        jobs = {name: dict(job) for name, job in self.get('schedule.jobs', {}).items()}
+        legacy = self.get('router.schedule', {})
+        if 'router_reboot' not in jobs and legacy.get('cron'):
+            jobs['router_reboot'] = {'cron': legacy['cron'], 'channel_id': legacy.get('channel_id')}
+        return jobs
     
-    def get_router_selenium_config(self) -> Dict[str, Any]:
+    def get_router_selenium_config(self) -> Mapping[str, Any]:
         """Router Selenium設定を取得"""
-        return self.get('router.selenium', {})
+        return self._snapshot.router.selenium
+    
+    def get_router_http_config(self) -> Mapping[str, Any]:
+        """Router HTTPドライバー設定を取得"""
+        return self._snapshot.router.http
     
-    def get_router_connection_config(self) -> Dict[str, Any]:
+    def get_router_connection_config(self) -> Mapping[str, Any]:
         """Router接続設定を取得"""
-        return self.get('router.connection', {})
+        return self._snapshot.router.connection
     
     def validate(self) -> bool:
         """設定値の検証"""
-        # 必須環境変数のチェック
-        required_cloudflare = ['zone_id', 'api_token']
-        cf_config = self.get_cloudflare_config()
-        
-        for key in required_cloudflare:
-            if not cf_config.get(key):
-                print(f"必須のCloudflare設定が不足しています: {key}")
-                return False
+        # 必須環境変数のチェック（Zone IDはドメイン名から取得できる）
+        if not self.api_token:
+            print("必須のCloudflare設定が不足しています: api_token")
+            return False
+        if not self.zones:
+            print("必須のCloudflare設定が不足しています: domain または zones")
+            return False
         
         # Router設定のチェック
         router_conn = self.get_router_connection_config()
@@ -130,106 +350,236 @@ class BotConfig:
         
         return True
     
-    def reload(self):
-        """設定を再読み込み"""
-        self._config = self._load_config()
-    
-    def update_target_domains(self, domains: List[str]) -> bool:
-        """対象ドメインリストを更新"""
-        try:
-            # 現在の設定を読み込み
-            if not self._config:
-                self._config = {}
-            
-            # dns.target_domains セクションを更新
-            if 'dns' not in self._config:
-                self._config['dns'] = {}
-            
-            self._config['dns']['target_domains'] = domains
-            
-            # ファイルに書き込み
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(self._config, f, ensure_ascii=False, indent=2)
+    def reload(self) -> bool:
+        """設定を再読み込みしてスナップショットを差し替え、リスナーに通知
+        
+        読み込みや解析に失敗した場合（書き込み途中など）は現在の設定を維持する。
+        """
+        with self._reload_lock:
+            self._seen_mtime = mtime = self._mtime()
+            try:
+                config = self._read_config()
+            except (OSError, ValueError) as e:
+                log(f"設定ファイルを再読み込みできません（現在の設定を維持します）: {e}", "WARNING")
+                return False
             
+            self._swap(config, mtime)
+            for listener in list(self._listeners):
+                try:
+                    listener(self._snapshot)
+                except Exception as e:
+                    emit(f"設定の反映でエラーが発生しました: {e}", "ERROR", exc_info=True)
             return True
-        except Exception as e:
-            print(f"Target domains update error: {e}")
-            return False
     
-    def update_router_schedule(self, cron_expression: str, channel_id: int) -> bool:
-        """Routerスケジュール設定を更新"""
-        try:
-            # 現在の設定を読み込み
-            if not self._config:
-                self._config = {}
-            
-            # router.schedule セクションを更新
-            if 'router' not in self._config:
-                self._config['router'] = {}
-            if 'schedule' not in self._config['router']:
-                self._config['router']['schedule'] = {}
-            
-            self._config['router']['schedule']['cron'] = cron_expression
-            self._config['router']['schedule']['channel_id'] = str(channel_id)
-            
-            # ファイルに書き込み
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(self._config, f, ensure_ascii=False, indent=2)
-            
-            return True
-        except Exception as e:
-            print(f"Router schedule update error: {e}")
+    def reload_if_changed(self) -> bool:
+        """ファイルの更新時刻が前回の確認から変わっていれば再読み込み"""
+        with self._reload_lock:
+            if self._mtime() == self._seen_mtime:
+                return False
+            return self.reload()
+    
+    def _write(self, mutation: ConfigMutation) -> bool:
+        """変更を設定ファイルに書き込み、書き込み後の内容を読み直す
+        
+        まとめて書き込まれた他の呼び出し元が読み直し済みであれば読み直さない。
+        """
+        if not self.writer.update(mutation):
             return False
+        self.reload_if_changed()
+        return True
+    
+    def update_target_domains(self, domains: Union[List[str], Callable[[], List[str]]]) -> bool:
+        """対象ドメインリストを更新（関数を渡した場合は書き込む時点で呼び出す）"""
+        if not callable(domains):
+            domains = list(domains)
+        
+        def mutate(config: Dict[str, Any]):
+            # dns.target_domains セクションを更新
+            config.setdefault('dns', {})['target_domains'] = domains() if callable(domains) else domains
+        
+        return self._write(mutate)
+    
+    def update_schedule_job(self, name: str, **fields) -> bool:
+        """スケジュールジョブの設定を更新（指定された項目のみ）"""
+        def mutate(config: Dict[str, Any]):
+            # schedule.jobs.<name> セクションを更新
+            jobs = config.setdefault('schedule', {}).setdefault('jobs', {})
+            job = jobs.setdefault(name, {})
+            # 旧形式のrouter.scheduleは移行する
+            legacy = config.get('router', {}).pop('schedule', None)
+            if legacy and name == 'router_reboot':
+                job.setdefault('cron', legacy.get('cron'))
+                job.setdefault('channel_id', legacy.get('channel_id'))
+            job.update(fields)
+        
+        return self._write(mutate)
     
     # Config クラス互換のプロパティとメソッド
     @property
     def zone_id(self) -> str:
         """Cloudflare Zone ID"""
-        return self.get('cloudflare.zone_id')
+        return self._snapshot.cloudflare.zone_id
     
     @property
     def api_token(self) -> str:
         """Cloudflare API Token"""
-        return self.get('cloudflare.api_token')
+        return self._snapshot.cloudflare.api_token
     
     @property
     def domain(self) -> str:
         """Cloudflare Domain"""
-        return self.get('cloudflare.domain', "example.com")
+        return self._snapshot.cloudflare.domain
     
     @property
     def base_url(self) -> str:
         """Cloudflare API Base URL"""
-        return self.get('cloudflare.base_url', "https://api.cloudflare.com/client/v4")
+        return self._snapshot.cloudflare.base_url
     
     @property
     def request_timeout(self) -> int:
         """Request Timeout"""
-        return self.get('cloudflare.request_timeout', 30)
+        return self._snapshot.cloudflare.request_timeout
+    
+    @property
+    def max_concurrency(self) -> int:
+        """Max concurrent Cloudflare API requests"""
+        return self._snapshot.cloudflare.max_concurrency
+    
+    @property
+    def rate_limit(self) -> Tuple[int, int, int]:
+        """Cloudflare API rate limit (requests, window seconds, burst)"""
+        return self._snapshot.cloudflare.rate_limit
+    
+    @property
+    def retry_settings(self) -> Tuple[int, float, float]:
+        """Retry policy (max retries, base delay, max delay)"""
+        return self._snapshot.cloudflare.retry_settings
+    
+    @property
+    def circuit_breaker_settings(self) -> Tuple[int, float]:
+        """Per-host circuit breaker (failure threshold, reset timeout seconds)"""
+        return self._snapshot.cloudflare.circuit_breaker_settings
+    
+    @property
+    def use_batch_api(self) -> bool:
+        """Use the dns_records/batch endpoint for bulk operations"""
+        return self._snapshot.cloudflare.use_batch_api
+    
+    @property
+    def batch_size(self) -> int:
+        """Max operations per batch request"""
+        return self._snapshot.cloudflare.batch_size
+    
+    @property
+    def list_per_page(self) -> int:
+        """DNS record list page size"""
+        return self._snapshot.cloudflare.list_per_page
+    
+    @property
+    def record_cache_ttl(self) -> int:
+        """Record Index TTL (seconds)"""
+        return self._snapshot.cloudflare.record_cache_ttl
     
     @property
     def ip_services(self) -> List[str]:
         """IP Services"""
-        return self.get('cloudflare.ip_services', [
-            "https://ipv4.icanhazip.com",
-            "https://api.ipify.org",
-            "https://checkip.amazonaws.com"
-        ])
+        return list(self._snapshot.cloudflare.ip_services)
+    
+    @property
+    def ip_timeout(self) -> float:
+        """Timeout per IP service query (seconds)"""
+        return self._snapshot.cloudflare.ip_timeout
+    
+    @property
+    def ip_quorum(self) -> int:
+        """Number of IP services that must agree"""
+        return self._snapshot.cloudflare.ip_quorum
+    
+    @property
+    def ip_cache_ttl(self) -> int:
+        """Discovered IP cache TTL (seconds)"""
+        return self._snapshot.cloudflare.ip_cache_ttl
     
     @property
     def default_domains(self) -> List[str]:
         """Default Domains (fallback for target_domains)"""
         return self.get_target_domains()
     
-    def get_headers(self) -> Dict[str, str]:
-        """APIリクエスト用のヘッダーを取得"""
-        return {
-            "Authorization": f"Bearer {self.api_token}",
-            "Content-Type": "application/json"
-        }
+    @property
+    def schedule_state_path(self) -> str:
+        """Scheduler state file (stored next to the config file)"""
+        state_file = self.get('schedule.state_file', 'schedule_state.json')
+        return os.path.join(os.path.dirname(self.config_path), state_file)
+    
+    @property
+    def router(self) -> RouterSettings:
+        """Router settings (driver, execution, timeouts, post-reboot resync)"""
+        return self._snapshot.router
+    
+    @property
+    def logging(self) -> LoggingSettings:
+        """Logging settings (level, format, ring buffer size)"""
+        return self._snapshot.logging
+    
+    @property
+    def worker_threads(self) -> int:
+        """Worker threads for blocking calls from Discord handlers"""
+        return self._snapshot.worker_threads
+    
+    @property
+    def zones(self) -> List[Tuple[str, Optional[str]]]:
+        """Managed zones as (domain, zone_id); the first one is the default zone"""
+        return list(self._snapshot.cloudflare.zones)
+    
+    @property
+    def zone_domains(self) -> List[str]:
+        """Domains of the managed zones (default zone first)"""
+        return [domain for domain, _ in self._snapshot.cloudflare.zones] or [self.domain]
+    
+    @property
+    def zone_cache_path(self) -> str:
+        """Discovered zone ID cache (stored next to the config file)"""
+        return os.path.join(os.path.dirname(self.config_path), self._snapshot.cloudflare.zone_cache_file)
+    
+    def get_headers(self) -> Mapping[str, str]:
+        """APIリクエスト用のヘッダーを取得（読み込み時に組み立て済み、変更不可）"""
+        return self._snapshot.cloudflare.headers
+
+class ConfigWatcher:
+    """設定ファイルの更新時刻を監視し、変更されたらBotConfigを再読み込みするクラス
 
-# グローバル設定インスタンス
-bot_config = BotConfig()
+    監視はデーモンスレッドで行い、読み手は差し替え後のスナップショットを
+    参照するだけなのでロックは不要。
+    """
+    
+    def __init__(self, config: BotConfig, interval: float = 2.0):
+        self.config = config
+        self.interval = interval
+        self.reloads = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if self.config.reload_if_changed():
+                    self.reloads += 1
+                    log(f"設定ファイルを再読み込みしました: {self.config.config_path}")
+            except Exception as e:
+                emit(f"設定ファイルの監視でエラーが発生しました: {e}", "ERROR", exc_info=True)
+    
+    def start(self) -> "ConfigWatcher":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
 
 # Config クラスのエイリアス（後方互換性のため）
 Config = BotConfig
\ No newline at end of file
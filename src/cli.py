@@ -4,18 +4,23 @@ Command Line Interface for Cloudflare DNS Manager
 """
 
 import argparse
+import asyncio
 import sys
+from typing import Dict, List
 from bot_config import Config
-from dns_manager import CloudflareDNSManager
-from utils import log
+from dns_manager import CloudflareDNSManager, CloudflareAPIError
+from structured_log import configure_from_config
+from utils import log, format_record_table
 
 class CLI:
     """コマンドラインインターフェースクラス"""
     
     def __init__(self):
         self.config = Config()
+        # 表の出力と順序が入れ替わらないよう、CLIではログを同期的に書き出す
+        configure_from_config(self.config, use_queue=False)
         if not self.config.validate():
-            print("エラー: ZONE_ID と API_TOKEN を設定してください")
+            print("エラー: API_TOKEN とドメイン（domain または zones）を設定してください")
             sys.exit(1)
         
         self.dns_manager = CloudflareDNSManager(self.config)
@@ -29,6 +34,11 @@ class CLI:
         list_parser = subparsers.add_parser("list", help="List DNS records")
         list_parser.add_argument("-t", "--type", help="Filter by record type")
         list_parser.add_argument("-f", "--filter", help="Filter by name (partial match)")
+        list_parser.add_argument("-c", "--content", help="Filter by content (exact match)")
+        list_parser.add_argument("--proxied", action=argparse.BooleanOptionalAction, default=None, help="Filter by proxy status")
+        list_parser.add_argument("--match", choices=["all", "any"], default="all", help="Require all or any filters to match (default: all)")
+        list_parser.add_argument("--per-page", type=int, help="Records fetched per API page")
+        list_parser.add_argument("-z", "--zone", help="Zone domain to list (default: all zones)")
         
         # create コマンド
         create_parser = subparsers.add_parser("create", help="Create DNS record")
@@ -49,23 +59,98 @@ class CLI:
         update_parser.add_argument("-i", "--ip", required=True, help="New IP address")
         update_parser.add_argument("-t", "--type", help="Filter by record type (default: A)")
         
+        # refresh コマンド
+        subparsers.add_parser("refresh", help="Reload the cached zone record index")
+        
+        # zones コマンド
+        subparsers.add_parser("zones", help="Show managed zones and discover missing zone IDs")
+        
         # bulk-update コマンド
         bulk_update_parser = subparsers.add_parser("bulk-update", help="Bulk update predefined domains with current IP")
         bulk_update_parser.add_argument("-d", "--domains", nargs="+", help="Custom domain list (default: saved list)")
         
+        # bulk-create コマンド
+        bulk_create_parser = subparsers.add_parser("bulk-create", help="Create many DNS records in one batch")
+        bulk_create_parser.add_argument("-n", "--names", nargs="+", required=True, help="Record names (subdomains)")
+        bulk_create_parser.add_argument("-i", "--ip", help="IP address or content (default: current IP)")
+        bulk_create_parser.add_argument("-t", "--type", default="A", help="Record type (default: A)")
+        bulk_create_parser.add_argument("-l", "--ttl", type=int, default=60, help="TTL in seconds (default: 60)")
+        bulk_create_parser.add_argument("-p", "--proxy", action="store_true", help="Enable proxy")
+        
+        # bulk-delete コマンド
+        bulk_delete_parser = subparsers.add_parser("bulk-delete", help="Delete many DNS records in one batch")
+        bulk_delete_parser.add_argument("-n", "--names", nargs="+", required=True, help="Record names")
+        bulk_delete_parser.add_argument("-t", "--type", help="Record type for safer deletion")
+        
         # list-domains コマンド
-        list_domains_parser = subparsers.add_parser("list-domains", help="List target domains for bulk update")
+        subparsers.add_parser("list-domains", help="List target domains for bulk update")
         
         # add-domain コマンド
-        add_domain_parser = subparsers.add_parser("add-domain", help="Add domain to bulk update list")
-        add_domain_parser.add_argument("-n", "--name", required=True, help="Domain name to add")
+        add_domain_parser = subparsers.add_parser("add-domain", help="Add domains to bulk update list in one write")
+        add_domain_parser.add_argument("-n", "--name", "--names", dest="names", nargs="+", required=True,
+                                       help="Domain names to add (glob patterns match A records in the zone)")
+        add_domain_parser.add_argument("-t", "--type", default="A", help="Record type matched by glob patterns (default: A)")
         
         # remove-domain コマンド
-        remove_domain_parser = subparsers.add_parser("remove-domain", help="Remove domain from bulk update list")
-        remove_domain_parser.add_argument("-n", "--name", required=True, help="Domain name to remove")
+        remove_domain_parser = subparsers.add_parser("remove-domain", help="Remove domains from bulk update list in one write")
+        remove_domain_parser.add_argument("-n", "--name", "--names", dest="names", nargs="+", required=True,
+                                          help="Domain names to remove (glob patterns match the list)")
         
         return parser
     
+    def list_records(self, args) -> bool:
+        """DNSレコードをページ受信ごとに表示"""
+        zone = None
+        if args.zone:
+            zone = self.dns_manager.zones.get(args.zone)
+            if zone is None:
+                log(f"ゾーン '{args.zone}' は管理対象ではありません", "ERROR")
+                return False
+        
+        pages = self.dns_manager.iter_record_pages(
+            args.type, name_contains=args.filter, content=args.content,
+            proxied=args.proxied, match=args.match, per_page=args.per_page, zone=zone
+        )
+        
+        total = 0
+        try:
+            for records, _ in pages:
+                if records:
+                    print(format_record_table(records))
+                total += len(records)
+        except CloudflareAPIError as e:
+            log(f"DNSレコード取得に失敗: {e}", "ERROR")
+            return False
+        
+        if total == 0:
+            print(format_record_table([]))
+        log(f"取得したDNSレコード数: {total}")
+        return True
+    
+    def show_zones(self) -> bool:
+        """管理対象のゾーンを表示（Zone IDが未設定のゾーンは取得してキャッシュ）"""
+        success = self.dns_manager.discover_zones()
+        for i, zone in enumerate(self.dns_manager.zones):
+            default = " (default)" if i == 0 else ""
+            print(f"  {zone.domain}{default}: {zone.zone_id or '-'}")
+        return success
+    
+    def print_domain_result(self, result: Dict[str, List[str]]):
+        """ドメインリストの追加・削除結果を表示"""
+        for key, names in result.items():
+            if names:
+                print(f"{key} ({len(names)}): {', '.join(names)}")
+    
+    def run_async(self, coro):
+        """コルーチンを実行し、終了後に接続プールを閉じる"""
+        async def runner():
+            try:
+                return await coro
+            finally:
+                await self.dns_manager.aclose()
+        
+        return asyncio.run(runner())
+    
     def run(self, args=None):
         """CLIを実行"""
         parser = self.create_parser()
@@ -78,7 +163,7 @@ class CLI:
         # コマンドの実行
         try:
             if args.command == "list":
-                success = self.dns_manager.list_records(args.type, args.filter)
+                success = self.list_records(args)
             elif args.command == "create":
                 success = self.dns_manager.create_record(
                     args.name, args.ip, args.type, args.ttl, args.proxy
@@ -89,14 +174,26 @@ class CLI:
                 success = self.dns_manager.update_record(
                     args.name, args.ip, args.type
                 )
+            elif args.command == "refresh":
+                success = self.dns_manager.refresh_record_index()
+            elif args.command == "zones":
+                success = self.show_zones()
             elif args.command == "bulk-update":
-                success = self.dns_manager.bulk_update_records(args.domains)
+                success, _ = self.run_async(self.dns_manager.bulk_update_records(args.domains))
+            elif args.command == "bulk-create":
+                success, _, _ = self.run_async(self.dns_manager.bulk_create_records(
+                    args.names, args.ip, args.type, args.ttl, args.proxy
+                ))
+            elif args.command == "bulk-delete":
+                success, _, _ = self.run_async(self.dns_manager.bulk_delete_records(args.names, args.type))
             elif args.command == "list-domains":
                 success = self.dns_manager.domain_manager.list_domains()
             elif args.command == "add-domain":
-                success = self.dns_manager.domain_manager.add_domain(args.name)
+                success, result = self.dns_manager.add_target_domains(args.names, args.type)
+                self.print_domain_result(result)
             elif args.command == "remove-domain":
-                success = self.dns_manager.domain_manager.remove_domain(args.name)
+                success, result = self.dns_manager.domain_manager.remove_domains(args.names)
+                self.print_domain_result(result)
             else:
                 parser.print_help()
                 sys.exit(1)
@@ -5,18 +5,61 @@
 
 import discord
 from discord.ext import commands
-from typing import Optional
-from dns_manager import CloudflareDNSManager
-from bot_config import Config
+from typing import Callable, Dict, List, Optional
 from utils import log
+from services import ServiceContainer, get_services
+from domain_list_manager import split_names
+from tracing import traced
+
+def _format_domain_list(domains: List[str], qualify: Optional[Callable[[str], str]], limit: int = 1024) -> str:
+    """ドメイン一覧をEmbedフィールドの文字数制限内に整形（qualifyがNoneなら名前をそのまま表示）"""
+    lines = []
+    length = 0
+    for i, d in enumerate(domains):
+        line = f"• {qualify(d)}" if qualify else f"• `{d}`"
+        rest = f"\n… 他 {len(domains) - i} 件"
+        if length + len(line) + 1 + len(rest) > limit:
+            lines.append(rest.strip())
+            break
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)
+
+@traced("render.embed")
+def build_bulk_update_embed(result: Dict, qualify: Callable[[str], str], title: str, description: str, color: int) -> discord.Embed:
+    """一括更新結果（更新・変更なし・レコードなし・失敗）のEmbedを作成（qualifyで完全なレコード名に変換）"""
+    embed = discord.Embed(
+        title=title,
+        description=f"{description}\n**更新先IPアドレス:** `{result.get('ip')}`",
+        color=color
+    )
+    
+    groups = [
+        ("updated", "✅ 更新"),
+        ("unchanged", "⏭️ 変更なし（既に最新）"),
+        ("missing", "❓ レコードなし"),
+        ("failed", "❌ 更新失敗"),
+    ]
+    for key, label in groups:
+        domains = result.get(key) or []
+        if domains:
+            embed.add_field(
+                name=f"{label} ({len(domains)})",
+                value=_format_domain_list(domains, qualify),
+                inline=False
+            )
+    
+    return embed
 
 class BulkCommands(commands.Cog):
     """一括更新管理コマンドグループ"""
     
-    def __init__(self, bot):
+    def __init__(self, bot, services: Optional[ServiceContainer] = None):
         self.bot = bot
-        config = Config()
-        self.dns_manager = CloudflareDNSManager(config)
+        # 設定・DNSマネージャー・ワーカーは全Cogで共有（終了処理はコンテナが行う）
+        self.services = services or get_services()
+        self.dns_manager = self.services.dns_manager
+        self.workers = self.services.workers
     
     bulk_group = discord.SlashCommandGroup("bulk", "一括更新管理コマンド")
     
@@ -29,10 +72,9 @@ class BulkCommands(commands.Cog):
             domains = self.dns_manager.domain_manager.get_domains()
             
             if domains:
-                domain_list = "\n".join([f"• {domain}.{self.dns_manager.config.domain}" for domain in domains])
                 embed = discord.Embed(
                     title="📋 一括更新対象ドメインリスト",
-                    description=domain_list,
+                    description=_format_domain_list(domains, self.dns_manager.full_name, limit=4096),
                     color=0x0099ff
                 )
                 embed.add_field(name="ドメイン数", value=len(domains), inline=True)
@@ -55,43 +97,18 @@ class BulkCommands(commands.Cog):
         await ctx.defer()
         
         try:
-            
-            # 現在のIPアドレスを取得
-            from utils import get_current_ip
-            current_ip = get_current_ip(self.dns_manager.config.ip_services)
-            
-            success, successful_domains, failed_domains = await self.dns_manager.bulk_update_records()
+            success, result = await self.dns_manager.bulk_update_records()
             
             if success:
-                embed = discord.Embed(
-                    title="✅ 一括更新完了",
-                    description=f"すべてのドメインの更新が完了しました\n**更新先IPアドレス:** `{current_ip}`",
-                    color=0x00ff00
+                embed = build_bulk_update_embed(
+                    result, self.dns_manager.full_name,
+                    "✅ 一括更新完了", "すべてのドメインの更新が完了しました", 0x00ff00
                 )
-                if successful_domains:
-                    embed.add_field(
-                        name="✅ 更新成功",
-                        value=f"• " + f"\n• ".join([f"{d}.{self.dns_manager.config.domain}" for d in successful_domains]),
-                        inline=False
-                    )
             else:
-                embed = discord.Embed(
-                    title="⚠️ 一括更新完了（一部失敗）",
-                    description=f"一部のドメインの更新に失敗しました\n**更新先IPアドレス:** `{current_ip}`",
-                    color=0xffaa00
+                embed = build_bulk_update_embed(
+                    result, self.dns_manager.full_name,
+                    "⚠️ 一括更新完了（一部失敗）", "一部のドメインの更新に失敗しました", 0xffaa00
                 )
-                if successful_domains:
-                    embed.add_field(
-                        name="✅ 更新成功",
-                        value=f"• " + f"\n• ".join([f"{d}.{self.dns_manager.config.domain}" for d in successful_domains]),
-                        inline=False
-                    )
-                if failed_domains:
-                    embed.add_field(
-                        name="❌ 更新失敗",
-                        value=f"• " + f"\n• ".join([f"{d}.{self.dns_manager.config.domain}" for d in failed_domains]),
-                        inline=False
-                    )
             
             await ctx.followup.send(embed=embed)
             
@@ -99,26 +116,39 @@ class BulkCommands(commands.Cog):
             await ctx.followup.send(f"❌ エラーが発生しました: {str(e)}", ephemeral=True)
             log(f"Bulk execute error: {e}", "ERROR")
     
-    @bulk_group.command(name="add", description="ドメインをリストに追加")
-    async def bulk_add(self, ctx, name: str):
+    @bulk_group.command(name="add", description="ドメインをリストに追加（複数・ワイルドカード可）")
+    async def bulk_add(self, ctx, names: discord.Option(str, "追加する名前（空白・カンマ区切り、* ? はゾーン内のAレコードに一致）")):
         """ドメインを一括更新リストに追加"""
         await ctx.defer()
         
         try:
-            success = self.dns_manager.domain_manager.add_domain(name)
+            success, result = await self.workers.run(self.dns_manager.add_target_domains, split_names(names))
             
             if success:
                 embed = discord.Embed(
                     title="✅ ドメイン追加完了",
-                    description=f"`{name}` を一括更新リストに追加しました",
+                    description=f"{len(result['added'])}件を一括更新リストに追加しました",
                     color=0x00ff00
                 )
+            elif result["invalid"]:
+                embed = discord.Embed(
+                    title="❌ ドメイン追加失敗",
+                    description="不正な名前が含まれているため追加しませんでした",
+                    color=0xff0000
+                )
             else:
                 embed = discord.Embed(
                     title="❌ ドメイン追加失敗",
-                    description=f"`{name}` は既にリストに登録されています",
+                    description="追加できるドメインがありませんでした",
                     color=0xff0000
                 )
+            self._add_result_fields(embed, result, [
+                ("added", "✅ 追加"),
+                ("existing", "⏭️ 登録済み"),
+                ("invalid", "❌ 不正な名前"),
+                ("unmatched", "❓ 一致するレコードなし"),
+                ("skipped", "⏭️ 登録できないレコード"),
+            ])
             
             await ctx.followup.send(embed=embed)
             
@@ -126,33 +156,49 @@ class BulkCommands(commands.Cog):
             await ctx.followup.send(f"❌ エラーが発生しました: {str(e)}", ephemeral=True)
             log(f"Bulk add error: {e}", "ERROR")
     
-    @bulk_group.command(name="remove", description="ドメインをリストから削除")
-    async def bulk_remove(self, ctx, name: str):
+    @bulk_group.command(name="remove", description="ドメインをリストから削除（複数・ワイルドカード可）")
+    async def bulk_remove(self, ctx, names: discord.Option(str, "削除する名前（空白・カンマ区切り、* ? はリスト内の名前に一致）")):
         """ドメインを一括更新リストから削除"""
         await ctx.defer()
         
         try:
-            success = self.dns_manager.domain_manager.remove_domain(name)
+            success, result = await self.workers.run(self.dns_manager.domain_manager.remove_domains, split_names(names))
             
             if success:
                 embed = discord.Embed(
                     title="✅ ドメイン削除完了",
-                    description=f"`{name}` を一括更新リストから削除しました",
+                    description=f"{len(result['removed'])}件を一括更新リストから削除しました",
                     color=0x00ff00
                 )
             else:
                 embed = discord.Embed(
                     title="❌ ドメイン削除失敗",
-                    description=f"`{name}` はリストに登録されていません",
+                    description="リストに登録されているドメインがありませんでした",
                     color=0xff0000
                 )
+            self._add_result_fields(embed, result, [
+                ("removed", "✅ 削除"),
+                ("missing", "❓ 未登録"),
+            ])
             
             await ctx.followup.send(embed=embed)
             
         except Exception as e:
             await ctx.followup.send(f"❌ エラーが発生しました: {str(e)}", ephemeral=True)
             log(f"Bulk remove error: {e}", "ERROR")
+    
+    def _add_result_fields(self, embed: discord.Embed, result: Dict, groups: List):
+        """追加・削除結果の各グループをフィールドとして追加（不正な名前・パターンはそのまま表示）"""
+        for key, label in groups:
+            domains = result.get(key) or []
+            if domains:
+                qualify = None if key in ("invalid", "unmatched", "missing", "skipped") else self.dns_manager.full_name
+                embed.add_field(
+                    name=f"{label} ({len(domains)})",
+                    value=_format_domain_list(domains, qualify),
+                    inline=False
+                )
 
 def setup(bot):
     """Cogをbotに追加"""
-    bot.add_cog(BulkCommands(bot))
\ No newline at end of file
+    bot.add_cog(BulkCommands(bot, get_services()))
\ No newline at end of file
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+運用・デバッグ用コマンドCog
+"""
+
+import discord
+import asyncio
+import datetime
+import logging
+import os
+from discord.ext import commands
+from typing import Optional
+from profiler import profile_event_loop, sample_threads
+from structured_log import LEVELS, get_log_manager, recent_entries
+from tracing import recent_traces
+from utils import log
+from services import ServiceContainer, get_services
+
+class DebugCommands(commands.Cog):
+    """運用・デバッグ用コマンド"""
+    
+    # Discordのメッセージ上限（コードブロックの記号分を除く）
+    MAX_LENGTH = 1900
+    
+    # プロファイルの最大秒数
+    MAX_PROFILE_SECONDS = 120
+    
+    def __init__(self, bot, services: Optional[ServiceContainer] = None):
+        self.bot = bot
+        self.services = services or get_services()
+        # プロファイラーは同時に1つだけ動かす
+        self._profile_lock = asyncio.Lock()
+    
+    debug_group = discord.SlashCommandGroup(
+        "debug", "デバッグ用コマンド（管理者のみ）",
+        default_member_permissions=discord.Permissions(administrator=True)
+    )
+    
+    @staticmethod
+    def _is_admin(ctx) -> bool:
+        """サーバーの管理者権限を持つユーザーか（コマンド権限の上書きに備えて実行時にも確認）"""
+        permissions = getattr(ctx.author, "guild_permissions", None)
+        return permissions is not None and permissions.administrator
+    
+    @staticmethod
+    def _format_entry(entry: dict) -> str:
+        """ログ1件を1行に整形（付加情報は key=value で続ける）"""
+        fields = " ".join(
+            f"{key}={value}" for key, value in entry.items()
+            if key not in ("time", "level", "levelno", "message", "thread")
+        )
+        line = f"{entry['time'][11:19]} {entry['level'][:4]} {entry['message']}"
+        return f"{line} {fields}" if fields else line
+    
+    @discord.slash_command(name="logs", description="直近のログを表示")
+    @discord.default_permissions(administrator=True)
+    async def logs(
+        self,
+        ctx,
+        level: discord.Option(str, "表示する最低レベル", choices=list(LEVELS), default="INFO"),
+        limit: discord.Option(int, "表示件数", min_value=1, max_value=200, default=30),
+        contains: discord.Option(str, "含まれる文字列（メッセージ・付加情報）", required=False, default=None)
+    ):
+        """リングバッファに残っている直近のログを表示"""
+        entries = recent_entries(limit, level, contains)
+        manager = get_log_manager()
+        header = f"ログ {len(entries)}件（保持 {manager.ring.capacity}件・出力レベル {logging.getLevelName(manager.level)}）"
+        if not entries:
+            await ctx.respond(f"{header}\n該当するログがありません", ephemeral=True)
+            return
+        
+        # 上限を超える場合は新しいログを優先して残す
+        lines = []
+        length = 0
+        for entry in reversed(entries):
+            line = self._format_entry(entry).replace("```", "'''")
+            if length + len(line) + 1 > self.MAX_LENGTH:
+                break
+            lines.append(line)
+            length += len(line) + 1
+        body = "\n".join(reversed(lines))
+        await ctx.respond(f"{header}\n```\n{body}\n```", ephemeral=True)
+    
+    @debug_group.command(name="profile", description="実行中のBotをプロファイルして結果ファイルを添付")
+    async def debug_profile(
+        self,
+        ctx,
+        seconds: discord.Option(int, "計測する秒数", min_value=1, max_value=MAX_PROFILE_SECONDS, default=10),
+        mode: discord.Option(str, "cprofile: イベントループ / sampling: 全スレッドのスタック採取",
+                             choices=["cprofile", "sampling"], default="cprofile")
+    ):
+        """cProfileまたはスタック採取で指定秒数だけ計測し、結果をチャンネルに添付"""
+        if not self._is_admin(ctx):
+            await ctx.respond("❌ このコマンドは管理者のみ実行できます", ephemeral=True)
+            return
+        if self._profile_lock.locked():
+            await ctx.respond("⚠️ 別のプロファイルを実行中です", ephemeral=True)
+            return
+        
+        await ctx.defer()
+        async with self._profile_lock:
+            log(f"プロファイルを開始します: {mode} {seconds}秒 ({ctx.author})", "WARNING")
+            try:
+                if mode == "sampling":
+                    path, summary = await sample_threads(seconds)
+                    filename = f"profile-{datetime.datetime.now():%Y%m%d-%H%M%S}.collapsed.txt"
+                else:
+                    path, summary = await profile_event_loop(seconds)
+                    filename = f"profile-{datetime.datetime.now():%Y%m%d-%H%M%S}.prof"
+            except Exception as e:
+                await ctx.followup.send(f"❌ プロファイルに失敗しました: {str(e)}", ephemeral=True)
+                log(f"Debug profile error: {e}", "ERROR")
+                return
+        
+        try:
+            # 要約はメッセージ上限に収まる範囲だけ表示
+            body = summary.strip()[-self.MAX_LENGTH:]
+            await ctx.followup.send(
+                f"🩺 プロファイル完了（{mode}・{seconds}秒）\n```\n{body}\n```",
+                file=discord.File(path, filename=filename)
+            )
+        finally:
+            os.unlink(path)
+    
+    @debug_group.command(name="traces", description="直近のコマンドの所要時間の内訳を表示")
+    async def debug_traces(
+        self,
+        ctx,
+        limit: discord.Option(int, "表示件数", min_value=1, max_value=25, default=10)
+    ):
+        """直近のスラッシュコマンド・スケジュールジョブのトレースを表示"""
+        if not self._is_admin(ctx):
+            await ctx.respond("❌ このコマンドは管理者のみ実行できます", ephemeral=True)
+            return
+        
+        traces = recent_traces(limit)
+        if not traces:
+            await ctx.respond("記録されたトレースがありません", ephemeral=True)
+            return
+        
+        embed = discord.Embed(title="⏱️ 所要時間の内訳", color=0x0099ff)
+        for trace in traces:
+            slowest = ", ".join(f"{span.name} {span.duration:.2f}s" for span in trace.slowest(3))
+            value = trace.summary()
+            if slowest:
+                value += f"\n最も長いスパン: {slowest}"
+            embed.add_field(name=f"{trace.name} ({trace.started_at:%H:%M:%S})", value=value[:1024], inline=False)
+        await ctx.respond(embed=embed, ephemeral=True)
@@ -6,135 +6,186 @@ DNS管理コマンドCog
 import discord
 from discord.ext import commands
 from typing import Optional
-from dns_manager import CloudflareDNSManager
-from bot_config import Config
+from dns_manager import CloudflareAPIError
+from retry import circuit_breaker_status
+from tracing import traced
 from utils import log
+from services import ServiceContainer, get_services
 
 class DNSCommands(commands.Cog):
     """DNS管理コマンドグループ"""
     
-    def __init__(self, bot):
+    def __init__(self, bot, services: Optional[ServiceContainer] = None):
         self.bot = bot
-        config = Config()
-        self.dns_manager = CloudflareDNSManager(config)
+        # 設定・DNSマネージャー・ワーカーは全Cogで共有（終了処理はコンテナが行う）
+        self.services = services or get_services()
+        self.dns_manager = self.services.dns_manager
+        self.workers = self.services.workers
     
     dns_group = discord.SlashCommandGroup("dns", "DNS管理コマンド")
     
+    # レコードタイプのアイコン
+    TYPE_ICONS = {
+        'A': '🔵',
+        'AAAA': '🟣',
+        'CNAME': '🔶',
+        'MX': '📧',
+        'TXT': '📝',
+        'NS': '🌐',
+        'PTR': '🔄'
+    }
+    
+    def _add_record_field(self, embed: discord.Embed, record: dict):
+        """レコード1件分のフィールドをEmbedに追加"""
+        name = record.get('name', 'N/A')
+        record_type = record.get('type', 'N/A')
+        content = record.get('content', 'N/A')
+        ttl = record.get('ttl', 'N/A')
+        proxied = record.get('proxied', False)
+        
+        # 既定ゾーンのレコード名は短縮表示
+        zones = self.dns_manager.zones
+        short_name = zones.list_name(zones.zone_for(name), name)
+        
+        # フィールドの値を構築（より簡潔に）
+        field_value = f"`{content}` | TTL: {ttl} | Proxied: {'Yes' if proxied else 'No'}"
+        type_icon = self.TYPE_ICONS.get(record_type, '🔸')
+        
+        embed.add_field(
+            name=f"{type_icon} {short_name} ({record_type})",
+            value=field_value,
+            inline=True
+        )
+    
     @dns_group.command(name="list", description="DNSレコード一覧表示")
     async def dns_list(
         self, 
         ctx,
         record_type: Optional[str] = None,
-        name_filter: Optional[str] = None
+        name_filter: Optional[str] = None,
+        content: Optional[str] = None,
+        proxied: Optional[bool] = None,
+        match: str = "all",
+        zone: Optional[str] = None
     ):
-        """DNSレコード一覧を表示"""
+        """DNSレコード一覧を表示（ページ受信ごとに順次送信、zone省略時は全ゾーン）"""
         await ctx.defer()
         
-        try:
-            success, records = self.dns_manager.list_records(record_type, name_filter)
-            
-            if not success:
-                await ctx.followup.send("❌ DNSレコードの取得に失敗しました", ephemeral=True)
-                return
-            
-            if not records:
-                embed = discord.Embed(
-                    title="📋 DNS Records",
-                    description="指定した条件に一致するDNSレコードが見つかりませんでした",
-                    color=0xffaa00
-                )
-                await ctx.followup.send(embed=embed)
+        if match not in ("all", "any"):
+            await ctx.followup.send("❌ match には `all` または `any` を指定してください", ephemeral=True)
+            return
+        
+        target_zone = None
+        if zone:
+            target_zone = self.dns_manager.zones.get(zone)
+            if target_zone is None:
+                await ctx.followup.send(f"❌ ゾーン `{zone}` は管理対象ではありません", ephemeral=True)
                 return
-            
-            # メインEmbedを作成
-            main_embed = discord.Embed(
-                title="📋 DNS Records",
-                description=f"ドメイン: **{self.dns_manager.config.domain}**",
-                color=0x0099ff
+        
+        try:
+            pages = self.dns_manager.iter_record_pages(
+                record_type, name_contains=name_filter, content=content, proxied=proxied, match=match,
+                zone=target_zone
             )
             
-            # フィルタ情報を表示
-            filter_info = []
-            if record_type:
-                filter_info.append(f"タイプ: {record_type}")
-            if name_filter:
-                filter_info.append(f"名前: {name_filter}")
-            
-            if filter_info:
-                main_embed.add_field(name="🔍 フィルタ", value=" | ".join(filter_info), inline=False)
-            
-            main_embed.add_field(name="📊 合計", value=f"{len(records)} 件", inline=True)
-            
             # レコードを20件ずつ表示（embedの制限は25フィールド）
             records_per_page = 20
-            total_pages = (len(records) + records_per_page - 1) // records_per_page
+            # 1メッセージあたり最大10個のembed
+            max_embeds_per_message = 10
             
+            buffer = []
             embeds = []
+            current_zone = None
+            total_count = None
+            total_pages = 1
+            embed_count = 0
+            sent = 0
             
-            for page in range(total_pages):
-                start_idx = page * records_per_page
-                end_idx = min(start_idx + records_per_page, len(records))
-                page_records = records[start_idx:end_idx]
-                
-                if page == 0:
-                    embed = main_embed
-                else:
+            @traced("render.embed")
+            def build_embed(page_records):
+                nonlocal embed_count
+                if embed_count == 0:
                     embed = discord.Embed(
-                        title=f"📋 DNS Records - Page {page + 1}/{total_pages}",
+                        title="📋 DNS Records",
+                        description=f"ドメイン: **{current_zone}**",
                         color=0x0099ff
                     )
-                
-                for record in page_records:
-                    name = record.get('name', 'N/A')
-                    record_type = record.get('type', 'N/A')
-                    content = record.get('content', 'N/A')
-                    ttl = record.get('ttl', 'N/A')
-                    proxied = record.get('proxied', False)
                     
-                    # レコード名を短縮表示
-                    domain = self.dns_manager.config.domain
-                    if name.endswith(f".{domain}"):
-                        short_name = name[:-len(f".{domain}")]
-                    elif name == domain:
-                        short_name = "@"
-                    else:
-                        short_name = name
+                    # フィルタ情報を表示
+                    filter_info = []
+                    if record_type:
+                        filter_info.append(f"タイプ: {record_type}")
+                    if name_filter:
+                        filter_info.append(f"名前: {name_filter}")
+                    if content:
+                        filter_info.append(f"内容: {content}")
+                    if proxied is not None:
+                        filter_info.append(f"Proxied: {'Yes' if proxied else 'No'}")
                     
-                    # フィールドの値を構築（より簡潔に）
-                    field_value = f"`{content}` | TTL: {ttl} | Proxied: {'Yes' if proxied else 'No'}"
+                    if filter_info:
+                        separator = " | " if match == "all" else " または "
+                        embed.add_field(name="🔍 フィルタ", value=separator.join(filter_info), inline=False)
                     
-                    # レコードタイプのアイコン
-                    type_icons = {
-                        'A': '🔵',
-                        'AAAA': '🟣',
-                        'CNAME': '🔶',
-                        'MX': '📧',
-                        'TXT': '📝',
-                        'NS': '🌐',
-                        'PTR': '🔄'
-                    }
-                    type_icon = type_icons.get(record_type, '🔸')
-                    
-                    embed.add_field(
-                        name=f"{type_icon} {short_name} ({record_type})",
-                        value=field_value,
-                        inline=True
+                    embed.add_field(name="📊 合計", value=f"{total_count} 件", inline=True)
+                else:
+                    embed = discord.Embed(
+                        title=f"📋 DNS Records ({current_zone}) - Page {embed_count + 1}/{total_pages}",
+                        color=0x0099ff
                     )
                 
+                for record in page_records:
+                    self._add_record_field(embed, record)
+                
                 if total_pages > 1:
-                    embed.set_footer(text=f"Page {page + 1}/{total_pages}")
+                    embed.set_footer(text=f"Page {embed_count + 1}/{total_pages}")
                 
-                embeds.append(embed)
+                embed_count += 1
+                return embed
+            
+            def flush_buffer():
+                nonlocal buffer
+                if buffer:
+                    embeds.append(build_embed(buffer))
+                    buffer = []
+            
+            # ページ取得はワーカースレッドで進め、受信したページから描画する
+            async for records, result_info in self.workers.iterate(pages):
+                # ゾーンごとに見出しと件数を分けて表示
+                if result_info.get('zone') != current_zone:
+                    flush_buffer()
+                    current_zone = result_info.get('zone')
+                    total_count = result_info.get('total_count', len(records))
+                    total_pages = max(1, (total_count + records_per_page - 1) // records_per_page)
+                    embed_count = 0
+                
+                buffer.extend(records)
+                while len(buffer) >= records_per_page:
+                    embeds.append(build_embed(buffer[:records_per_page]))
+                    buffer = buffer[records_per_page:]
+                
+                # 残りのページを待たずに揃った分から送信
+                for i in range(0, len(embeds), max_embeds_per_message):
+                    await ctx.followup.send(embeds=embeds[i:i + max_embeds_per_message])
+                sent += len(embeds)
+                embeds = []
+            
+            flush_buffer()
+            
+            if sent + len(embeds) == 0:
+                embed = discord.Embed(
+                    title="📋 DNS Records",
+                    description="指定した条件に一致するDNSレコードが見つかりませんでした",
+                    color=0xffaa00
+                )
+                await ctx.followup.send(embed=embed)
+                return
             
-            # 最大10個のembedまで一括送信、それ以上は分割
-            max_embeds_per_message = 10
             for i in range(0, len(embeds), max_embeds_per_message):
-                batch_embeds = embeds[i:i + max_embeds_per_message]
-                if i == 0:
-                    await ctx.followup.send(embeds=batch_embeds)
-                else:
-                    await ctx.followup.send(embeds=batch_embeds)
+                await ctx.followup.send(embeds=embeds[i:i + max_embeds_per_message])
                 
+        except CloudflareAPIError as e:
+            await ctx.followup.send("❌ DNSレコードの取得に失敗しました", ephemeral=True)
+            log(f"DNS list error: {e}", "ERROR")
         except Exception as e:
             await ctx.followup.send(f"❌ エラーが発生しました: {str(e)}", ephemeral=True)
             log(f"DNS list error: {e}", "ERROR")
@@ -153,7 +204,7 @@ class DNSCommands(commands.Cog):
         await ctx.defer()
         
         try:
-            success = self.dns_manager.create_record(name, ip, record_type, ttl, proxy)
+            success = await self.workers.run(self.dns_manager.create_record, name, ip, record_type, ttl, proxy)
             
             if success:
                 embed = discord.Embed(
@@ -184,7 +235,7 @@ class DNSCommands(commands.Cog):
         await ctx.defer()
         
         try:
-            success = self.dns_manager.update_record(name, ip, record_type)
+            success = await self.workers.run(self.dns_manager.update_record, name, ip, record_type)
             
             if success:
                 embed = discord.Embed(
@@ -212,7 +263,7 @@ class DNSCommands(commands.Cog):
         await ctx.defer()
         
         try:
-            success = self.dns_manager.delete_record(name)
+            success = await self.workers.run(self.dns_manager.delete_record, name)
             
             if success:
                 embed = discord.Embed(
@@ -228,6 +279,78 @@ class DNSCommands(commands.Cog):
             await ctx.followup.send(f"❌ エラーが発生しました: {str(e)}", ephemeral=True)
             log(f"DNS delete error: {e}", "ERROR")
 
+    @dns_group.command(name="refresh", description="DNSレコードキャッシュの再読み込み")
+    async def dns_refresh(self, ctx):
+        """ダッシュボード等での変更を反映するためにレコードインデックスを再読み込み"""
+        await ctx.defer()
+        
+        try:
+            success = await self.workers.run(self.dns_manager.refresh_record_index)
+            
+            if success:
+                embed = discord.Embed(
+                    title="✅ DNSレコードキャッシュ再読み込み完了",
+                    color=0x00ff00
+                )
+                for zone in self.dns_manager.zones:
+                    embed.add_field(name=zone.domain, value=f"{len(zone.record_index)} 件", inline=True)
+                await ctx.followup.send(embed=embed)
+            else:
+                await ctx.followup.send("❌ DNSレコードキャッシュの再読み込みに失敗しました", ephemeral=True)
+                
+        except Exception as e:
+            await ctx.followup.send(f"❌ エラーが発生しました: {str(e)}", ephemeral=True)
+            log(f"DNS refresh error: {e}", "ERROR")
+
+    @dns_group.command(name="api-status", description="Cloudflare APIの利用状況表示")
+    async def dns_api_status(self, ctx):
+        """レート制限の残り予算・ワーカープール・サーキットブレーカーの状態を表示"""
+        await ctx.defer(ephemeral=True)
+        
+        try:
+            status = self.dns_manager.rate_limiter.status()
+            
+            color = 0xffaa00 if status["paused_for"] > 0 or status["remaining"] == 0 else 0x0099ff
+            embed = discord.Embed(title="📊 Cloudflare API Status", color=color)
+            embed.add_field(
+                name="レート制限",
+                value=f"{status['requests']} 回 / {status['window']} 秒（補充 {status['rate_per_second']} 回/秒）",
+                inline=False
+            )
+            embed.add_field(name="即時送信可能", value=f"{status['remaining']} / {status['capacity']}", inline=True)
+            embed.add_field(name="停止中", value=f"{status['paused_for']} 秒" if status["paused_for"] > 0 else "なし", inline=True)
+            embed.add_field(name="待機したリクエスト", value=status["throttled"], inline=True)
+            embed.add_field(name="429受信回数", value=status["rate_limited"], inline=True)
+            
+            # ワーカープールの飽和状況
+            workers = self.workers.stats()
+            embed.add_field(
+                name="ワーカープール",
+                value=(
+                    f"実行中 {workers['active']}/{workers['max_workers']} | キュー待ち {workers['queued']}\n"
+                    f"待ち時間 平均 {workers['avg_wait']}秒 / p95 {workers['p95_wait']}秒 / 最大 {workers['max_wait']}秒"
+                ),
+                inline=False
+            )
+            
+            # ホストごとのサーキットブレーカー状態
+            state_icons = {"closed": "🟢", "half_open": "🟡", "open": "🔴"}
+            for host, breaker in circuit_breaker_status().items():
+                lines = [
+                    f"{state_icons.get(breaker['state'], '⚪')} {breaker['state']}"
+                    + (f"（{breaker['retry_in']}秒後に再試行）" if breaker["state"] == "open" else ""),
+                    f"失敗 {breaker['failures']} / リトライ {breaker['retries']} / 即時失敗 {breaker['rejected']}",
+                ]
+                if breaker["last_error"]:
+                    lines.append(f"最終エラー: `{breaker['last_error'][:200]}`")
+                embed.add_field(name=host, value="\n".join(lines), inline=False)
+            
+            await ctx.followup.send(embed=embed, ephemeral=True)
+            
+        except Exception as e:
+            await ctx.followup.send(f"❌ エラーが発生しました: {str(e)}", ephemeral=True)
+            log(f"DNS api-status error: {e}", "ERROR")
+
 def setup(bot):
     """Cogをbotに追加"""
-    bot.add_cog(DNSCommands(bot))
\ No newline at end of file
+    bot.add_cog(DNSCommands(bot, get_services()))
\ No newline at end of file
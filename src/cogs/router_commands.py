@@ -4,38 +4,150 @@
 """
 
 import discord
-from discord.ext import commands, tasks
-import subprocess
-import os
+from discord.ext import commands
 import datetime
 import asyncio
-from bot_config import BotConfig, Config
+import time
+from collections import deque
+from typing import Optional
+from urllib.parse import urlsplit
 from croniter import croniter
 from utils import log
-from dns_manager import CloudflareDNSManager
+from router_job import RouterJob
+from resync_watcher import PostRebootWatcher
+from scheduler import ScheduledJob
+from retry import circuit_breaker_status
+import router_automation
+from services import ServiceContainer, get_services
+from cogs.bulk_commands import build_bulk_update_embed
+
+# スケジュール可能なジョブ
+SCHEDULE_JOBS = {
+    "router_reboot": "ルーター再起動＋ドメイン一括更新",
+    "dns_resync": "ドメイン一括更新",
+    "health_probe": "ヘルスチェック",
+}
+
+class ProgressMessage:
+    """ステータスメッセージの埋め込みに進捗行を追記する
+
+    行が届くたびに編集すると Discord のレート制限に当たるため、
+    前回の編集から interval 秒以上空けてまとめて反映する。
+    """
+    
+    def __init__(self, message: discord.Message, embed: discord.Embed, interval: float = 2.0, max_lines: int = 12):
+        self.message = message
+        self.embed = embed
+        self.interval = interval
+        self.lines = deque(maxlen=max_lines)
+        self._last_edit = 0.0
+        self._pending: Optional[asyncio.Task] = None
+        self._field_index = len(embed.fields)
+        embed.add_field(name="進捗", value="```\n開始待ち...\n```", inline=False)
+    
+    def add_line(self, line: str):
+        """進捗行を追加し、必要なら編集を予約"""
+        if not line:
+            return
+        self.lines.append(line)
+        if self._pending is None or self._pending.done():
+            delay = max(0.0, self.interval - (time.monotonic() - self._last_edit))
+            self._pending = asyncio.get_running_loop().create_task(self._edit_after(delay))
+    
+    async def _edit_after(self, delay: float):
+        await asyncio.sleep(delay)
+        await self._edit()
+    
+    async def _edit(self):
+        self._last_edit = time.monotonic()
+        text = "\n".join(self.lines)[-1000:] or "..."
+        self.embed.set_field_at(self._field_index, name="進捗", value=f"```\n{text}\n```", inline=False)
+        try:
+            await self.message.edit(embed=self.embed)
+        except discord.HTTPException as e:
+            log(f"Progress message edit failed: {e}", "WARNING")
+    
+    async def flush(self):
+        """予約中の編集を取り消し、最新の状態を即時反映"""
+        if self._pending is not None and not self._pending.done():
+            self._pending.cancel()
+        await self._edit()
 
 class RouterCommands(commands.Cog):
     """ルーター管理コマンドグループ"""
     
-    def __init__(self, bot):
+    def __init__(self, bot, services: Optional[ServiceContainer] = None):
         self.bot = bot
-        self.bot_config = BotConfig()
-        self.last_execution_time = None
-        # Initialize DNS manager for bulk updates
-        config = Config()
-        self.dns_manager = CloudflareDNSManager(config)
-        log("Starting scheduler task...", "INFO")
-        self.scheduler_task.start()
+        # 設定・DNSマネージャー・ワーカー・ドライバー・スケジューラーは全Cogで共有
+        self.services = services or get_services()
+        self.bot_config = self.services.config
+        self.dns_manager = self.services.dns_manager
+        self.workers = self.services.workers
+        # ルーター操作用のドライバー（router.driver: selenium=常駐ブラウザ / http=ブラウザなし）
+        self.router_driver = self.services.router_driver
+        if self.bot_config.get_router_selenium_config().get("keep_warm", True):
+            self.bot.loop.create_task(self.warm_router_driver())
+        # 実行中のルーター操作ジョブ（/router cancel の対象）
+        self.current_job: Optional[RouterJob] = None
+        # cronスケジューラー（次回実行時刻まで眠る、実行状態はファイルに保存）
+        self.scheduler = self.services.scheduler
+        self.last_health: Optional[bool] = None
+        self.bot.loop.create_task(self.start_scheduler())
     
     def cog_unload(self):
-        log("Stopping scheduler task...", "INFO")
-        self.scheduler_task.cancel()
+        log("Stopping scheduler...", "INFO")
+        self.scheduler.stop()
+        if self.current_job is not None:
+            self.current_job.cancel()
+    
+    async def warm_router_driver(self):
+        """起動時にブラウザを立ち上げておき、初回実行のコールドスタートを避ける"""
+        await self.bot.wait_until_ready()
+        try:
+            await self.workers.run(self.router_driver.warm)
+        except Exception as e:
+            log(f"Router driver warm-up failed: {e}", "WARNING")
+    
+    async def start_scheduler(self):
+        """Botの準備完了後に設定済みのスケジュールを登録して開始"""
+        await self.bot.wait_until_ready()
+        for name, job_config in self.bot_config.get_schedule_jobs().items():
+            self.register_schedule_job(name, job_config)
+        self.scheduler.start()
+        log("Scheduler started", "INFO")
+    
+    def register_schedule_job(self, name: str, job_config: dict) -> Optional[ScheduledJob]:
+        """ジョブ設定をスケジューラーに反映（無効なジョブは登録解除）"""
+        if name not in SCHEDULE_JOBS:
+            log(f"Unknown schedule job: {name}", "WARNING")
+            return None
+        if not job_config.get("enabled", True) or not job_config.get("cron"):
+            self.scheduler.remove(name)
+            return None
+        try:
+            return self.scheduler.add(
+                name, job_config["cron"],
+                lambda fire_time: self.run_scheduled_job(name, fire_time),
+                overlap=job_config.get("overlap", "skip"),
+                catch_up=job_config.get("catch_up", "skip"),
+                catch_up_window=job_config.get("catch_up_window")
+            )
+        except ValueError as e:
+            log(f"Invalid schedule for {name}: {e}", "ERROR")
+            return None
     
     router_group = discord.SlashCommandGroup("router", "ルーター管理コマンド")
     
-    @router_group.command(name="schedule-update", description="ルーター更新スケジュール設定")
-    async def router_schedule_update(self, ctx, cron_expression: str):
-        """ルーター更新のスケジュールを設定"""
+    @router_group.command(name="schedule-update", description="スケジュール設定")
+    async def router_schedule_update(
+        self,
+        ctx,
+        cron_expression: str,
+        job: discord.Option(str, "対象ジョブ", choices=list(SCHEDULE_JOBS), default="router_reboot"),
+        overlap: discord.Option(str, "実行中に次の時刻が来た場合", choices=list(ScheduledJob.OVERLAP_POLICIES), required=False) = None,
+        catch_up: discord.Option(str, "停止中に過ぎた実行の扱い", choices=list(ScheduledJob.CATCH_UP_POLICIES), required=False) = None
+    ):
+        """ジョブのスケジュールを設定"""
         await ctx.defer()
         
         try:
@@ -43,36 +155,37 @@ class RouterCommands(commands.Cog):
                 await ctx.followup.send("❌ 無効なcron式です。例: `0 9 * * *` (毎日9時)", ephemeral=True)
                 return
             
-            cron = croniter(cron_expression, datetime.datetime.now())
-            next_run = cron.get_next(datetime.datetime)
-            
-            success = self.bot_config.update_router_schedule(cron_expression, ctx.channel.id)
+            fields = {"cron": cron_expression, "channel_id": str(ctx.channel.id), "enabled": True}
+            if overlap:
+                fields["overlap"] = overlap
+            if catch_up:
+                fields["catch_up"] = catch_up
+            success = await self.workers.run(self.bot_config.update_schedule_job, job, **fields)
             
             if not success:
                 await ctx.followup.send("❌ スケジュール設定の更新に失敗しました", ephemeral=True)
                 return
             
-            self.bot_config.reload()
-            
-            # スケジュールタスクを再起動
-            log("Restarting scheduler task with new schedule...", "INFO")
-            if self.scheduler_task.is_running():
-                self.scheduler_task.cancel()
-                log("Cancelled existing scheduler task", "INFO")
+            await self.workers.run(self.bot_config.reload)
             
-            # 少し待ってから再起動
-            await asyncio.sleep(1)
-            self.scheduler_task.start()
-            log(f"Restarted scheduler task with new cron: {cron_expression}", "INFO")
+            # ヒープ上のジョブを置き換え（スケジューラーは止めずに次回時刻を再計算）
+            job_config = self.bot_config.get_schedule_jobs().get(job, fields)
+            scheduled = self.register_schedule_job(job, job_config)
             
             embed = discord.Embed(
                 title="✅ スケジュール設定完了",
-                description=f"ルーター更新スケジュールを設定しました",
+                description=f"{SCHEDULE_JOBS[job]}（`{job}`）のスケジュールを設定しました",
                 color=0x00ff00
             )
             embed.add_field(name="Cron式", value=f"`{cron_expression}`", inline=False)
             embed.add_field(name="ログ送信チャンネル", value=f"<#{ctx.channel.id}>", inline=False)
-            embed.add_field(name="次回実行", value=next_run.strftime("%Y-%m-%d %H:%M:%S"), inline=False)
+            embed.add_field(
+                name="ポリシー",
+                value=f"重複: `{job_config.get('overlap', 'skip')}` / 停止中の実行: `{job_config.get('catch_up', 'skip')}`",
+                inline=False
+            )
+            if scheduled:
+                embed.add_field(name="次回実行", value=scheduled.next_run.strftime("%Y-%m-%d %H:%M:%S"), inline=False)
             
             await ctx.followup.send(embed=embed)
             
@@ -80,15 +193,38 @@ class RouterCommands(commands.Cog):
             await ctx.followup.send(f"❌ エラーが発生しました: {str(e)}", ephemeral=True)
             log(f"Router schedule update error: {e}", "ERROR")
     
+    @router_group.command(name="schedule-disable", description="スケジュール停止")
+    async def router_schedule_disable(
+        self,
+        ctx,
+        job: discord.Option(str, "対象ジョブ", choices=list(SCHEDULE_JOBS), default="router_reboot")
+    ):
+        """ジョブのスケジュールを無効化"""
+        await ctx.defer()
+        
+        try:
+            success = await self.workers.run(self.bot_config.update_schedule_job, job, enabled=False)
+            if not success:
+                await ctx.followup.send("❌ スケジュール設定の更新に失敗しました", ephemeral=True)
+                return
+            
+            await self.workers.run(self.bot_config.reload)
+            self.scheduler.remove(job)
+            await ctx.followup.send(f"⏸️ {SCHEDULE_JOBS[job]}（`{job}`）のスケジュールを停止しました")
+            
+        except Exception as e:
+            await ctx.followup.send(f"❌ エラーが発生しました: {str(e)}", ephemeral=True)
+            log(f"Router schedule disable error: {e}", "ERROR")
+    
     @router_group.command(name="schedule-show", description="スケジュール表示")
     async def router_schedule_show(self, ctx):
         """設定されたスケジュールを表示"""
         await ctx.defer()
         
         try:
-            schedule_config = self.bot_config.get_router_schedule_config()
+            jobs = self.bot_config.get_schedule_jobs()
             
-            if not schedule_config or not schedule_config.get("cron"):
+            if not jobs:
                 embed = discord.Embed(
                     title="📋 スケジュール表示",
                     description="設定されたスケジュールがありません",
@@ -97,22 +233,29 @@ class RouterCommands(commands.Cog):
                 await ctx.followup.send(embed=embed)
                 return
             
-            cron_expr = schedule_config["cron"]
-            cron = croniter(cron_expr, datetime.datetime.now())
-            next_run = cron.get_next(datetime.datetime)
-            
             embed = discord.Embed(
-                title="📋 ルーター更新スケジュール",
+                title="📋 スケジュール",
                 color=0x0099ff
             )
             
-            embed.add_field(name="Cron式", value=f"`{cron_expr}`", inline=False)
-            
-            channel_id = schedule_config.get("channel_id")
-            if channel_id:
-                embed.add_field(name="ログ送信チャンネル", value=f"<#{channel_id}>", inline=False)
-            
-            embed.add_field(name="次回実行", value=next_run.strftime("%Y-%m-%d %H:%M:%S"), inline=False)
+            for name, job_config in jobs.items():
+                scheduled = self.scheduler.get(name)
+                state = self.scheduler.store.get(name) if self.scheduler.store else {}
+                
+                lines = [f"Cron: `{job_config.get('cron', '-')}`"]
+                if job_config.get("channel_id"):
+                    lines.append(f"チャンネル: <#{job_config['channel_id']}>")
+                lines.append(f"重複: `{job_config.get('overlap', 'skip')}` / 停止中の実行: `{job_config.get('catch_up', 'skip')}`")
+                if scheduled:
+                    lines.append(f"次回実行: {scheduled.next_run.strftime('%Y-%m-%d %H:%M:%S')}")
+                else:
+                    lines.append("次回実行: 停止中")
+                if state.get("last_run"):
+                    last_run = datetime.datetime.fromisoformat(state["last_run"])
+                    lines.append(f"前回実行: {last_run.strftime('%Y-%m-%d %H:%M:%S')} ({state.get('last_status', '-')})")
+                
+                icon = "🟢" if scheduled else "⏸️"
+                embed.add_field(name=f"{icon} {SCHEDULE_JOBS.get(name, name)} (`{name}`)", value="\n".join(lines), inline=False)
             
             embed.add_field(
                 name="📝 Cron式の形式",
@@ -131,50 +274,74 @@ class RouterCommands(commands.Cog):
             await ctx.followup.send(f"❌ エラーが発生しました: {str(e)}", ephemeral=True)
             log(f"Router schedule show error: {e}", "ERROR")
     
-    @tasks.loop(minutes=1)
-    async def scheduler_task(self):
-        """スケジュールされたタスクを実行"""
-        try:
-            schedule_config = self.bot_config.get_router_schedule_config()
-            
-            if not schedule_config or not schedule_config.get("cron"):
-                return
-            
-            cron_expr = schedule_config["cron"]
-            channel_id = schedule_config.get("channel_id")
-            
-            if not channel_id or not croniter.is_valid(cron_expr):
-                log("Invalid channel ID or cron expression", "ERROR")
+    @router_group.command(name="cancel", description="実行中のルーター操作を停止")
+    async def router_cancel(self, ctx):
+        """実行中のルーター操作ジョブをキャンセル"""
+        await ctx.defer()
+        
+        job = self.current_job
+        if job is None or not job.running:
+            await ctx.followup.send("ℹ️ 実行中のルーター操作はありません", ephemeral=True)
+            return
+        
+        job.cancel()
+        embed = discord.Embed(
+            title="🛑 ルーター操作をキャンセルしました",
+            description=f"実行方式: `{job.mode}` / 経過時間: {job.elapsed:.1f}秒",
+            color=0xff0000
+        )
+        if job.lines:
+            embed.add_field(name="最後の出力", value=f"```\n{job.lines[-1][:1000]}\n```", inline=False)
+        await ctx.followup.send(embed=embed)
+        log(f"Router job cancelled by {ctx.author}", "WARNING")
+    
+    async def run_scheduled_job(self, name: str, fire_time: datetime.datetime):
+        """スケジューラーから呼ばれるジョブ"""
+        job_config = self.bot_config.get_schedule_jobs().get(name, {})
+        channel_id = job_config.get("channel_id")
+        channel = self.bot.get_channel(int(channel_id)) if channel_id else None
+        log(f"Scheduled job {name} fired (scheduled {fire_time.isoformat()})", "INFO")
+        
+        if name == "router_reboot":
+            if not channel_id:
+                log("Router schedule has no channel ID", "ERROR")
                 return
-            
-            current_time = datetime.datetime.now()
-            normalized_time = current_time.replace(second=0, microsecond=0)
-            
-            # croniterで次の実行時刻を取得
-            cron = croniter(cron_expr, normalized_time - datetime.timedelta(minutes=1))
-            next_run = cron.get_next(datetime.datetime)
-            
-            if next_run == normalized_time:
-                log("Cron time matches! Executing scheduled router update...", "INFO")
-                if (self.last_execution_time is None or 
-                    (current_time - self.last_execution_time).total_seconds() >= 60):
-                    
-                    self.last_execution_time = current_time
-                    await self.execute_scheduled_router_update(channel_id, schedule_config)
-                else:
-                    log("Skipping execution - too soon after last execution", "INFO")
-                    
-        except Exception as e:
-            log(f"Scheduler task error: {e}", "ERROR")
+            await self.execute_scheduled_router_update(channel_id, job_config)
+        elif name == "dns_resync":
+            await self.execute_dns_resync(channel)
+        elif name == "health_probe":
+            await self.execute_health_probe(channel)
     
-    @scheduler_task.before_loop
-    async def before_scheduler_task(self):
-        await self.bot.wait_until_ready()
-        log("Scheduler task is ready to start", "INFO")
+    async def execute_dns_resync(self, channel):
+        """定期的なドメイン一括更新（変更・失敗があった場合のみ通知）"""
+        success, result = await self.dns_manager.bulk_update_records()
+        log(f"Scheduled DNS resync: updated={len(result['updated'])} failed={len(result['failed'])}", "INFO")
+        if channel and (result["updated"] or not success):
+            embed = build_bulk_update_embed(
+                result, self.dns_manager.full_name,
+                "🔁 定期ドメイン一括更新", "公開IPの変化を検出したためDNSレコードを更新しました",
+                0x00ff00 if success else 0xffaa00
+            )
+            await channel.send(embed=embed)
     
-    @scheduler_task.error
-    async def scheduler_task_error(self, error):
-        log(f"Scheduler task loop error: {error}", "ERROR")
+    async def execute_health_probe(self, channel):
+        """ゲートウェイ・公開IP・APIの状態を確認（状態が変わった場合のみ通知）"""
+        gateway_ok = await self.build_resync_watcher().gateway_reachable()
+        ip = await self.dns_manager.ip_resolver.resolve_async(force_refresh=True)
+        open_breakers = [name for name, status in circuit_breaker_status().items() if status["state"] != "closed"]
+        healthy = gateway_ok and ip is not None and not open_breakers
+        log(f"Health probe: gateway={gateway_ok} ip={ip} open_breakers={open_breakers}", "INFO" if healthy else "WARNING")
+        
+        if channel and healthy != self.last_health and (self.last_health is not None or not healthy):
+            embed = discord.Embed(
+                title="💚 ヘルスチェック: 正常" if healthy else "💔 ヘルスチェック: 異常",
+                color=0x00ff00 if healthy else 0xff0000
+            )
+            embed.add_field(name="ゲートウェイ", value="✅ 到達可能" if gateway_ok else "❌ 到達不可", inline=True)
+            embed.add_field(name="公開IP", value=ip or "❌ 取得失敗", inline=True)
+            embed.add_field(name="サーキットブレーカー", value=", ".join(open_breakers) or "すべてclosed", inline=False)
+            await channel.send(embed=embed)
+        self.last_health = healthy
     
     async def execute_scheduled_router_update(self, channel_id, schedule_config):
         """スケジュールされたルーター更新を実行"""
@@ -191,58 +358,93 @@ class RouterCommands(commands.Cog):
                 description="コミュファ光の接続設定を更新中です",
                 color=0xffaa00
             )
-            embed.add_field(name="Cron式", value=f"`{schedule_config['cron']}`", inline=False)
+            embed.add_field(name="Cron式", value=f"`{schedule_config.get('cron', '-')}`", inline=False)
             embed.add_field(name="実行時刻", value=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), inline=False)
             
-            status_message = await channel.send(embed=embed)
-            
-            script_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "router_automation.py")
+            if self.current_job is not None and self.current_job.running:
+                log("Skipping scheduled router update - another router job is running", "WARNING")
+                return
             
-            result = subprocess.run(
-                ["python3", script_path],
-                capture_output=True,
-                text=True,
-                timeout=300
-            )
+            status_message = await channel.send(embed=embed)
+            progress = ProgressMessage(status_message, embed, interval=self.bot_config.router.progress_interval)
+            
+            # ルーター操作を実行し、出力を1行ずつステータスメッセージに反映
+            job = RouterJob(self.bot_config.router.execution, on_line=progress.add_line)
+            self.current_job = job
+            # 再起動後のIP変化を判定するため、実行前の公開IPを控えておく
+            previous_ip = await self.dns_manager.ip_resolver.resolve_async()
+            reboot_started = time.monotonic()
+            try:
+                success = await job.run(
+                    self.workers, self.router_driver, router_automation.DEBUG,
+                    timeout=self.bot_config.router.job_timeout
+                )
+            finally:
+                await progress.flush()
+            output = "\n".join(job.lines)
+            
+            if job.state == RouterJob.CANCELLED:
+                log(f"Scheduled router update cancelled - Channel: {channel_id}", "WARNING")
+                await channel.send(embed=discord.Embed(
+                    title="🛑 スケジュールされたルーター更新を中止しました",
+                    description="ドメイン一括更新は実行しません",
+                    color=0xff0000
+                ))
+                return
             
-            if result.returncode == 0:
+            if success:
                 embed = discord.Embed(
                     title="✅ スケジュールされたルーター更新完了",
-                    description="コミュファ光の接続設定更新が完了しました\n\n3分後にドメイン一括更新を実行します...",
+                    description="コミュファ光の接続設定更新が完了しました\n\n回線の復旧を確認後、ドメイン一括更新を実行します...",
                     color=0x00ff00
                 )
-                if result.stdout:
-                    output = result.stdout[-1000:] if len(result.stdout) > 1000 else result.stdout
+                if output:
+                    output = output[-1000:] if len(output) > 1000 else output
                     embed.add_field(name="実行結果", value=f"```\n{output}\n```", inline=False)
                 
                 # Send router update completion message immediately
                 await channel.send(embed=embed)
                 log(f"Scheduled router update completed successfully - Channel: {channel_id}", "INFO")
                 
-                # Wait 3 minutes before executing bulk domain update
-                log("Waiting 3 minutes before bulk domain update...", "INFO")
-                await asyncio.sleep(180)
+                # 新しい公開IPが安定するまで待ってから一括更新（DEBUGモードでは再起動しないので待たない）
+                resync = None
+                if not router_automation.DEBUG:
+                    log("Waiting for WAN to come back before bulk domain update...", "INFO")
+                    resync = await self.build_resync_watcher().wait(previous_ip, reboot_started)
+                    log(f"Post-reboot resync: {resync}", "INFO")
+                    # 安定した新IPを確認できなかった場合は、再起動前のIPや未確定のIPを書き込まないよう中止する
+                    if resync["status"] == PostRebootWatcher.TIMEOUT:
+                        if resync["ip"] is None:
+                            reason = "公開IPを取得できないため"
+                        else:
+                            reason = f"公開IP（最終取得: {resync['ip']}）が安定しなかったため"
+                        await channel.send(embed=discord.Embed(
+                            title="⏰ 回線の復旧を確認できませんでした",
+                            description=f"{resync['waited_seconds']:.0f}秒待機しましたが{reason}、ドメイン一括更新は実行しません",
+                            color=0xff0000
+                        ))
+                        return
                 
                 # Automatically trigger bulk domain update after successful router update
-                await self.execute_bulk_domain_update(channel)
+                await self.execute_bulk_domain_update(channel, resync)
             else:
                 embed = discord.Embed(
                     title="❌ スケジュールされたルーター更新失敗",
                     description="ルーター設定更新中にエラーが発生しました",
                     color=0xff0000
                 )
-                if result.stderr:
-                    error_output = result.stderr[-1000:] if len(result.stderr) > 1000 else result.stderr
+                if output:
+                    error_output = output[-1000:] if len(output) > 1000 else output
                     embed.add_field(name="エラー詳細", value=f"```\n{error_output}\n```", inline=False)
                 
                 # Send router update failure message immediately
                 await channel.send(embed=embed)
-                log(f"Scheduled router update failed - Channel: {channel_id}, Error: {result.stderr}", "ERROR")
+                log(f"Scheduled router update failed - Channel: {channel_id}, Output: {output}", "ERROR")
             
-        except subprocess.TimeoutExpired:
+        except asyncio.TimeoutError:
             embed = discord.Embed(
                 title="⏰ スケジュールされたルーター更新タイムアウト",
-                description="ルーター設定更新がタイムアウトしました（5分）",
+                description=f"ルーター設定更新がタイムアウトしました（{self.bot_config.router.job_timeout}秒）",
                 color=0xffaa00
             )
             if channel:
@@ -259,51 +461,50 @@ class RouterCommands(commands.Cog):
                 )
                 await channel.send(embed=embed)
     
-    async def execute_bulk_domain_update(self, channel):
+    def build_resync_watcher(self) -> PostRebootWatcher:
+        """router.resync設定から再起動後の監視を生成（ゲートウェイの既定値はルーターのアドレス）"""
+        resync = self.bot_config.router.resync
+        # router_ipは host[:port] のほか http://host のようにスキームを含む場合もある
+        router_ip = self.router_driver.router_ip
+        address = urlsplit(router_ip if "://" in router_ip else f"//{router_ip}")
+        default_port = 443 if address.scheme == "https" else 80
+        return PostRebootWatcher(
+            self.dns_manager.ip_resolver,
+            resync.gateway or address.hostname,
+            port=resync.port or address.port or default_port,
+            interval=resync.interval,
+            stable_checks=resync.stable_checks,
+            timeout=resync.timeout
+        )
+    
+    async def execute_bulk_domain_update(self, channel, resync=None):
         """ルーター更新後の自動ドメイン一括更新を実行"""
         try:
             log("Executing automatic bulk domain update after router update", "INFO")
             
-            # 現在のIPアドレスを取得
-            from utils import get_current_ip
-            current_ip = get_current_ip(self.dns_manager.config.ip_services)
-            
             # 一括更新を実行
-            success, successful_domains, failed_domains = await self.dns_manager.bulk_update_records()
+            success, result = await self.dns_manager.bulk_update_records()
             
             if success:
-                embed = discord.Embed(
-                    title="✅ ドメイン一括更新完了",
-                    description=f"すべてのドメインが新しいIPアドレスで更新されました\n**更新先IPアドレス:** `{current_ip}`",
-                    color=0x00ff00
+                embed = build_bulk_update_embed(
+                    result, self.dns_manager.full_name,
+                    "✅ ドメイン一括更新完了", "すべてのドメインが新しいIPアドレスで更新されました", 0x00ff00
                 )
-                if successful_domains:
-                    embed.add_field(
-                        name="✅ 更新成功",
-                        value=f"• " + f"\n• ".join([f"{d}.{self.dns_manager.config.domain}" for d in successful_domains]),
-                        inline=False
-                    )
                 log("Automatic bulk domain update completed successfully", "INFO")
             else:
-                embed = discord.Embed(
-                    title="⚠️ ドメイン一括更新完了（一部失敗）",
-                    description=f"一部のドメインの更新に失敗しました\n**更新先IPアドレス:** `{current_ip}`",
-                    color=0xffaa00
+                embed = build_bulk_update_embed(
+                    result, self.dns_manager.full_name,
+                    "⚠️ ドメイン一括更新完了（一部失敗）", "一部のドメインの更新に失敗しました", 0xffaa00
                 )
-                if successful_domains:
-                    embed.add_field(
-                        name="✅ 更新成功",
-                        value=f"• " + f"\n• ".join([f"{d}.{self.dns_manager.config.domain}" for d in successful_domains]),
-                        inline=False
-                    )
-                if failed_domains:
-                    embed.add_field(
-                        name="❌ 更新失敗",
-                        value=f"• " + f"\n• ".join([f"{d}.{self.dns_manager.config.domain}" for d in failed_domains]),
-                        inline=False
-                    )
                 log("Automatic bulk domain update completed with some failures", "WARNING")
             
+            if resync is not None:
+                status = {"changed": "IP変更", "unchanged": "IP変更なし", "timeout": "タイムアウト"}[resync["status"]]
+                embed.add_field(
+                    name="回線断",
+                    value=f"{resync['outage_seconds']:.0f}秒 ({status}: {resync['previous_ip']} → {resync['ip']}, 待機 {resync['waited_seconds']:.0f}秒)",
+                    inline=False
+                )
             await channel.send(embed=embed)
             
         except Exception as e:
@@ -314,12 +515,7 @@ class RouterCommands(commands.Cog):
                 color=0xff0000
             )
             await channel.send(embed=embed)
-    
-    @scheduler_task.before_loop
-    async def before_scheduler_task(self):
-        """スケジューラー開始前にBotの準備を待つ"""
-        await self.bot.wait_until_ready()
 
 def setup(bot):
     """Cogをbotに追加"""
-    bot.add_cog(RouterCommands(bot))
\ No newline at end of file
+    bot.add_cog(RouterCommands(bot, get_services()))
\ No newline at end of file
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Coalescing, file-locked writer for bot_config.json
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import fcntl
+    FILE_LOCK_AVAILABLE = True
+except ImportError:
+    FILE_LOCK_AVAILABLE = False
+
+from utils import atomic_write_json, log
+
+ConfigMutation = Callable[[Dict[str, Any]], None]
+
+class _WriteBatch:
+    """1回の書き込みにまとめる変更"""
+
+    def __init__(self):
+        self.mutations: List[ConfigMutation] = []
+        self.done = threading.Event()
+        self.success = False
+
+class ConfigWriter:
+    """設定ファイルへの変更をまとめて書き込むクラス
+
+    最初の変更から window 秒以内に届いた変更は1回の書き込みにまとめ、
+    呼び出し元はその書き込みが終わるまで待つ。書き込みはロックファイル
+    （fcntl.flock）でBotとCLIなど他プロセスとも直列化し、ロック中に
+    最新の内容を読み直してから変更を適用する。読み書きするのは環境変数を
+    置換する前の内容なので ${VAR} の記述はそのまま残る。
+    """
+
+    def __init__(self, path: str, window: float = 0.2):
+        self.path = path
+        self.window = window
+        self.lock_path = f"{path}.lock"
+        self.writes = 0
+        self.changes = 0
+        self._batch_lock = threading.Lock()
+        self._batch: Optional[_WriteBatch] = None
+        # fcntlが使えない環境でもプロセス内の書き込みは直列化する
+        self._write_lock = threading.Lock()
+
+    def update(self, mutation: ConfigMutation) -> bool:
+        """設定の辞書を変更する関数を登録し、書き込み完了まで待つ"""
+        with self._batch_lock:
+            batch = self._batch
+            leader = batch is None
+            if leader:
+                batch = self._batch = _WriteBatch()
+            batch.mutations.append(mutation)
+
+        if not leader:
+            batch.done.wait()
+            return batch.success
+
+        if self.window > 0:
+            time.sleep(self.window)
+        with self._batch_lock:
+            # 以降に届いた変更は次の書き込みに回す
+            self._batch = None
+        try:
+            batch.success = self._commit(batch.mutations)
+        finally:
+            batch.done.set()
+        return batch.success
+
+    @contextmanager
+    def _file_lock(self):
+        if not FILE_LOCK_AVAILABLE:
+            yield
+            return
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _read_raw(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _commit(self, mutations: List[ConfigMutation]) -> bool:
+        try:
+            with self._write_lock, self._file_lock():
+                # 壊れたファイルは上書きせずに失敗させる（ValueError）
+                config = self._read_raw()
+                for mutation in mutations:
+                    mutation(config)
+                atomic_write_json(self.path, config)
+        except Exception as e:
+            log(f"設定ファイルの書き込みに失敗しました: {self.path}: {e}", "ERROR")
+            return False
+
+        self.writes += 1
+        self.changes += len(mutations)
+        if len(mutations) > 1:
+            log(f"{len(mutations)}件の設定変更を1回で書き込みました")
+        return True
@@ -8,19 +8,77 @@ from discord.ext import commands
 import os
 import traceback
 from dotenv import load_dotenv
-from bot_config import Config
+from services import ServiceContainer, get_services
+from tracing import span, start_trace
 
 # .envファイルを読み込む
 load_dotenv()
 
-# Bot設定
+class _TracedFollowup:
+    """followup Webhookの送信をdiscordスパンで囲むラッパー"""
+    
+    def __init__(self, webhook: discord.Webhook):
+        self._webhook = webhook
+    
+    def __getattr__(self, name):
+        return getattr(self._webhook, name)
+    
+    async def send(self, *args, **kwargs):
+        with span("discord.followup"):
+            return await self._webhook.send(*args, **kwargs)
+
+class TracedContext(discord.ApplicationContext):
+    """Discordへの応答（defer・respond・followup）をスパンとして記録するコンテキスト"""
+    
+    @property
+    def defer(self):
+        defer = super().defer
+        
+        async def traced_defer(*args, **kwargs):
+            with span("discord.defer"):
+                return await defer(*args, **kwargs)
+        return traced_defer
+    
+    async def respond(self, *args, **kwargs):
+        with span("discord.respond"):
+            return await super().respond(*args, **kwargs)
+    
+    @property
+    def followup(self):
+        return _TracedFollowup(super().followup)
+
+class NetopsBot(commands.Bot):
+    """共有サービスを保持し、終了時に停止するBot
+    
+    スラッシュコマンドは1回ごとにトレースし、Discord・IP取得・Cloudflare・
+    描画などに費やした時間の内訳をログに出力する。
+    """
+    
+    def __init__(self, services: ServiceContainer, **kwargs):
+        super().__init__(**kwargs)
+        self.services = services
+    
+    async def get_application_context(self, interaction: discord.Interaction, cls=TracedContext):
+        return await super().get_application_context(interaction, cls=cls)
+    
+    async def invoke_application_command(self, ctx: discord.ApplicationContext):
+        slow_threshold = self.services.config.get('discord.trace_slow_threshold', 1.0)
+        with start_trace(f"/{ctx.command.qualified_name}", slow_threshold, user=str(ctx.author)):
+            await super().invoke_application_command(ctx)
+    
+    async def close(self):
+        await self.services.aclose()
+        await super().close()
+
+# Bot設定（設定・DNSマネージャー等は全Cogで1つを共有）
+services = get_services()
 intents = discord.Intents.default()
-bot = commands.Bot(command_prefix='!', intents=intents)
+bot = NetopsBot(services, command_prefix='!', intents=intents)
 
 # 設定の検証
-config = Config()
+config = services.config
 if not config.validate():
-    print("エラー: ZONE_ID と API_TOKEN を設定してください")
+    print("エラー: API_TOKEN とドメイン（domain または zones）を設定してください")
     exit(1)
 
 # Cogsの読み込み
@@ -30,10 +88,12 @@ def load_cogs():
         from cogs.dns_commands import DNSCommands
         from cogs.bulk_commands import BulkCommands
         from cogs.router_commands import RouterCommands
+        from cogs.debug_commands import DebugCommands
         
-        bot.add_cog(DNSCommands(bot))
-        bot.add_cog(BulkCommands(bot))
-        bot.add_cog(RouterCommands(bot))
+        bot.add_cog(DNSCommands(bot, services))
+        bot.add_cog(BulkCommands(bot, services))
+        bot.add_cog(RouterCommands(bot, services))
+        bot.add_cog(DebugCommands(bot, services))
         
         print("Cogsを読み込みました")
     except Exception as e:
@@ -46,6 +106,10 @@ async def on_ready():
     print(f'{bot.user} がログインしました!')
     print(f'サーバー数: {len(bot.guilds)}')
     
+    # 設定ファイルの変更を再起動なしで反映
+    services.start_config_watcher()
+    services.start_metrics_server()
+    
     # コマンドを同期
     try:
         await bot.sync_commands()
@@ -3,47 +3,258 @@
 Cloudflare DNS Manager Core Class
 """
 
-from typing import Dict, List, Optional, Tuple
-from bot_config import Config
-from utils import log, get_current_ip, validate_ipv4, make_request, format_record_table
-from domain_list_manager import DomainListManager
+import asyncio
+import fnmatch
+import functools
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlencode
+from bot_config import Config, ConfigSnapshot
+from utils import log, validate_ipv4, make_request, CloudflareAPIError
+from structured_log import log_context
+from metrics import BULK_RECORDS, BULK_SECONDS, DNS_CHANGE_SECONDS
+from tracing import traced
+from domain_list_manager import DomainListManager, is_glob, normalize_domain_name
+from record_index import ZoneRecordIndex, INDEX_PAGE_SIZE
+from async_client import AsyncCloudflareClient
+from zones import Zone, ZoneRegistry
+from ip_resolver import get_ip_resolver
+from rate_limiter import get_rate_limiter
+from retry import RetryPolicy, configure_circuit_breakers
+
+def _bulk_metrics(operation: str):
+    """一括操作の所要時間と件数をメトリクスに記録するデコレーター"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with BULK_SECONDS.time(operation=operation, result="error") as labels:
+                result = await func(*args, **kwargs)
+                labels["result"] = "ok" if result[0] else "partial"
+            if isinstance(result[1], dict):
+                # bulk_update_records: 結果の辞書
+                outcomes = {key: len(result[1][key]) for key in ("updated", "unchanged", "missing", "failed")}
+            else:
+                outcomes = {"succeeded": len(result[1]), "failed": len(result[2])}
+            for outcome, count in outcomes.items():
+                BULK_RECORDS.inc(count, operation=operation, outcome=outcome)
+            return result
+        return wrapper
+    return decorator
 
 class CloudflareDNSManager:
-    """Cloudflare DNS管理のメインクラス"""
+    """Cloudflare DNS管理のメインクラス
+    
+    レコード名は完全名（FQDN）または既定ゾーンからの相対名で指定し、
+    担当ゾーンに振り分けて処理する。
+    """
     
     def __init__(self, config: Config):
         self.config = config
         self.domain_manager = DomainListManager(config)
+        self.zones = ZoneRegistry(config.zones, config.zone_cache_path, config.record_cache_ttl)
+        self._index_load_lock = threading.Lock()
+        # Zone IDの取得はゾーンごとに直列化する（遅いゾーンが他のゾーンを待たせないように）
+        self._discovery_locks: Dict[str, threading.Lock] = {}
+        self._discovery_locks_guard = threading.Lock()
+        # 非同期処理用クライアント（ゾーンとレコードインデックスを共有）
+        self.async_client = AsyncCloudflareClient(config, self.zones)
+        # Cloudflare APIのレート制限はプロセス全体で共有
+        self.rate_limiter = get_rate_limiter(*config.rate_limit)
+        self.retry_policy = RetryPolicy(*config.retry_settings)
+        configure_circuit_breakers(*config.circuit_breaker_settings)
+        # IPアドレスのキャッシュはプロセス内で共有
+        self.ip_resolver = get_ip_resolver(config.ip_services, config.ip_timeout, config.ip_quorum, config.ip_cache_ttl)
+        config.add_listener(self.apply_config)
+    
+    def apply_config(self, snapshot: ConfigSnapshot):
+        """再読み込みされた設定をレート制限・リトライ・キャッシュ・ドメインリストに反映"""
+        cf = snapshot.cloudflare
+        self.rate_limiter.configure(*cf.rate_limit)
+        self.retry_policy = RetryPolicy(*cf.retry_settings)
+        self.async_client.retry_policy = self.retry_policy
+        configure_circuit_breakers(*cf.circuit_breaker_settings)
+        self.ip_resolver.configure(list(cf.ip_services), cf.ip_timeout, cf.ip_quorum, cf.ip_cache_ttl)
+        # ドメインかZone IDが変わったゾーンは新しいインデックスで読み直す
+        self.zones.configure(cf.zones, cf.record_cache_ttl)
+        self.domain_manager.sync(snapshot.target_domains)
     
     def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None) -> Tuple[bool, Dict]:
         """Cloudflare APIへのリクエスト実行"""
         url = f"{self.config.base_url}{endpoint}"
-        return make_request(method, url, self.config.get_headers(), data, self.config.request_timeout)
+        return make_request(method, url, self.config.get_headers(), data, self.config.request_timeout,
+                            rate_limiter=self.rate_limiter, retry_policy=self.retry_policy)
     
-    def list_records(self, record_type: Optional[str] = None, name_filter: Optional[str] = None) -> Tuple[bool, List[Dict]]:
-        """DNSレコードの一覧表示"""
-        log("DNSレコードを取得中...")
+    @property
+    def record_index(self) -> ZoneRecordIndex:
+        """既定ゾーンのレコードインデックス"""
+        return self.zones.default.record_index
+    
+    def full_name(self, name: str) -> str:
+        """レコード名（完全名または既定ゾーンからの相対名）から完全なレコード名を構築"""
+        return self.zones.full_name(name)
+    
+    def _ensure_zone(self, zone: Zone) -> bool:
+        """Zone IDが未設定なら /zones?name= で取得（結果はキャッシュファイルに保存）"""
+        if zone.zone_id:
+            return True
+        with self._discovery_locks_guard:
+            lock = self._discovery_locks.setdefault(zone.domain, threading.Lock())
+        with lock:
+            if zone.zone_id:
+                return True
+            success, response = self._make_request("GET", self.zones.discovery_endpoint(zone))
+            return self.zones.record_discovery(zone, success, response)
+    
+    def discover_zones(self) -> bool:
+        """Zone IDが未設定の全ゾーンを調べる"""
+        return all([self._ensure_zone(zone) for zone in self.zones])
+    
+    def _fetch_all_records(self, zone: Zone) -> Tuple[bool, List[Dict]]:
+        """ゾーン内の全レコードをページングしながら取得"""
+        try:
+            return True, list(self.iter_records(per_page=INDEX_PAGE_SIZE, zone=zone))
+        except CloudflareAPIError as e:
+            log(f"DNSレコード取得に失敗: {zone.domain}: {e}", "ERROR")
+            return False, []
+    
+    @traced("dns.load_index")
+    def refresh_record_index(self, force: bool = True, zone: Optional[Zone] = None) -> bool:
+        """レコードインデックスを再読み込み（force=FalseならTTL切れの場合のみ、zone省略時は全ゾーン）"""
+        if zone is None:
+            return all([self.refresh_record_index(force, z) for z in self.zones])
         
-        endpoint = f"/zones/{self.config.zone_id}/dns_records"
-        params = []
+        if not force and not zone.record_index.is_stale():
+            return True
         
-        if record_type:
-            params.append(f"type={record_type}")
+        # 並列実行時に同時に複数回読み込まないよう直列化
+        with self._index_load_lock:
+            if not force and not zone.record_index.is_stale():
+                return True
+            
+            log(f"ゾーンのレコードインデックスを読み込み中: {zone.domain}")
+            success, records = self._fetch_all_records(zone)
+            if not success:
+                return False
+            
+            zone.record_index.replace(records)
+            log(f"レコードインデックスを読み込みました: {zone.domain} {len(records)}件")
+            return True
+    
+    def _find_records(self, full_name: str, record_type: Optional[str] = None) -> Tuple[bool, List[Dict]]:
+        """レコードインデックスから対象レコードを検索"""
+        zone = self.zones.zone_for(full_name)
+        if not self.refresh_record_index(force=False, zone=zone):
+            return False, []
+        return True, zone.record_index.lookup(full_name, record_type)
+    
+    def match_record_names(self, pattern: str, record_type: Optional[str] = "A") -> Tuple[bool, List[str]]:
+        """ワイルドカードに一致するレコード名を取得
         
-        if params:
-            endpoint += "?" + "&".join(params)
+        パターンの末尾がゾーンのドメインならそのゾーン、それ以外は既定ゾーンから探し、
+        ドメインリストに保存する形（既定ゾーンは相対名、それ以外は完全名）で返す。
+        """
+        zone, pattern = self.zones.route(pattern)
+        if not self.refresh_record_index(force=False, zone=zone):
+            return False, []
         
-        success, response = self._make_request("GET", endpoint)
+        names = [self.zones.list_name(zone, full_name) for full_name in zone.record_index.names(record_type)
+                 if fnmatch.fnmatchcase(full_name, pattern)]
+        return True, names
+    
+    def add_target_domains(self, names: List[str], record_type: Optional[str] = "A") -> Tuple[bool, Dict[str, List[str]]]:
+        """ドメインをまとめて一括更新リストに追加（ワイルドカードはゾーン内のレコード名に展開）
         
-        if not success:
-            log(f"DNSレコード取得に失敗: {response.get('error', 'Unknown error')}", "ERROR")
-            return False, []
+        Returns:
+            Tuple[bool, Dict]: (成功フラグ, 結果)
+                結果は added, existing, invalid, unmatched（一致するレコードがないパターン）,
+                skipped（パターンに一致したがリストに登録できない名前。*.example.com など）
+        """
+        expanded, unmatched, skipped = [], [], []
+        zone_domains = self.config.zone_domains
+        for name in names:
+            if not is_glob(name):
+                expanded.append(name)
+                continue
+            success, matched = self.match_record_names(name, record_type)
+            if not success:
+                return False, {"added": [], "existing": [], "invalid": [], "unmatched": [name], "skipped": []}
+            if not matched:
+                unmatched.append(name)
+            # 入力された名前と違い、展開結果の不正な名前（ワイルドカードレコード）は追加全体を中止せず除外する
+            for matched_name in matched:
+                if normalize_domain_name(matched_name, zone_domains) is None:
+                    skipped.append(matched_name)
+                else:
+                    expanded.append(matched_name)
         
-        records = response.get('result', [])
+        if expanded:
+            success, result = self.domain_manager.add_domains(expanded)
+        else:
+            success, result = False, {"added": [], "existing": [], "invalid": []}
+        result["unmatched"] = unmatched
+        result["skipped"] = skipped
+        return success, result
+    
+    def iter_record_pages(self, record_type: Optional[str] = None, name: Optional[str] = None,
+                          name_contains: Optional[str] = None, content: Optional[str] = None,
+                          proxied: Optional[bool] = None, match: str = "all",
+                          per_page: Optional[int] = None, zone: Optional[Zone] = None) -> Iterator[Tuple[List[Dict], Dict]]:
+        """DNSレコードをページ単位で取得するジェネレータ
+        
+        フィルタはすべてAPI側で適用し、1ページ受信するごとに
+        (レコード一覧, result_info) を返す。zoneを省略した場合、nameがあれば
+        その担当ゾーン、なければ全ゾーンを順に取得する。result_infoには
+        取得元のゾーン（zone）を追加する。
+        
+        Raises:
+            CloudflareAPIError: ページの取得に失敗した場合
+        """
+        params = {"per_page": per_page or self.config.list_per_page, "match": match}
+        if record_type:
+            params["type"] = record_type
+        if name:
+            zone, params["name"] = self.zones.route(name)
+        if name_contains:
+            params["name.contains"] = name_contains
+        if content:
+            params["content"] = content
+        if proxied is not None:
+            params["proxied"] = "true" if proxied else "false"
+        
+        for target in [zone] if zone is not None else list(self.zones):
+            if not self._ensure_zone(target):
+                raise CloudflareAPIError(f"Zone IDを取得できません: {target.domain}")
+            
+            page = 1
+            while True:
+                params["page"] = page
+                endpoint = f"{target.dns_records_path}?{urlencode(params)}"
+                success, response = self._make_request("GET", endpoint)
+                
+                if not success:
+                    raise CloudflareAPIError(response.get('error') or response.get('errors') or 'Unknown error')
+                
+                result_info = dict(response.get('result_info', {}), zone=target.domain)
+                yield response.get('result', []), result_info
+                
+                if page >= result_info.get('total_pages', 1):
+                    break
+                page += 1
+    
+    def iter_records(self, *args, **kwargs) -> Iterator[Dict]:
+        """DNSレコードを1件ずつ返すジェネレータ（引数はiter_record_pagesと同じ）"""
+        for records, _ in self.iter_record_pages(*args, **kwargs):
+            yield from records
+    
+    def list_records(self, record_type: Optional[str] = None, name_filter: Optional[str] = None) -> Tuple[bool, List[Dict]]:
+        """DNSレコードの一覧表示"""
+        log("DNSレコードを取得中...")
         
-        # 名前でフィルタリング
-        if name_filter:
-            records = [r for r in records if name_filter.lower() in r.get('name', '').lower()]
+        try:
+            records = list(self.iter_records(record_type, name_contains=name_filter))
+        except CloudflareAPIError as e:
+            log(f"DNSレコード取得に失敗: {e}", "ERROR")
+            return False, []
         
         log(f"取得したDNSレコード数: {len(records)}")
         return True, records
@@ -51,262 +262,372 @@ class CloudflareDNSManager:
     def create_record(self, name: str, content: Optional[str] = None, record_type: str = "A", 
                      ttl: int = 60, proxied: bool = False) -> bool:
         """新しいDNSレコードを作成"""
-        # 完全なレコード名を構築
-        if not name.endswith(self.config.domain):
-            full_name = f"{name}.{self.config.domain}" if name != "@" else self.config.domain
-        else:
-            full_name = name
-        
-        # コンテンツの処理
-        if content is None:
-            if record_type == "A":
-                log("IPアドレスが指定されていないため、現在のIPを取得します")
-                content = get_current_ip(self.config.ip_services)
-                if content is None:
-                    log("現在のIPアドレスを取得できませんでした", "ERROR")
+        # 担当ゾーンと完全なレコード名
+        zone, full_name = self.zones.route(name)
+        with log_context(domain=full_name):
+            # コンテンツの処理
+            if content is None:
+                if record_type == "A":
+                    log("IPアドレスが指定されていないため、現在のIPを取得します")
+                    content = self.ip_resolver.resolve()
+                    if content is None:
+                        log("現在のIPアドレスを取得できませんでした", "ERROR")
+                        return False
+                    log(f"取得したIPアドレス: {content}")
+                else:
+                    log(f"{record_type}レコードにはcontentの指定が必要です", "ERROR")
                     return False
-                log(f"取得したIPアドレス: {content}")
+            
+            # IPv4アドレスの検証
+            if record_type == "A" and not validate_ipv4(content):
+                log(f"無効なIPv4アドレス: {content}", "ERROR")
+                return False
+            
+            # 既存レコードのチェック
+            log(f"既存レコードをチェック: {full_name}")
+            success, existing = self._find_records(full_name)
+            
+            if success and existing:
+                log(f"警告: レコード '{full_name}' は既に存在します", "WARNING")
+                for record in existing:
+                    log(f"  {record['type']} {record['name']} {record['content']}", "WARNING")
+            
+            # レコード作成
+            data = {
+                "type": record_type,
+                "name": full_name,
+                "content": content,
+                "ttl": ttl,
+                "proxied": proxied
+            }
+            
+            log(f"DNSレコードを作成中: {record_type} {full_name} {content}")
+            if not self._ensure_zone(zone):
+                return False
+            success, response = self._make_request("POST", zone.dns_records_path, data)
+            
+            if success:
+                record_id = response['result']['id']
+                zone.record_index.upsert(response['result'])
+                log(f"✅ DNSレコードの作成が完了しました: {record_type} {full_name} {content}",
+                    record_id=record_id, type=record_type, ttl=ttl, proxied=proxied)
+                return True
             else:
-                log(f"{record_type}レコードにはcontentの指定が必要です", "ERROR")
+                log(f"DNSレコード作成に失敗: {response}", "ERROR")
                 return False
-        
-        # IPv4アドレスの検証
-        if record_type == "A" and not validate_ipv4(content):
-            log(f"無効なIPv4アドレス: {content}", "ERROR")
-            return False
-        
-        # 既存レコードのチェック
-        log(f"既存レコードをチェック: {full_name}")
-        success, response = self._make_request("GET", f"/zones/{self.config.zone_id}/dns_records?name={full_name}")
-        
-        if success and response.get('result'):
-            log(f"警告: レコード '{full_name}' は既に存在します", "WARNING")
-            for record in response['result']:
-                log(f"  {record['type']} {record['name']} {record['content']}", "WARNING")
-        
-        # レコード作成
-        data = {
-            "type": record_type,
-            "name": full_name,
-            "content": content,
-            "ttl": ttl,
-            "proxied": proxied
-        }
-        
-        log(f"DNSレコードを作成中: {record_type} {full_name} {content}")
-        success, response = self._make_request("POST", f"/zones/{self.config.zone_id}/dns_records", data)
-        
-        if success:
-            record_id = response['result']['id']
-            log(f"✅ DNSレコードの作成が完了しました")
-            print(f"\n=== 作成されたレコード ===")
-            print(f"Record ID: {record_id}")
-            print(f"Type: {record_type}")
-            print(f"Name: {full_name}")
-            print(f"Content: {content}")
-            print(f"TTL: {ttl}")
-            print(f"Proxied: {proxied}")
-            return True
-        else:
-            log(f"DNSレコード作成に失敗: {response}", "ERROR")
-            return False
     
     def delete_record(self, name: str, record_type: Optional[str] = None) -> bool:
         """DNSレコードを削除"""
-        # 完全なレコード名を構築
-        if not name.endswith(self.config.domain):
-            full_name = f"{name}.{self.config.domain}" if name != "@" else self.config.domain
-        else:
-            full_name = name
-        
-        # 対象レコードを検索
-        log(f"削除対象レコードを検索: {full_name}")
-        endpoint = f"/zones/{self.config.zone_id}/dns_records?name={full_name}"
-        if record_type:
-            endpoint += f"&type={record_type}"
-        
-        success, response = self._make_request("GET", endpoint)
-        
-        if not success:
-            log(f"レコード検索に失敗: {response}", "ERROR")
-            return False
-        
-        records = response.get('result', [])
-        
-        if not records:
-            log(f"レコードが見つかりません: {full_name}", "ERROR")
-            return False
-        
-        if len(records) > 1:
-            log(f"複数のレコードが見つかりました。最初のレコードを削除します", "WARNING")
-            for i, record in enumerate(records):
-                log(f"  {i+1}. {record['type']} {record['name']} {record['content']}")
-            target_record = records[0]
-        else:
-            target_record = records[0]
-        
-        log(f"削除対象レコード: {target_record['type']} {target_record['name']} {target_record['content']}")
-        
-        # レコード削除
-        record_id = target_record['id']
-        log(f"DNSレコードを削除中: {record_id}")
-        success, response = self._make_request("DELETE", f"/zones/{self.config.zone_id}/dns_records/{record_id}")
-        
-        if success:
-            log("✅ DNSレコードの削除が完了しました")
-            return True
-        else:
-            log(f"DNSレコード削除に失敗: {response}", "ERROR")
-            return False
+        # 担当ゾーンと完全なレコード名
+        zone, full_name = self.zones.route(name)
+        with log_context(domain=full_name):
+            # 対象レコードを検索
+            log(f"削除対象レコードを検索: {full_name}")
+            success, records = self._find_records(full_name, record_type)
+            
+            if not success:
+                log("レコード検索に失敗しました", "ERROR")
+                return False
+            
+            if not records:
+                log(f"レコードが見つかりません: {full_name}", "ERROR")
+                return False
+            
+            if len(records) > 1:
+                log(f"複数のレコードが見つかりました。最初のレコードを削除します", "WARNING")
+                for i, record in enumerate(records):
+                    log(f"  {i+1}. {record['type']} {record['name']} {record['content']}")
+                target_record = records[0]
+            else:
+                target_record = records[0]
+            
+            log(f"削除対象レコード: {target_record['type']} {target_record['name']} {target_record['content']}")
+            
+            # レコード削除
+            record_id = target_record['id']
+            log(f"DNSレコードを削除中: {record_id}", record_id=record_id)
+            success, response = self._make_request("DELETE", f"{zone.dns_records_path}/{record_id}")
+            
+            if success:
+                zone.record_index.discard(record_id)
+                log("✅ DNSレコードの削除が完了しました")
+                return True
+            else:
+                # ダッシュボード側で変更された可能性があるため次回は再読み込み
+                zone.record_index.invalidate()
+                log(f"DNSレコード削除に失敗: {response}", "ERROR")
+                return False
     
     def update_record(self, name: str, content: str, record_type: Optional[str] = None, batch_mode: bool = False) -> bool:
         """既存のDNSレコードのIPアドレスを更新"""
-        # 完全なレコード名を構築
-        if not name.endswith(self.config.domain):
-            full_name = f"{name}.{self.config.domain}" if name != "@" else self.config.domain
-        else:
-            full_name = name
-        
-        # デフォルトのレコードタイプをAに設定
-        if record_type is None:
-            record_type = "A"
-        
-        # 対象レコードを検索
-        log(f"更新対象レコードを検索: {full_name}")
-        endpoint = f"/zones/{self.config.zone_id}/dns_records?name={full_name}&type={record_type}"
-        
-        success, response = self._make_request("GET", endpoint)
-        
-        if not success:
-            log(f"レコード検索に失敗: {response}", "ERROR")
-            return False
-        
-        records = response.get('result', [])
-        
-        if not records:
-            if batch_mode:
-                log(f"レコードが見つかりません: {full_name} (スキップ)", "WARNING")
+        # 担当ゾーンと完全なレコード名
+        zone, full_name = self.zones.route(name)
+        with log_context(domain=full_name):
+            # デフォルトのレコードタイプをAに設定
+            if record_type is None:
+                record_type = "A"
+            
+            # 対象レコードを検索
+            log(f"更新対象レコードを検索: {full_name}")
+            success, records = self._find_records(full_name, record_type)
+            
+            if not success:
+                log("レコード検索に失敗しました", "ERROR")
+                return False
+            
+            if not records:
+                if batch_mode:
+                    log(f"レコードが見つかりません: {full_name} (スキップ)", "WARNING")
+                else:
+                    log(f"レコードが見つかりません: {full_name}", "ERROR")
+                return False
+            
+            if len(records) > 1:
+                log(f"複数のレコードが見つかりました。最初のレコードを更新します", "WARNING")
+                target_record = records[0]
             else:
-                log(f"レコードが見つかりません: {full_name}", "ERROR")
-            return False
-        
-        if len(records) > 1:
-            log(f"複数のレコードが見つかりました。最初のレコードを更新します", "WARNING")
-            target_record = records[0]
-        else:
-            target_record = records[0]
-        
-        # IPv4アドレスの検証
-        if record_type == "A" and not validate_ipv4(content):
-            log(f"無効なIPv4アドレス: {content}", "ERROR")
-            return False
+                target_record = records[0]
+            
+            # IPv4アドレスの検証
+            if record_type == "A" and not validate_ipv4(content):
+                log(f"無効なIPv4アドレス: {content}", "ERROR")
+                return False
+            
+            # 新しい値の準備（IPアドレスのみ更新）
+            new_data = {
+                "type": target_record['type'],
+                "name": target_record['name'],
+                "content": content,
+                "ttl": target_record['ttl'],
+                "proxied": target_record['proxied']
+            }
+            
+            # 既に同じ値であれば書き込まない
+            if target_record['content'] == content:
+                log(f"変更なし: {full_name} は既に {content} です")
+                return True
+            
+            # バッチモードでない場合は変更内容をログに出力
+            if not batch_mode:
+                log(f"更新内容: {target_record['content']} -> {content}")
+            
+            # レコード更新
+            record_id = target_record['id']
+            log(f"DNSレコードのIPアドレスを更新中: {record_id}", record_id=record_id)
+            with DNS_CHANGE_SECONDS.time(domain=full_name, operation="puts") as labels:
+                success, response = self._make_request("PUT", f"{zone.dns_records_path}/{record_id}", new_data)
+                labels["result"] = "ok" if success else "failed"
+            
+            if success:
+                zone.record_index.upsert(response['result'])
+                log(f"✅ DNSレコードのIPアドレス更新が完了しました: {target_record['content']} -> {content}")
+                return True
+            else:
+                zone.record_index.invalidate()
+                log(f"DNSレコード更新に失敗: {response}", "ERROR")
+                return False
+    
+    async def aclose(self):
+        """非同期クライアントの接続プールを閉じる"""
+        await self.async_client.aclose()
+    
+    @traced("dns.load_index")
+    async def _load_zone_indexes(self, names: List[str]) -> Tuple[List[str], List[str]]:
+        """対象の名前を含む全ゾーンのインデックスを並列に読み込み
         
-        # 新しい値の準備（IPアドレスのみ更新）
-        new_data = {
-            "type": target_record['type'],
-            "name": target_record['name'],
-            "content": content,
-            "ttl": target_record['ttl'],
-            "proxied": target_record['proxied']
-        }
+        Returns:
+            Tuple[読み込めたゾーンの名前, 読み込めなかったゾーンの名前]
+        """
+        grouped = self.zones.group(names)
+        zones = list(grouped)
+        results = await asyncio.gather(*(self.async_client.refresh_record_index(False, zone) for zone in zones))
+        
+        loaded, failed = [], []
+        for zone, ok in zip(zones, results):
+            (loaded if ok else failed).extend(grouped[zone])
+        return loaded, failed
+    
+    @traced("dns.apply")
+    async def _apply_by_zone(self, kind: str, items: List[Tuple[str, Dict]]) -> Tuple[List[str], List[str]]:
+        """(名前, 操作データ) をゾーンごとにまとめ、全ゾーンへ並列に適用
         
-        # バッチモードでない場合は変更内容をログに出力
-        if not batch_mode:
-            log(f"更新内容: {target_record['content']} -> {content}")
+        レート制限と同時実行数の上限は全ゾーンで共有する。
+        """
+        grouped: Dict[Zone, List[Tuple[str, Dict]]] = {}
+        for label, payload in items:
+            grouped.setdefault(self.zones.zone_for(label), []).append((label, payload))
+        
+        results = await asyncio.gather(*(
+            self.async_client.apply_changes(zone=zone, **{kind: zone_items})
+            for zone, zone_items in grouped.items()
+        ))
+        
+        succeeded, failed = [], []
+        for zone_succeeded, zone_failed in results:
+            succeeded.extend(zone_succeeded)
+            failed.extend(zone_failed)
+        return succeeded, failed
+    
+    @traced("dns.plan")
+    def plan_bulk_update(self, domains: List[str], content: str, record_type: str = "A") -> Dict[str, List]:
+        """一括更新の変更計画を作成（レコードインデックスが読み込み済みであること）
         
-        # レコード更新
-        record_id = target_record['id']
-        log(f"DNSレコードのIPアドレスを更新中: {record_id}")
-        success, response = self._make_request("PUT", f"/zones/{self.config.zone_id}/dns_records/{record_id}", new_data)
+        Returns:
+            Dict: unchanged（既に目的の値）, update（(ドメイン, レコード)のリスト）, missing（レコードなし）
+        """
+        plan = {"unchanged": [], "update": [], "missing": []}
+        
+        for domain in domains:
+            zone, full_name = self.zones.route(domain)
+            records = zone.record_index.lookup(full_name, record_type)
+            if not records:
+                plan["missing"].append(domain)
+                continue
+            if len(records) > 1:
+                log(f"複数のレコードが見つかりました。最初のレコードを更新します: {domain}", "WARNING")
+            
+            record = records[0]
+            if record.get('content') == content:
+                plan["unchanged"].append(domain)
+            else:
+                plan["update"].append((domain, record))
         
-        if success:
-            log(f"✅ DNSレコードのIPアドレス更新が完了しました: {target_record['content']} -> {content}")
-            return True
-        else:
-            log(f"DNSレコード更新に失敗: {response}", "ERROR")
-            return False
+        return plan
     
-    async def bulk_update_records(self, custom_domains: Optional[List[str]] = None) -> Tuple[bool, List[str], List[str]]:
-        """リストに含まれるドメインのIPアドレスを現在のIPアドレスで一括更新（並列処理）
+    @_bulk_metrics("update")
+    async def bulk_update_records(self, custom_domains: Optional[List[str]] = None) -> Tuple[bool, Dict]:
+        """リストに含まれるドメインのIPアドレスを現在のIPアドレスで一括更新
+        
+        変更計画を作成し、IPアドレスが異なるレコードのみ書き込む。
         
         Returns:
-            Tuple[bool, List[str], List[str]]: (成功フラグ, 成功したドメイン, 失敗したドメイン)
+            Tuple[bool, Dict]: (成功フラグ, 結果)
+                結果は ip（更新先IPアドレス）, updated, unchanged, missing, failed（各ドメインのリスト）
         """
-        import asyncio
+        result = {"ip": None, "updated": [], "unchanged": [], "missing": [], "failed": []}
         
         # 使用するドメインリストを決定
         domains_to_update = custom_domains if custom_domains is not None else self.domain_manager.get_domains()
         
         if not domains_to_update:
             log("更新対象のドメインが指定されていません", "ERROR")
-            return False, [], []
+            return False, result
         
         # 現在のIPアドレスを取得
         log("現在のIPアドレスを取得中...")
-        current_ip = get_current_ip(self.config.ip_services)
+        current_ip = await self.ip_resolver.resolve_async()
         if current_ip is None:
             log("現在のIPアドレスを取得できませんでした", "ERROR")
-            return False, [], []
+            return False, result
         
+        result["ip"] = current_ip
         log(f"取得したIPアドレス: {current_ip}")
         
-        # 各ドメインを並列更新
-        failed_domains = []
-        successful_domains = []
+        # 変更計画の前に対象ゾーンのインデックスを並列に一度だけ読み込む
+        loaded, result["failed"] = await self._load_zone_indexes(domains_to_update)
+        if not loaded:
+            return False, result
         
-        print(f"\n=== 一括更新開始 ===")
-        print(f"対象ドメイン: {domains_to_update}")
-        print(f"更新先IPアドレス: {current_ip}")
-        print()
+        plan = self.plan_bulk_update(loaded, current_ip)
+        result["unchanged"] = plan["unchanged"]
+        result["missing"] = plan["missing"]
         
-        async def update_single_domain(domain: str) -> bool:
-            """単一ドメインの更新を非同期で実行"""
-            log(f"ドメイン '{domain}' を更新中...")
-            
-            try:
-                # 非同期実行のためrun_in_executorを使用
-                loop = asyncio.get_event_loop()
-                success = await loop.run_in_executor(
-                    None, 
-                    self.update_record, 
-                    domain, 
-                    current_ip, 
-                    "A", 
-                    True
-                )
-                
-                if success:
-                    successful_domains.append(domain)
-                    log(f"✅ '{domain}' の更新が完了しました")
-                    return True
-                else:
-                    failed_domains.append(domain)
-                    log(f"❌ '{domain}' の更新に失敗しました", "ERROR")
-                    return False
-            except Exception as e:
-                failed_domains.append(domain)
-                log(f"❌ '{domain}' の更新中にエラーが発生: {e}", "ERROR")
-                return False
+        log(f"一括更新を開始します: {len(domains_to_update)}件 -> {current_ip} "
+            f"(変更なし {len(plan['unchanged'])} / 更新 {len(plan['update'])} / レコードなし {len(plan['missing'])})")
+        log(f"対象ドメイン: {domains_to_update}", "DEBUG")
         
-        # 全ドメインを並列処理
-        tasks = [update_single_domain(domain) for domain in domains_to_update]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        for domain in plan["missing"]:
+            log(f"レコードが見つかりません: {self.full_name(domain)} (スキップ)", "WARNING")
         
-        # 結果を集計
-        success_count = sum(1 for result in results if result is True)
+        # 変更が必要なレコードのみゾーンごとにbatchで並列に送信
+        if plan["update"]:
+            patches = [(domain, {"id": record['id'], "content": current_ip}) for domain, record in plan["update"]]
+            updated, failed = await self._apply_by_zone("patches", patches)
+            
+            # 入力順に並べ直す
+            order = {domain: i for i, domain in enumerate(domains_to_update)}
+            result["updated"] = sorted(updated, key=order.get)
+            result["failed"] = sorted(result["failed"] + failed, key=order.get)
         
         # 結果のサマリー
-        print(f"\n=== 一括更新結果 ===")
-        print(f"総ドメイン数: {len(domains_to_update)}")
-        print(f"成功: {success_count}")
-        print(f"失敗: {len(failed_domains)}")
+        log(f"一括更新結果: 総ドメイン数 {len(domains_to_update)} / 更新 {len(result['updated'])} / "
+            f"変更なし {len(result['unchanged'])} / レコードなし {len(result['missing'])} / 失敗 {len(result['failed'])}")
         
-        if failed_domains:
-            print(f"失敗したドメイン: {failed_domains}")
+        if result["failed"]:
+            log(f"失敗したドメイン: {result['failed']}", "WARNING")
         
-        if success_count == len(domains_to_update):
+        if not result["failed"] and not result["missing"]:
             log("✅ 全てのドメインの更新が完了しました")
-            return True, successful_domains, failed_domains
+            return True, result
+        else:
+            log(f"⚠️  {len(result['failed']) + len(result['missing'])}個のドメインの更新に失敗しました", "WARNING")
+            return False, result
+    
+    @_bulk_metrics("create")
+    async def bulk_create_records(self, names: List[str], content: Optional[str] = None, record_type: str = "A",
+                                  ttl: int = 60, proxied: bool = False) -> Tuple[bool, List[str], List[str]]:
+        """複数のDNSレコードをbatchエンドポイントで一括作成
+        
+        Returns:
+            Tuple[bool, List[str], List[str]]: (成功フラグ, 成功した名前, 失敗した名前)
+        """
+        if content is None:
+            if record_type != "A":
+                log(f"{record_type}レコードにはcontentの指定が必要です", "ERROR")
+                return False, [], list(names)
+            content = await self.ip_resolver.resolve_async()
+            if content is None:
+                log("現在のIPアドレスを取得できませんでした", "ERROR")
+                return False, [], list(names)
+        
+        if record_type == "A" and not validate_ipv4(content):
+            log(f"無効なIPv4アドレス: {content}", "ERROR")
+            return False, [], list(names)
+        
+        posts = [(name, {
+            "type": record_type,
+            "name": self.full_name(name),
+            "content": content,
+            "ttl": ttl,
+            "proxied": proxied
+        }) for name in names]
+        
+        log(f"{len(posts)}件のDNSレコードを一括作成中: {record_type} {content}")
+        created, failed = await self._apply_by_zone("posts", posts)
+        
+        if failed:
+            log(f"⚠️  {len(failed)}件のレコード作成に失敗しました: {failed}", "WARNING")
+        else:
+            log(f"✅ {len(created)}件のDNSレコードの作成が完了しました")
+        return not failed, created, failed
+    
+    @_bulk_metrics("delete")
+    async def bulk_delete_records(self, names: List[str], record_type: Optional[str] = None) -> Tuple[bool, List[str], List[str]]:
+        """複数のDNSレコードをbatchエンドポイントで一括削除
+        
+        Returns:
+            Tuple[bool, List[str], List[str]]: (成功フラグ, 削除した名前, 失敗した名前)
+        """
+        loaded, failed = await self._load_zone_indexes(names)
+        
+        deletes = []
+        for name in loaded:
+            zone, full_name = self.zones.route(name)
+            records = zone.record_index.lookup(full_name, record_type)
+            if not records:
+                log(f"レコードが見つかりません: {full_name}", "ERROR")
+                failed.append(name)
+                continue
+            if len(records) > 1:
+                log(f"複数のレコードが見つかりました。最初のレコードを削除します: {name}", "WARNING")
+            deletes.append((name, {"id": records[0]['id']}))
+        
+        log(f"{len(deletes)}件のDNSレコードを一括削除中...")
+        deleted, delete_failed = await self._apply_by_zone("deletes", deletes)
+        failed.extend(delete_failed)
+        
+        if failed:
+            log(f"⚠️  {len(failed)}件のレコード削除に失敗しました: {failed}", "WARNING")
         else:
-            log(f"⚠️  {len(failed_domains)}個のドメインの更新に失敗しました", "WARNING")
-            return False, successful_domains, failed_domains
\ No newline at end of file
+            log(f"✅ {len(deleted)}件のDNSレコードの削除が完了しました")
+        return not failed, deleted, failed
\ No newline at end of file
@@ -3,32 +3,107 @@
 Domain list management for Cloudflare DNS Manager
 """
 
-import json
-from typing import List
+import fnmatch
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 from bot_config import Config
-from utils import log
+from utils import log, full_record_name
+
+_LABEL_PATTERN = re.compile(r'^[a-z0-9_]([a-z0-9_-]{0,61}[a-z0-9_])?$')
+
+def _other_zone(name: str, zone_domains: Sequence[str]) -> bool:
+    """既定ゾーン以外のゾーンの完全名か"""
+    return any(name == d or name.endswith(f".{d}") for d in zone_domains[1:])
+
+def normalize_domain_name(name: str, zone_domains: Sequence[str]) -> Optional[str]:
+    """リストに保存する形に正規化（不正な名前はNone）
+    
+    既定ゾーン（先頭）の名前は相対名、それ以外のゾーンの名前は完全名で保存する。
+    """
+    name = name.strip().lower().rstrip('.')
+    zone_domains = [d.lower().rstrip('.') for d in zone_domains]
+    default = zone_domains[0]
+    if name in ("@", default):
+        return "@"
+    if name.endswith(f".{default}") and not _other_zone(name, zone_domains):
+        name = name[:-len(default) - 1]
+    if not name or len(name) > 253:
+        return None
+    if not all(_LABEL_PATTERN.match(label) for label in name.split('.')):
+        return None
+    return name
+
+def qualified_name(name: str, zone_domains: Sequence[str]) -> str:
+    """リストの名前から完全なレコード名を構築"""
+    if _other_zone(name, zone_domains):
+        return name
+    return full_record_name(name, zone_domains[0])
+
+def split_names(text: str) -> List[str]:
+    """空白・カンマ区切りの名前を分割"""
+    return [name for name in re.split(r'[\s,]+', text) if name]
+
+def is_glob(pattern: str) -> bool:
+    """ワイルドカード（* ? [ ]）を含むか"""
+    return any(c in pattern for c in "*?[")
 
 class DomainListManager:
-    """ドメインリスト管理クラス"""
+    """ドメインリスト管理クラス
+    
+    登録順を保った辞書を集合として使い、存在確認・追加・削除をO(1)で行う。
+    複数件の追加・削除はまとめて検証し、設定ファイルへは1回だけ書き込む。
+    """
     
     def __init__(self, config: Config):
         self.config = config
-        self.target_domains = self._load_target_domains()
+        self._lock = threading.Lock()
+        self._domains: Dict[str, None] = dict.fromkeys(self._load_target_domains())
+        # 最後に自分で書き込んだ内容（再読み込み時に外部の変更と見分ける）
+        self._written: Optional[Tuple[str, ...]] = None
+    
+    @property
+    def target_domains(self) -> List[str]:
+        return list(self._domains)
+    
+    @target_domains.setter
+    def target_domains(self, domains: Iterable[str]):
+        with self._lock:
+            self._domains = dict.fromkeys(domains)
+    
+    def __contains__(self, domain: str) -> bool:
+        return domain in self._domains
+    
+    def __len__(self) -> int:
+        return len(self._domains)
+    
+    def sync(self, domains: Iterable[str]):
+        """再読み込みした設定のリストを反映（自分の書き込みによる変更は無視）"""
+        domains = tuple(domains)
+        with self._lock:
+            if domains == self._written:
+                return
+            self._domains = dict.fromkeys(domains)
     
     def _load_target_domains(self) -> List[str]:
         """ドメインリストを統合設定から読み込み"""
         domains = self.config.get_target_domains()
-        log(f"ドメインリストを読み込みました: {domains}")
+        log(f"ドメインリストを読み込みました: {len(domains)}件")
         return domains
     
-    def _save_target_domains(self, domains: List[str] = None) -> bool:
-        """ドメインリストをbot_config.jsonに保存"""
-        if domains is None:
-            domains = self.target_domains
+    def _save_target_domains(self) -> bool:
+        """ドメインリストをbot_config.jsonに保存
+        
+        書き込みはまとめて行われるため、書き込む時点のリストを渡す。
+        """
+        def current() -> List[str]:
+            with self._lock:
+                self._written = tuple(self._domains)
+                return list(self._written)
         
         try:
             # bot_config.jsonに保存
-            return self.config.update_target_domains(domains)
+            return self.config.update_target_domains(current)
         except Exception as e:
             log(f"ドメインリスト保存エラー: {e}", "ERROR")
             return False
@@ -43,43 +118,117 @@ class DomainListManager:
         if not self.target_domains:
             print("登録されているドメインがありません。")
         else:
+            zone_domains = self.config.zone_domains
             for i, domain in enumerate(self.target_domains, 1):
-                print(f"  {i}. {domain}.{self.config.domain}")
+                print(f"  {i}. {qualified_name(domain, zone_domains)}")
         
         return True
     
-    def add_domain(self, domain: str) -> bool:
-        """一括更新対象のドメインリストに追加"""
-        if domain in self.target_domains:
-            log(f"ドメイン '{domain}' は既にリストに登録されています", "WARNING")
-            return False
+    def add_domains(self, names: Iterable[str]) -> Tuple[bool, Dict[str, List[str]]]:
+        """複数のドメインをまとめてリストに追加
         
-        self.target_domains.append(domain)
+        すべての名前を先に検証し、不正な名前が1つでもあれば何も追加しない。
         
-        if self._save_target_domains():
-            log(f"✅ ドメイン '{domain}' をリストに追加しました")
-            return True
-        else:
+        Returns:
+            Tuple[bool, Dict]: (成功フラグ, 結果)
+                結果は added, existing, invalid（各ドメインのリスト）
+        """
+        result = {"added": [], "existing": [], "invalid": []}
+        normalized = []
+        zone_domains = self.config.zone_domains
+        for name in names:
+            domain = normalize_domain_name(name, zone_domains)
+            if domain is None:
+                result["invalid"].append(name)
+            else:
+                normalized.append(domain)
+        if result["invalid"]:
+            log(f"不正なドメイン名があるため追加を中止しました: {result['invalid']}", "ERROR")
+            return False, result
+        
+        with self._lock:
+            domains = dict(self._domains)
+            for domain in normalized:
+                if domain in domains:
+                    if domain not in result["added"]:
+                        result["existing"].append(domain)
+                else:
+                    domains[domain] = None
+                    result["added"].append(domain)
+            if not result["added"]:
+                return False, result
+            self._domains = domains
+        
+        if not self._save_target_domains():
             # 保存に失敗した場合は元に戻す
-            self.target_domains.remove(domain)
-            return False
+            with self._lock:
+                self._domains = {d: None for d in self._domains if d not in result["added"]}
+            result["added"] = []
+            return False, result
+        
+        log(f"✅ {len(result['added'])}件のドメインをリストに追加しました")
+        return True, result
+    
+    def remove_domains(self, names: Iterable[str]) -> Tuple[bool, Dict[str, List[str]]]:
+        """複数のドメインをまとめてリストから削除（ワイルドカードはリスト内の名前に一致させる）
+        
+        Returns:
+            Tuple[bool, Dict]: (成功フラグ, 結果)
+                結果は removed, missing（各ドメインのリスト）
+        """
+        result = {"removed": [], "missing": []}
+        zone_domains = self.config.zone_domains
+        with self._lock:
+            original = self._domains
+            domains = dict(original)
+            for name in names:
+                if is_glob(name):
+                    matched = fnmatch.filter(domains, name.lower())
+                    if not matched:
+                        result["missing"].append(name)
+                    for domain in matched:
+                        del domains[domain]
+                        result["removed"].append(domain)
+                    continue
+                
+                domain = normalize_domain_name(name, zone_domains) or name
+                if domain in domains:
+                    del domains[domain]
+                    result["removed"].append(domain)
+                elif domain not in result["removed"]:
+                    result["missing"].append(name)
+            if not result["removed"]:
+                return False, result
+            self._domains = domains
+        
+        if not self._save_target_domains():
+            # 保存に失敗した場合は元の順序のまま戻す（その間に追加された名前は末尾に残す）
+            removed = set(result["removed"])
+            with self._lock:
+                current = self._domains
+                restored = {d: None for d in original if d in current or d in removed}
+                restored.update((d, None) for d in current if d not in restored)
+                self._domains = restored
+            result["removed"] = []
+            return False, result
+        
+        log(f"✅ {len(result['removed'])}件のドメインをリストから削除しました")
+        return True, result
+    
+    def add_domain(self, domain: str) -> bool:
+        """一括更新対象のドメインリストに追加"""
+        success, result = self.add_domains([domain])
+        if result["existing"]:
+            log(f"ドメイン '{domain}' は既にリストに登録されています", "WARNING")
+        return success
     
     def remove_domain(self, domain: str) -> bool:
         """一括更新対象のドメインリストから削除"""
-        if domain not in self.target_domains:
+        success, result = self.remove_domains([domain])
+        if result["missing"]:
             log(f"ドメイン '{domain}' はリストに登録されていません", "ERROR")
-            return False
-        
-        self.target_domains.remove(domain)
-        
-        if self._save_target_domains():
-            log(f"✅ ドメイン '{domain}' をリストから削除しました")
-            return True
-        else:
-            # 保存に失敗した場合は元に戻す
-            self.target_domains.append(domain)
-            return False
+        return success
     
     def get_domains(self) -> List[str]:
         """現在のドメインリストを取得"""
-        return self.target_domains.copy()
\ No newline at end of file
+        return list(self._domains)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Public IP discovery for Cloudflare DNS Manager
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+import httpx
+import requests
+
+from metrics import IP_LOOKUP_SECONDS, service_label
+from retry import get_circuit_breaker
+from tracing import traced
+from utils import log, validate_ipv4
+
+class PublicIPResolver:
+    """複数のIP取得サービスに同時に問い合わせ、結果を短時間キャッシュするクラス
+
+    quorumが1なら最初に得られた有効な回答を、2以上なら同じIPを返した
+    サービス数がquorumに達した時点の回答を採用する。
+    """
+
+    def __init__(self, services: List[str], timeout: float = 5, quorum: int = 1, cache_ttl: float = 30):
+        self.services = list(services)
+        self.timeout = timeout
+        self._quorum_setting = quorum
+        self.quorum = max(1, min(quorum, len(self.services) or 1))
+        self.cache_ttl = cache_ttl
+        self._lock = threading.Lock()
+        self._cached_ip: Optional[str] = None
+        self._cached_at = 0.0
+
+    def configure(self, services: Optional[List[str]] = None, timeout: Optional[float] = None,
+                  quorum: Optional[int] = None, cache_ttl: Optional[float] = None):
+        """指定された設定値のみ反映（サービス一覧が変わった場合はキャッシュを破棄）"""
+        with self._lock:
+            if services is not None and list(services) != self.services:
+                self.services = list(services)
+                self._cached_ip = None
+            if timeout is not None:
+                self.timeout = timeout
+            if quorum is not None:
+                self._quorum_setting = quorum
+            self.quorum = max(1, min(self._quorum_setting, len(self.services) or 1))
+            if cache_ttl is not None:
+                self.cache_ttl = cache_ttl
+
+    def invalidate(self):
+        """キャッシュを破棄"""
+        with self._lock:
+            self._cached_ip = None
+
+    def cached(self) -> Optional[str]:
+        """有効期限内のキャッシュ済みIPアドレスを取得"""
+        with self._lock:
+            if self._cached_ip and time.monotonic() - self._cached_at < self.cache_ttl:
+                return self._cached_ip
+            return None
+
+    def _store(self, ip: str):
+        with self._lock:
+            self._cached_ip = ip
+            self._cached_at = time.monotonic()
+
+    def _tally(self, votes: Dict[str, int], ip: Optional[str]) -> Optional[str]:
+        """回答を集計し、quorumに達したIPを返す"""
+        if not ip or not validate_ipv4(ip):
+            return None
+        votes[ip] = votes.get(ip, 0) + 1
+        return ip if votes[ip] >= self.quorum else None
+
+    def _query(self, service: str) -> Optional[str]:
+        breaker = get_circuit_breaker(service)
+        if not breaker.allow():
+            return None
+        started = time.perf_counter()
+        try:
+            response = requests.get(service, timeout=self.timeout)
+            response.raise_for_status()
+        except Exception as e:
+            # requests以外の例外も失敗として記録し、half_openの試行枠を残さない
+            IP_LOOKUP_SECONDS.observe(time.perf_counter() - started, service=service_label(service), result="error")
+            breaker.record_failure(str(e) or type(e).__name__)
+            log(f"IP取得サービスへの問い合わせに失敗: {service}: {e}", "WARNING")
+            return None
+        IP_LOOKUP_SECONDS.observe(time.perf_counter() - started, service=service_label(service), result="ok")
+        breaker.record_success()
+        return response.text.strip()
+
+    @traced("ip.resolve")
+    def resolve(self, force_refresh: bool = False) -> Optional[str]:
+        """現在のIPアドレスを取得（スレッドで全サービスに同時問い合わせ）"""
+        if not force_refresh:
+            ip = self.cached()
+            if ip:
+                return ip
+
+        if not self.services:
+            return None
+
+        votes: Dict[str, int] = {}
+        executor = ThreadPoolExecutor(max_workers=len(self.services))
+        try:
+            futures = [executor.submit(self._query, service) for service in self.services]
+            for future in as_completed(futures):
+                ip = self._tally(votes, future.result())
+                if ip:
+                    self._store(ip)
+                    return ip
+        finally:
+            # 残りの問い合わせの完了は待たない
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        log(f"IPアドレスの合意が得られませんでした: {votes}", "ERROR")
+        return None
+
+    async def _query_async(self, client: httpx.AsyncClient, service: str, probe: bool = False) -> Optional[str]:
+        breaker = None if probe else get_circuit_breaker(service)
+        if breaker is not None and not breaker.allow():
+            return None
+        started = time.perf_counter()
+        try:
+            response = await client.get(service)
+            response.raise_for_status()
+        except asyncio.CancelledError:
+            # 合意が得られて途中でキャンセルされた問い合わせは記録せず、試行枠だけ解放する
+            if breaker is not None:
+                breaker.release()
+            raise
+        except Exception as e:
+            IP_LOOKUP_SECONDS.observe(time.perf_counter() - started, service=service_label(service), result="error")
+            if breaker is not None:
+                breaker.record_failure(str(e) or type(e).__name__)
+                log(f"IP取得サービスへの問い合わせに失敗: {service}: {e}", "WARNING")
+            return None
+        IP_LOOKUP_SECONDS.observe(time.perf_counter() - started, service=service_label(service), result="ok")
+        if breaker is not None:
+            breaker.record_success()
+        return response.text.strip()
+
+    @traced("ip.resolve")
+    async def resolve_async(self, force_refresh: bool = False, probe: bool = False) -> Optional[str]:
+        """現在のIPアドレスを取得（イベントループ上で全サービスに同時問い合わせ）
+
+        probe=Trueは回線断が想定される間の監視用で、サーキットブレーカーを
+        経由せず、失敗もログに出さない。
+        """
+        if not force_refresh:
+            ip = self.cached()
+            if ip:
+                return ip
+
+        if not self.services:
+            return None
+
+        votes: Dict[str, int] = {}
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            tasks = [asyncio.ensure_future(self._query_async(client, service, probe)) for service in self.services]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    ip = self._tally(votes, await next_done)
+                    if ip:
+                        self._store(ip)
+                        return ip
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        if not probe:
+            log(f"IPアドレスの合意が得られませんでした: {votes}", "ERROR")
+        return None
+
+# プロセス全体で共有するリゾルバ（Cog・DNSマネージャー間でキャッシュを共有）
+_shared_resolver: Optional[PublicIPResolver] = None
+_shared_lock = threading.Lock()
+
+def get_ip_resolver(services: Optional[List[str]] = None, timeout: Optional[float] = None,
+                    quorum: Optional[int] = None, cache_ttl: Optional[float] = None) -> PublicIPResolver:
+    """共有のPublicIPResolverを取得（指定された設定値は反映する）"""
+    global _shared_resolver
+    with _shared_lock:
+        if _shared_resolver is None:
+            _shared_resolver = PublicIPResolver(services or [])
+        _shared_resolver.configure(services, timeout, quorum, cache_ttl)
+        return _shared_resolver
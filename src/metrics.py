@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Prometheus text-format counters and histograms with a small local HTTP endpoint
+"""
+
+import bisect
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from utils import log
+
+# 秒単位の既定バケット（APIの応答から一括更新全体までを想定）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# 上限を超えた組み合わせは1つの系列にまとめる
+OVERFLOW_LABEL = "_other"
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    """ラベルの組み合わせごとに値を持つメトリクスの基底クラス"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (), max_series: Optional[int] = None):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.max_series = max_series
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        if self.max_series is not None and key not in self._series and len(self._series) >= self.max_series:
+            return tuple(OVERFLOW_LABEL for _ in self.labelnames)
+        return key
+
+    def _new_value(self):
+        raise NotImplementedError
+
+    def _get(self, labels: Dict[str, object]):
+        """ロックを取得した状態で呼ぶ"""
+        key = self._key(labels)
+        value = self._series.get(key)
+        if value is None:
+            value = self._series[key] = self._new_value()
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for key, value in series:
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key: Tuple[str, ...], value) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """単調増加するカウンター"""
+
+    kind = "counter"
+
+    def _new_value(self):
+        return [0.0]
+
+    def inc(self, amount: float = 1, **labels):
+        with self._lock:
+            self._get(labels)[0] += amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            value = self._series.get(tuple(str(labels.get(name, "")) for name in self.labelnames))
+            return value[0] if value else 0.0
+
+    def total(self, **labels) -> float:
+        """指定したラベルが一致する全系列の合計（省略したラベルは問わない）"""
+        wanted = {self.labelnames.index(name): str(value) for name, value in labels.items()}
+        with self._lock:
+            return sum(value[0] for key, value in self._series.items()
+                       if all(key[i] == value_ for i, value_ in wanted.items()))
+
+    def _render_series(self, key, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value[0])}"]
+
+class Gauge(Counter):
+    """任意に上下する値"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._get(labels)[0] = value
+
+class _HistogramValue:
+    __slots__ = ("buckets", "count", "sum")
+
+    def __init__(self, size: int):
+        self.buckets = [0] * size
+        self.count = 0
+        self.sum = 0.0
+
+class Histogram(_Metric):
+    """累積バケットで分布を記録するヒストグラム"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, max_series: Optional[int] = None):
+        super().__init__(name, description, labelnames, max_series)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_value(self):
+        return _HistogramValue(len(self.buckets))
+
+    def observe(self, value: float, **labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._get(labels)
+            if index < len(self.buckets):
+                series.buckets[index] += 1
+            series.count += 1
+            series.sum += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[Dict[str, object]]:
+        """with内の経過時間を記録（yieldした辞書でラベルを後から変更できる）"""
+        labels = dict(labels)
+        started = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            value = self._series.get(tuple(str(labels.get(name, "")) for name in self.labelnames))
+            return value.count if value else 0
+
+    def _render_series(self, key, value: _HistogramValue) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, hits in zip(self.buckets, value.buckets):
+            cumulative += hits
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', _format_value(bound)))} {cumulative}")
+        lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', '+Inf'))} {value.count}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(round(value.sum, 6))}")
+        lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {value.count}")
+        return lines
+
+class MetricsRegistry:
+    """メトリクスを名前で登録し、Prometheusのテキスト形式で出力するクラス"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, description: str, labelnames: Sequence[str] = (), **kwargs) -> Counter:
+        return self._register(Counter(name, description, labelnames, **kwargs))
+
+    def gauge(self, name: str, description: str, labelnames: Sequence[str] = (), **kwargs) -> Gauge:
+        return self._register(Gauge(name, description, labelnames, **kwargs))
+
+    def histogram(self, name: str, description: str, labelnames: Sequence[str] = (), **kwargs) -> Histogram:
+        return self._register(Histogram(name, description, labelnames, **kwargs))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        """全系列の値を破棄（ベンチマークの計測区間の区切りに使う）"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+REGISTRY = MetricsRegistry()
+
+# Cloudflare API
+API_REQUESTS = REGISTRY.counter(
+    "netops_cloudflare_requests_total", "Cloudflare API requests by method, endpoint and HTTP status",
+    ("method", "endpoint", "status"))
+API_REQUEST_SECONDS = REGISTRY.histogram(
+    "netops_cloudflare_request_seconds", "Cloudflare API request latency per attempt",
+    ("method", "endpoint"))
+API_RETRIES = REGISTRY.counter(
+    "netops_cloudflare_retries_total", "Cloudflare API retries by reason (rate_limited, status, network)",
+    ("method", "endpoint", "reason"))
+API_RATE_LIMITED = REGISTRY.counter(
+    "netops_cloudflare_rate_limited_total", "HTTP 429 responses from the Cloudflare API",
+    ("method", "endpoint"))
+
+# DNSレコードの変更
+DNS_CHANGE_SECONDS = REGISTRY.histogram(
+    "netops_dns_change_seconds", "Time until a record change was confirmed, per domain",
+    ("domain", "operation", "result"), max_series=1000)
+BULK_SECONDS = REGISTRY.histogram(
+    "netops_bulk_seconds", "End-to-end duration of bulk operations",
+    ("operation", "result"))
+BULK_RECORDS = REGISTRY.counter(
+    "netops_bulk_records_total", "Records handled by bulk operations by outcome",
+    ("operation", "outcome"))
+
+# 公開IPの取得
+IP_LOOKUP_SECONDS = REGISTRY.histogram(
+    "netops_ip_lookup_seconds", "Public IP lookup time per service",
+    ("service", "result"))
+
+# ルーター操作とスケジューラー
+ROUTER_STEP_SECONDS = REGISTRY.histogram(
+    "netops_router_step_seconds", "Router automation step durations",
+    ("step", "status"))
+ROUTER_JOB_SECONDS = REGISTRY.histogram(
+    "netops_router_job_seconds", "Router job durations by execution mode and final state",
+    ("mode", "state"))
+SCHEDULER_LAG_SECONDS = REGISTRY.histogram(
+    "netops_scheduler_lag_seconds", "Delay between a job's scheduled time and when it fired",
+    ("job",), buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 30, 60, 300, 3600))
+SCHEDULER_RUNS = REGISTRY.counter(
+    "netops_scheduler_runs_total", "Scheduled job runs by final status",
+    ("job", "status"))
+
+# パス中のIDとみなすセグメントの直前の名前
+_ID_PARENTS = {"zones": "{zone_id}", "dns_records": "{record_id}"}
+_ACTIONS = {"batch", "export", "import", "scan", "review"}
+_HOST_PATTERN = re.compile(r"^[a-z0-9.-]+$")
+
+def endpoint_label(url: str) -> str:
+    """URLをIDを伏せたエンドポイント名に変換（/zones/{zone_id}/dns_records/{record_id}）"""
+    path = urlsplit(url).path
+    marker = path.find("/client/v4")
+    if marker >= 0:
+        path = path[marker + len("/client/v4"):]
+    segments = [segment for segment in path.split("/") if segment]
+    for i in range(1, len(segments)):
+        placeholder = _ID_PARENTS.get(segments[i - 1])
+        if placeholder and segments[i] not in _ACTIONS:
+            segments[i] = placeholder
+    return "/" + "/".join(segments)
+
+def service_label(url: str) -> str:
+    """IP取得サービスのURLをホスト名に変換"""
+    host = urlsplit(url).hostname or url
+    return host if _HOST_PATTERN.match(host) else "unknown"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = REGISTRY
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/metrics":
+            body = self.registry.render().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+            status = 200
+        elif path == "/healthz":
+            body, content_type, status = b"ok\n", "text/plain", 200
+        else:
+            body, content_type, status = b"not found\n", "text/plain", 404
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # アクセスログは出力しない
+        pass
+
+class MetricsServer:
+    """/metrics と /healthz を返すHTTPサーバーをデーモンスレッドで動かすクラス"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9108, registry: MetricsRegistry = REGISTRY):
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "MetricsServer":
+        if self._server is not None:
+            return self
+        handler = type("MetricsHandler", (_MetricsHandler,), {"registry": self.registry})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+        log(f"メトリクスを公開しました: http://{self.host}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+On-demand profiling of the running bot (cProfile on the event loop or stack sampling across threads)
+"""
+
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Tuple
+
+class StackSampler:
+    """全スレッドのスタックを一定間隔で採取し、collapsed形式（flamegraph用）で集計するクラス
+
+    cProfileは有効にしたスレッドしか計測できないため、ワーカースレッドで
+    実行されるHTTP呼び出しやSelenium操作を含めて見たい場合に使う。
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            self._stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> "StackSampler":
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        """`スレッド;関数;関数 回数` の行（flamegraph.pl・speedscopeで読み込める）"""
+        return "\n".join(f"{stack} {count}" for stack, count in self._stacks.most_common()) + "\n"
+
+    def top(self, limit: int = 15) -> str:
+        """採取回数の多い関数（スタックの先頭）"""
+        leaves: Counter = Counter()
+        for stack, count in self._stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return "\n".join(f"{count * 100 / total:5.1f}% {name}" for name, count in leaves.most_common(limit))
+
+async def profile_event_loop(seconds: float, limit: int = 15) -> Tuple[str, str]:
+    """イベントループのスレッドをcProfileで計測し、(statsファイルのパス, 上位の要約) を返す"""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.disable()
+
+    fd, path = tempfile.mkstemp(prefix="netops-profile-", suffix=".prof")
+    os.close(fd)
+    profiler.dump_stats(path)
+
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+    return path, output.getvalue()
+
+async def sample_threads(seconds: float, interval: float = 0.01, limit: int = 15) -> Tuple[str, str]:
+    """全スレッドのスタックを採取し、(collapsedファイルのパス, 上位の要約) を返す"""
+    sampler = StackSampler(interval).start()
+    started = time.monotonic()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        sampler.stop()
+
+    fd, path = tempfile.mkstemp(prefix="netops-profile-", suffix=".collapsed.txt")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(sampler.collapsed())
+    header = f"{sampler.samples}回採取 ({time.monotonic() - started:.1f}秒, 間隔 {interval * 1000:.0f}ms)\n"
+    return path, header + sampler.top(limit)
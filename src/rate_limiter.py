@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Client-side rate limiting for Cloudflare API requests
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+from utils import log
+
+class TokenBucket:
+    """プロセス全体で共有するトークンバケット
+
+    Cloudflareの制限（window秒あたりrequests回）を超えないよう、
+    burst分を除いた残りを一定レートで補充する。どのwindow秒間を取っても
+    burst + (requests - burst) = requests 回以下に収まる。
+    429を受けた場合はpause()で全呼び出し元を指定秒数停止させる。
+    """
+
+    def __init__(self, requests: int = 1200, window: float = 300, burst: int = 50):
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self.total_throttled = 0
+        self.total_429 = 0
+        self.requests = requests
+        self.window = window
+        self.burst = burst
+        self._tokens = float("inf")
+        self._updated = time.monotonic()
+        self.configure()
+
+    def configure(self, requests: Optional[int] = None, window: Optional[float] = None, burst: Optional[int] = None):
+        """指定された設定値のみ反映"""
+        with self._lock:
+            if requests is not None:
+                self.requests = requests
+            if window is not None:
+                self.window = window
+            if burst is not None:
+                self.burst = burst
+            self.capacity = max(1, min(self.burst, self.requests))
+            self.rate = max(self.requests - self.capacity, 1) / self.window
+            self._tokens = min(self._tokens, self.capacity)
+
+    def _refill(self, now: float):
+        # 429停止中は_updatedが停止明けを指しており、それまでは補充しない
+        if now <= self._updated:
+            return
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self) -> float:
+        """トークンを1つ取得し、実行までに待つべき秒数を返す（0なら即時実行可）"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            pause_wait = max(0.0, self._paused_until - now)
+            # 取得は先に確定させ、不足分は待ち時間として返す（呼び出し順に公平）
+            # 不足分の補充は停止明け（_updated）から数えるため、停止中に並んだ呼び出しも順に間隔を空ける
+            self._tokens -= 1
+            token_wait = 0.0
+            if self._tokens < 0:
+                token_wait = max(0.0, self._updated - now) - self._tokens / self.rate
+
+            wait = max(pause_wait, token_wait)
+            if wait > 0:
+                self.total_throttled += 1
+            return wait
+
+    def acquire(self):
+        """トークンを取得（不足時はスレッドをブロックして待機）"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """トークンを取得（不足時はイベントループを止めずに待機）"""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """429受信時に全呼び出し元を指定秒数停止させる"""
+        with self._lock:
+            self.total_429 += 1
+            until = time.monotonic() + seconds
+            if until > self._paused_until:
+                self._paused_until = until
+                # 停止明けに一斉送信しないようバケットも空にし、停止中は補充しない
+                self._refill(time.monotonic())
+                self._tokens = min(self._tokens, 0.0)
+                self._updated = until
+        log(f"Cloudflare APIのレート制限に達しました。{seconds:.0f}秒間リクエストを停止します", "WARNING")
+
+    def remaining(self) -> int:
+        """即時に送信できる残りリクエスト数"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._paused_until > now:
+                return 0
+            return max(0, int(self._tokens))
+
+    def status(self) -> Dict:
+        """現在の状態を取得"""
+        remaining = self.remaining()
+        with self._lock:
+            return {
+                "remaining": remaining,
+                "capacity": self.capacity,
+                "requests": self.requests,
+                "window": self.window,
+                "rate_per_second": round(self.rate, 3),
+                "paused_for": max(0.0, round(self._paused_until - time.monotonic(), 1)),
+                "throttled": self.total_throttled,
+                "rate_limited": self.total_429,
+            }
+
+def parse_retry_after(value: Optional[str], default: float = 60) -> float:
+    """Retry-Afterヘッダー（秒数）を解釈"""
+    try:
+        return max(1.0, float(value))
+    except (TypeError, ValueError):
+        return default
+
+# プロセス全体で共有するリミッター
+_shared_limiter: Optional[TokenBucket] = None
+_shared_lock = threading.Lock()
+
+def get_rate_limiter(requests: Optional[int] = None, window: Optional[float] = None, burst: Optional[int] = None) -> TokenBucket:
+    """共有のTokenBucketを取得（指定された設定値は反映する）"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = TokenBucket()
+        _shared_limiter.configure(requests, window, burst)
+        return _shared_limiter
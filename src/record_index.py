@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Zone-wide DNS record index for Cloudflare DNS Manager
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# インデックス読み込み時の1ページあたりの取得件数
+INDEX_PAGE_SIZE = 5000
+
+class ZoneRecordIndex:
+    """ゾーン内のDNSレコードを (name, type) で引けるインメモリインデックス
+
+    ゾーン全体を一度に読み込み、自身の書き込みレスポンスで差分更新する。
+    TTLを過ぎるとstale扱いになり、次回参照時に呼び出し側が再読み込みする。
+    """
+
+    def __init__(self, ttl: int = 300):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._by_key: Dict[Tuple[str, str], List[Dict]] = {}
+        self._by_id: Dict[str, Dict] = {}
+        # インデックスに含まれるレコードタイプ（タイプ省略時の検索用）
+        self._types: Set[str] = set()
+        self._loaded_at: Optional[float] = None
+
+    @staticmethod
+    def _key(name: str, record_type: str) -> Tuple[str, str]:
+        return name.lower().rstrip('.'), record_type.upper()
+
+    def is_stale(self) -> bool:
+        """インデックスが未読み込み、またはTTL切れかを判定"""
+        with self._lock:
+            if self._loaded_at is None:
+                return True
+            return time.monotonic() - self._loaded_at >= self.ttl
+
+    def invalidate(self):
+        """インデックスを無効化し、次回参照時に再読み込みさせる"""
+        with self._lock:
+            self._loaded_at = None
+
+    def replace(self, records: Iterable[Dict]):
+        """ゾーン全体のレコードでインデックスを置き換える"""
+        by_key: Dict[Tuple[str, str], List[Dict]] = {}
+        by_id: Dict[str, Dict] = {}
+        for record in records:
+            by_key.setdefault(self._key(record['name'], record['type']), []).append(record)
+            by_id[record['id']] = record
+
+        with self._lock:
+            self._by_key = by_key
+            self._by_id = by_id
+            self._types = {record_type for _, record_type in by_key}
+            self._loaded_at = time.monotonic()
+
+    def lookup(self, name: str, record_type: Optional[str] = None) -> List[Dict]:
+        """名前（とタイプ）に一致するレコードを取得"""
+        with self._lock:
+            if record_type:
+                return list(self._by_key.get(self._key(name, record_type), []))
+
+            # 全件を走査せず、存在するタイプごとにキーで引く
+            lowered = name.lower().rstrip('.')
+            return [r for t in sorted(self._types) for r in self._by_key.get((lowered, t), [])]
+
+    def upsert(self, record: Dict):
+        """作成・更新レスポンスのレコードをインデックスに反映"""
+        with self._lock:
+            self.discard(record['id'])
+            key = self._key(record['name'], record['type'])
+            self._by_key.setdefault(key, []).append(record)
+            self._types.add(key[1])
+            self._by_id[record['id']] = record
+
+    def discard(self, record_id: str):
+        """削除されたレコードをインデックスから除去"""
+        with self._lock:
+            old = self._by_id.pop(record_id, None)
+            if old is None:
+                return
+
+            key = self._key(old['name'], old['type'])
+            remaining = [r for r in self._by_key.get(key, []) if r['id'] != record_id]
+            if remaining:
+                self._by_key[key] = remaining
+            else:
+                self._by_key.pop(key, None)
+
+    def names(self, record_type: Optional[str] = None) -> List[str]:
+        """インデックス内のレコード名（タイプ指定時はそのタイプのみ）"""
+        record_type = record_type.upper() if record_type else None
+        with self._lock:
+            return sorted({n for n, t in self._by_key if record_type is None or t == record_type})
+
+    def records(self) -> List[Dict]:
+        """インデックス内の全レコードを取得"""
+        with self._lock:
+            return list(self._by_id.values())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._by_id)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Post-reboot readiness probe that decides when DNS can be resynced
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional
+
+from ip_resolver import PublicIPResolver
+from utils import log
+
+class PostRebootWatcher:
+    """ルーター再起動後にゲートウェイと公開IPを監視し、DNS更新の開始時点を判断する
+
+    ゲートウェイへのTCP接続と公開IPの取得を interval 秒ごとに行い、
+    新しいIPが stable_checks 回続けて得られた時点で完了とする。
+    回線断を観測した後であれば、再起動前と同じIPが安定して得られた場合も完了とする
+    （IPが変わらないこともあるため）。timeout 秒を超えたら打ち切る。
+    """
+
+    CHANGED = "changed"
+    UNCHANGED = "unchanged"
+    TIMEOUT = "timeout"
+
+    def __init__(self, resolver: PublicIPResolver, gateway: str, port: int = 80, interval: float = 5,
+                 stable_checks: int = 2, timeout: float = 600, connect_timeout: float = 2):
+        self.resolver = resolver
+        self.gateway = gateway
+        self.port = port
+        self.interval = interval
+        self.stable_checks = max(1, stable_checks)
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+
+    async def gateway_reachable(self) -> bool:
+        """ゲートウェイ（ルーター管理画面）にTCP接続できるか"""
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(self.gateway, self.port), self.connect_timeout)
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return True
+
+    async def wait(self, previous_ip: Optional[str], started_at: Optional[float] = None) -> Dict:
+        """新しいIPが安定するまで待機
+
+        Args:
+            previous_ip: 再起動前の公開IP
+            started_at: 再起動を開始した時刻（time.monotonic()、省略時は現在）
+
+        Returns:
+            status（changed/unchanged/timeout）、ip、previous_ip、
+            outage_seconds（回線断の観測時間）、waited_seconds、probes を含む辞書
+        """
+        started_at = started_at or time.monotonic()
+        deadline = started_at + self.timeout
+        outage_started: Optional[float] = None
+        outage_ended: Optional[float] = None
+        candidate: Optional[str] = None
+        streak = 0
+        probes = 0
+
+        while True:
+            probes += 1
+            now = time.monotonic()
+            ip = None
+            if await self.gateway_reachable():
+                ip = await self.resolver.resolve_async(force_refresh=True, probe=True)
+
+            if ip is None:
+                # ゲートウェイ不達またはWAN未接続
+                if outage_started is None:
+                    outage_started = now
+                    log("ルーター再起動による回線断を検出しました")
+                outage_ended = None
+                candidate, streak = None, 0
+            else:
+                if outage_started is not None and outage_ended is None:
+                    outage_ended = now
+                    log(f"回線が復旧しました: {ip} (回線断 {outage_ended - outage_started:.0f}秒)")
+
+                usable = ip != previous_ip or outage_started is not None
+                if usable and ip == candidate:
+                    streak += 1
+                elif usable:
+                    candidate, streak = ip, 1
+                else:
+                    candidate, streak = None, 0
+
+                if streak >= self.stable_checks:
+                    return self._result(self.CHANGED if ip != previous_ip else self.UNCHANGED,
+                                        ip, previous_ip, started_at, outage_started, outage_ended, probes)
+
+            if time.monotonic() + self.interval > deadline:
+                log(f"再起動後のIP確認がタイムアウトしました（{self.timeout}秒）", "WARNING")
+                return self._result(self.TIMEOUT, ip, previous_ip, started_at, outage_started, outage_ended, probes)
+            await asyncio.sleep(self.interval)
+
+    @staticmethod
+    def _result(status: str, ip: Optional[str], previous_ip: Optional[str], started_at: float,
+                outage_started: Optional[float], outage_ended: Optional[float], probes: int) -> Dict:
+        now = time.monotonic()
+        outage = 0.0
+        if outage_started is not None:
+            outage = (outage_ended or now) - outage_started
+        elif status == PostRebootWatcher.CHANGED:
+            # 回線断を観測できなかった場合は再起動開始からIP変更確認までを上限値とする
+            outage = now - started_at
+        return {
+            "status": status,
+            "ip": ip,
+            "previous_ip": previous_ip,
+            "outage_seconds": round(outage, 1),
+            "waited_seconds": round(now - started_at, 1),
+            "probes": probes,
+        }
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Retry policy and per-host circuit breakers for outbound HTTP calls
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from utils import log
+
+class RetryPolicy:
+    """上限付き指数バックオフ（フルジッター）のリトライ方針"""
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 8.0, jitter: bool = True):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def delay(self, attempt: int) -> float:
+        """attempt回目（0始まり）の失敗後に待つ秒数"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(0, ceiling) if self.jitter else ceiling
+
+    @staticmethod
+    def is_retryable_status(status_code: Optional[int]) -> bool:
+        """リトライ対象のHTTPステータスか（429はレートリミッター側で扱う）"""
+        return status_code is None or status_code == 408 or status_code >= 500
+
+    def sleep(self, attempt: int) -> float:
+        """スレッドをブロックして待機（ワーカースレッド専用）"""
+        wait = self.delay(attempt)
+        time.sleep(wait)
+        return wait
+
+    async def sleep_async(self, attempt: int) -> float:
+        """イベントループを止めずに待機"""
+        wait = self.delay(attempt)
+        await asyncio.sleep(wait)
+        return wait
+
+class CircuitBreaker:
+    """ホスト単位のサーキットブレーカー
+
+    連続failure_threshold回失敗するとopenになり、reset_timeout秒間は
+    リクエストを送らずに即座に失敗させる。経過後はhalf_openで1件だけ
+    試行し、成功すればclosedに戻る。試行が結果を記録せずに終わった場合
+    （キャンセル・想定外の例外）は呼び出し元がrelease()で解放する。解放されない
+    試行もreset_timeout秒経てば打ち切り、次の呼び出しで再度試行する。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self.total_failures = 0
+        self.total_retries = 0
+        self.total_rejected = 0
+        self.last_error: Optional[str] = None
+        self.last_failure_at: Optional[float] = None
+
+    def allow(self) -> bool:
+        """リクエストを送ってよいか"""
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self.total_rejected += 1
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+
+            if self._state == self.HALF_OPEN:
+                now = time.monotonic()
+                if self._probe_in_flight and now - self._probe_started < self.reset_timeout:
+                    self.total_rejected += 1
+                    return False
+                self._probe_in_flight = True
+                self._probe_started = now
+
+            return True
+
+    def release(self):
+        """結果を記録せずに終わった試行を解放（half_openのまま次の呼び出しで再度試行する）"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                log(f"サーキットブレーカーを閉じました: {self.name}")
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self, error: str):
+        with self._lock:
+            self._consecutive_failures += 1
+            self.total_failures += 1
+            self.last_error = error
+            self.last_failure_at = time.time()
+            self._probe_in_flight = False
+
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    log(f"サーキットブレーカーを開きました: {self.name} ({self._consecutive_failures}回連続失敗: {error})", "WARNING")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def record_retry(self):
+        with self._lock:
+            self.total_retries += 1
+
+    def status(self) -> Dict:
+        """現在の状態を取得"""
+        with self._lock:
+            state = self._state
+            retry_in = 0.0
+            if state == self.OPEN:
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            return {
+                "name": self.name,
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "retry_in": round(retry_in, 1),
+                "failures": self.total_failures,
+                "retries": self.total_retries,
+                "rejected": self.total_rejected,
+                "last_error": self.last_error,
+                "last_failure_at": self.last_failure_at,
+            }
+
+# ホストごとのブレーカー（プロセス全体で共有）
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_breaker_settings = {"failure_threshold": 5, "reset_timeout": 30}
+
+def configure_circuit_breakers(failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None):
+    """ブレーカーの設定値を反映（既存のブレーカーにも適用）"""
+    with _breakers_lock:
+        if failure_threshold is not None:
+            _breaker_settings["failure_threshold"] = failure_threshold
+        if reset_timeout is not None:
+            _breaker_settings["reset_timeout"] = reset_timeout
+        for breaker in _breakers.values():
+            breaker.failure_threshold = _breaker_settings["failure_threshold"]
+            breaker.reset_timeout = _breaker_settings["reset_timeout"]
+
+def get_circuit_breaker(url: str) -> CircuitBreaker:
+    """URLのホストに対応するブレーカーを取得"""
+    host = urlsplit(url).netloc or url
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(host, **_breaker_settings)
+            _breakers[host] = breaker
+        return breaker
+
+def circuit_breaker_status() -> Dict[str, Dict]:
+    """全ブレーカーの状態を取得"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.status() for breaker in breakers}
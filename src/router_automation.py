@@ -1,12 +1,20 @@
 # coding: UTF-8
+import json
 import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import time
+
+from metrics import ROUTER_STEP_SECONDS
 
 # 環境変数から設定を取得
 ROUTER_IP = os.getenv('ROUTER_IP', '192.168.0.1')
@@ -16,162 +24,279 @@ ROUTER_PASS = os.getenv('ROUTER_PASS')
 # デバッグフラグ
 DEBUG = os.getenv('DEBUG', 'true').lower() == 'true'
 
+# スクリーンショット・HTMLの保存先
+OUTPUT_DIR = os.getenv('ROUTER_OUTPUT_DIR', '/app/data/output')
 
-# Setup Chrome options for Selenium standalone container
-options = Options()
-options.add_argument("--headless")
-options.add_argument("--no-sandbox")
-options.add_argument("--disable-dev-shm-usage")
-options.add_argument("--disable-gpu")
-options.add_argument("--window-size=1920,1080")
-options.add_argument("--disable-extensions")
-options.add_argument("--disable-web-security")
-
-# ChromeDriverサービス設定 (Seleniumコンテナの標準パス)
-webdriver_service = Service("/usr/bin/chromedriver")
-
-# Set the driver
-driver = webdriver.Chrome(service=webdriver_service, options=options)
-
-try:
-    print("ルーター管理画面にアクセス中...")
-    driver.get(f"http://{ROUTER_IP}")
-    
-    time.sleep(3)
-    
-    # ユーザー名の入力欄を探して入力
-    username_field = WebDriverWait(driver, 10).until(
-        EC.presence_of_element_located((By.ID, "Frm_Username"))
-    )
-    username_field.clear()
-    username_field.send_keys(ROUTER_USER)
-    
-    # パスワードの入力欄を探して入力
-    password_field = driver.find_element(By.ID, "Frm_Password")
-    password_field.clear()
-    password_field.send_keys(ROUTER_PASS)
-    
-    # ログインボタンをクリック
-    login_button = driver.find_element(By.ID, "LoginId")
-    login_button.click()
-    
-    print("ログイン完了")
-    time.sleep(5)
-    
-    # メインナビゲーションが表示されるまで待機
-    WebDriverWait(driver, 10).until(
-        EC.presence_of_element_located((By.ID, "mainNavigator"))
-    )
-    
-    print("管理&診断メニューを探しています...")
-    
-    # ページが完全に読み込まれるまで待機
-    WebDriverWait(driver, 10).until(
-        lambda driver: driver.execute_script("return document.readyState") == "complete"
-    )
-    
-    # 管理&診断メニューをクリック
-    try:
-        admin_diag_menu = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.ID, "mgrAndDiag"))
-        )
+# ChromeDriverのパス (Seleniumコンテナの標準パス)
+CHROMEDRIVER_PATH = "/usr/bin/chromedriver"
+
+# 各ステップの待機上限（秒）
+WAIT_TIMEOUT = int(os.getenv('ROUTER_WAIT_TIMEOUT', '10'))
+
+Reporter = Callable[[str], None]
+
+
+class RouterJobCancelled(Exception):
+    """実行中のジョブがキャンセルされた"""
+
+
+def wait_until(driver, timeout: float, condition, report: Reporter = print):
+    """WebDriverWait.untilと同じだが、待機中もジョブのキャンセルを確認する
+
+    reportにcancelled属性（キャンセル要求の有無を返す関数）があれば、
+    条件を確認するたびに呼び出し、要求があればRouterJobCancelledを送出する。
+    """
+    cancelled = getattr(report, "cancelled", None)
+
+    def check(d):
+        if cancelled is not None and cancelled():
+            raise RouterJobCancelled("ジョブがキャンセルされました")
+        return condition(d)
+
+    return WebDriverWait(driver, timeout).until(check)
+
+
+class StepTrace:
+    """ルーター操作の各ステップの所要時間を記録し、JSONで保存する"""
+
+    def __init__(self):
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.steps: List[Dict] = []
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def step(self, name: str):
+        """ステップをタイミングスパンで囲む"""
+        started = time.perf_counter()
+        entry = {"name": name, "offset": round(started - self._origin, 3), "duration": 0.0, "status": "ok"}
+        try:
+            yield entry
+        except Exception as e:
+            entry["status"] = "error"
+            entry["error"] = str(e).splitlines()[0] if str(e) else type(e).__name__
+            raise
+        finally:
+            entry["duration"] = round(time.perf_counter() - started, 3)
+            self.steps.append(entry)
+            ROUTER_STEP_SECONDS.observe(time.perf_counter() - started, step=name, status=entry["status"])
+
+    @property
+    def total(self) -> float:
+        return round(sum(step["duration"] for step in self.steps), 3)
+
+    def summary(self) -> str:
+        """1行の要約（Discord出力用）"""
+        return ", ".join(f"{step['name']} {step['duration']:.1f}s" for step in self.steps) + f" (合計 {self.total:.1f}s)"
+
+    def write(self, path: Optional[str] = None) -> str:
+        """トレースをスクリーンショットと同じ場所にJSONで保存"""
+        path = path or os.path.join(OUTPUT_DIR, "router_trace.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"started_at": self.started_at, "total": self.total, "steps": self.steps}, f, ensure_ascii=False, indent=2)
+        return path
+
+
+def create_driver(driver_path: str = CHROMEDRIVER_PATH) -> webdriver.Chrome:
+    """ヘッドレスChromeを起動"""
+    # Setup Chrome options for Selenium standalone container
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-web-security")
+
+    webdriver_service = Service(driver_path)
+    return webdriver.Chrome(service=webdriver_service, options=options)
+
+
+def save_page(driver, name: str):
+    """現在のページのHTMLとスクリーンショットを保存"""
+    with open(os.path.join(OUTPUT_DIR, f"{name}.html"), "w", encoding="utf-8") as f:
+        f.write(driver.page_source)
+    driver.save_screenshot(os.path.join(OUTPUT_DIR, f"{name}.png"))
+
+
+def is_logged_in(driver) -> bool:
+    """ログイン済みの管理画面が表示されているか"""
+    return bool(driver.find_elements(By.ID, "mainNavigator"))
+
+
+def login(driver, router_ip: str, username: str, password: str, report: Reporter = print,
+          trace: Optional[StepTrace] = None):
+    """ルーター管理画面にログイン"""
+    trace = trace or StepTrace()
+
+    with trace.step("open_login_page"):
+        report("ルーター管理画面にアクセス中...")
+        driver.get(f"http://{router_ip}")
+
+        # ログインフォームか（セッションが残っていれば）管理画面が出るまで待機
+        wait_until(driver, WAIT_TIMEOUT,
+                   lambda d: d.find_elements(By.ID, "Frm_Username") or d.find_elements(By.ID, "mainNavigator"),
+                   report)
+
+    # 前回のセッションが残っていればログインを省略
+    if is_logged_in(driver):
+        report("ログイン済みのセッションを再利用します")
+        return
+
+    with trace.step("login"):
+        # ユーザー名の入力欄を探して入力
+        username_field = wait_until(driver, WAIT_TIMEOUT, EC.element_to_be_clickable((By.ID, "Frm_Username")), report)
+        username_field.clear()
+        username_field.send_keys(username)
+
+        # パスワードの入力欄を探して入力
+        password_field = driver.find_element(By.ID, "Frm_Password")
+        password_field.clear()
+        password_field.send_keys(password)
+
+        # ログインボタンをクリック
+        login_button = driver.find_element(By.ID, "LoginId")
+        login_button.click()
+
+        # メインナビゲーションが表示されるまで待機
+        wait_until(driver, WAIT_TIMEOUT, EC.presence_of_element_located((By.ID, "mainNavigator")), report)
+        report("ログイン完了")
+
+
+def open_admin_diag(driver, report: Reporter = print, trace: Optional[StepTrace] = None):
+    """管理&診断ページに移動"""
+    trace = trace or StepTrace()
+
+    with trace.step("open_admin_diag"):
+        report("管理&診断メニューを探しています...")
+
+        # ページが完全に読み込まれるまで待機
+        wait_until(driver, WAIT_TIMEOUT, lambda driver: driver.execute_script("return document.readyState") == "complete", report)
+
+        # 管理&診断メニューをクリック
+        admin_diag_menu = wait_until(driver, WAIT_TIMEOUT, EC.element_to_be_clickable((By.ID, "mgrAndDiag")), report)
         admin_diag_menu.click()
-        time.sleep(3)
-        print("管理&診断ページに移動")
-        
-        # 管理&診断ページのHTMLを保存
-        with open("/app/data/output/admin_diag_page.html", "w", encoding="utf-8") as f:
-            f.write(driver.page_source)
-        
-        # スクリーンショットを撮影
-        driver.save_screenshot("/app/data/output/admin_diag_page.png")
-        
+
+        # リブートボタンが表示されたらページ遷移完了
+        wait_until(driver, WAIT_TIMEOUT, EC.presence_of_element_located((By.ID, "Btn_restart")), report)
+        report("管理&診断ページに移動")
+
+    with trace.step("save_admin_diag_page"):
+        # 管理&診断ページのHTMLとスクリーンショットを保存
+        save_page(driver, "admin_diag_page")
+
+
+def reboot(driver, debug: bool, report: Reporter = print, trace: Optional[StepTrace] = None) -> bool:
+    """リブートボタンを押し、DEBUGでなければ確認ダイアログのOKを押す
+
+    Returns:
+        リブートを実行した場合True
+    """
+    trace = trace or StepTrace()
+
+    with trace.step("click_reboot"):
         # リブートボタンを探してクリック
-        print("リブートボタンを探しています...")
+        report("リブートボタンを探しています...")
+        reboot_button = wait_until(driver, WAIT_TIMEOUT, EC.element_to_be_clickable((By.ID, "Btn_restart")), report)
+        report("リブートボタンをクリック")
+        reboot_button.click()
+
+        # 確認ダイアログが表示されるまで待機
+        report("確認ダイアログの表示を待機中...")
+        wait_until(driver, WAIT_TIMEOUT, EC.visibility_of_element_located((By.ID, "confirmLayer")), report)
+
+    with trace.step("save_confirm_dialog"):
+        # 確認ダイアログのスクリーンショットとHTMLを保存
+        report("確認ダイアログのスクリーンショットを撮影")
+        save_page(driver, "reboot_confirm_dialog")
+
+    # DEBUGモードでない場合は最終確認ボタン（OK）を押す
+    if debug:
+        report("(デバッグモード: 最終確認ボタン（OK）をスキップ)")
+        report("処理完了: リブートボタンクリック、確認ダイアログ表示、スクリーンショット撮影完了")
+        report("注意: 最終確認ボタン（OK）はまだ押していません")
+        return False
+
+    with trace.step("confirm_reboot"):
+        report("最終確認ボタン（OK）をクリックします...")
+        confirm_ok_button = wait_until(driver, WAIT_TIMEOUT // 2 or 1, EC.element_to_be_clickable((By.ID, "confirmOK")), report)
+        confirm_ok_button.click()
+        report("最終確認ボタン（OK）をクリックしました - ルーターリブート開始")
+
+        # リブート開始後、確認ダイアログが閉じるまで待機（ルーターが応答しなくなる場合もある）
         try:
-            reboot_button = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.ID, "Btn_restart"))
-            )
-            print("リブートボタンをクリック")
-            reboot_button.click()
-            time.sleep(2)
-            
-            # 確認ダイアログが表示されるまで待機
-            print("確認ダイアログの表示を待機中...")
-            WebDriverWait(driver, 10).until(
-                EC.visibility_of_element_located((By.ID, "confirmLayer"))
-            )
-            
-            # 確認ダイアログのスクリーンショットを撮影
-            print("確認ダイアログのスクリーンショットを撮影")
-            driver.save_screenshot("/app/data/output/reboot_confirm_dialog.png")
-            
-            # 確認ダイアログのHTMLを保存
-            with open("/app/data/output/reboot_confirm_dialog.html", "w", encoding="utf-8") as f:
-                f.write(driver.page_source)
-            
-            
-            # DEBUGモードでない場合は最終確認ボタン（OK）を押す
-            if DEBUG:
-                print("\n(デバッグモード: 最終確認ボタン（OK）をスキップ)")
-                print("処理完了: リブートボタンクリック、確認ダイアログ表示、スクリーンショット撮影完了")
-                print("注意: 最終確認ボタン（OK）はまだ押していません")
-            else:
-                print("最終確認ボタン（OK）をクリックします...")
-                try:
-                    confirm_ok_button = WebDriverWait(driver, 5).until(
-                        EC.element_to_be_clickable((By.ID, "confirmOK"))
-                    )
-                    confirm_ok_button.click()
-                    print("最終確認ボタン（OK）をクリックしました - ルーターリブート開始")
-                    
-                    # リブート開始後の画面変化を待機・記録
-                    time.sleep(3)
-                    driver.save_screenshot("/app/data/output/reboot_started.png")
-                    
-                    print("\n処理完了: ルーターリブートを実行しました")
-                    
-                except Exception as ok_e:
-                    print(f"最終確認ボタン（OK）のクリックでエラー: {ok_e}")
-                    print("処理完了: 確認ダイアログまでは成功しましたが、OKボタンのクリックに失敗")
-            
-        except Exception as reboot_e:
-            print(f"リブートボタンのクリックでエラーが発生: {reboot_e}")
-            
-            # 利用可能なボタンを確認
-            print("利用可能なボタンを確認します...")
-            try:
-                buttons = driver.find_elements(By.TAG_NAME, "input")
-                for button in buttons:
-                    if button.get_attribute('type') == 'button':
-                        button_id = button.get_attribute('id')
-                        button_value = button.get_attribute('value')
-                        button_class = button.get_attribute('class')
-                        print(f"ボタン要素: ID={button_id}, Value={button_value}, Class={button_class}")
-            except Exception as btn_list_e:
-                print(f"ボタンの確認でエラー: {btn_list_e}")
-        
-        print("\n処理完了: 管理&診断ページに移動、スクリーンショット撮影完了")
-        
+            wait_until(driver, WAIT_TIMEOUT, EC.invisibility_of_element_located((By.ID, "confirmLayer")), report)
+        except TimeoutException:
+            report("確認ダイアログが閉じないまま応答が途絶えました（リブート中）")
+        driver.save_screenshot(os.path.join(OUTPUT_DIR, "reboot_started.png"))
+
+    report("処理完了: ルーターリブートを実行しました")
+    return True
+
+
+def report_available_controls(driver, report: Reporter = print):
+    """失敗時の調査用に利用可能なメニューとボタンを出力"""
+    report("利用可能なメニューとボタンを確認します...")
+    try:
+        menus = driver.find_elements(By.XPATH, "//div[@id='mn_li']//a")
+        for menu in menus:
+            menu_id = menu.get_attribute('id')
+            menu_page = menu.get_attribute('menupage')
+            report(f"利用可能なメニュー: {menu.text} (ID: {menu_id}, MenuPage: {menu_page})")
+
+        buttons = driver.find_elements(By.TAG_NAME, "input")
+        for button in buttons:
+            if button.get_attribute('type') == 'button':
+                button_id = button.get_attribute('id')
+                button_value = button.get_attribute('value')
+                button_class = button.get_attribute('class')
+                report(f"ボタン要素: ID={button_id}, Value={button_value}, Class={button_class}")
     except Exception as e:
-        print(f"管理&診断ページへの移動でエラーが発生: {e}")
-        
-        # 利用可能なメニューを確認
-        print("利用可能なメニューを確認します...")
+        report(f"メニュー・ボタンの確認でエラー: {e}")
+
+
+def run_reboot(driver, router_ip: str, username: str, password: str, debug: bool,
+               report: Reporter = print, trace: Optional[StepTrace] = None) -> bool:
+    """ログインからリブートまでを実行し、ステップごとの所要時間をrouter_trace.jsonに保存
+
+    Returns:
+        処理が最後まで成功した場合True（DEBUGモードで確認ダイアログまで到達した場合も含む）
+    """
+    trace = trace or StepTrace()
+    try:
+        login(driver, router_ip, username, password, report, trace)
+        open_admin_diag(driver, report, trace)
+        reboot(driver, debug, report, trace)
+        return True
+    except RouterJobCancelled:
+        # キャンセル時は調査用の出力やスクリーンショットを残さずに呼び出し元へ伝える
+        raise
+    except Exception as e:
+        report(f"エラーが発生しました: {e}")
+        report_available_controls(driver, report)
         try:
-            menus = driver.find_elements(By.XPATH, "//div[@id='mn_li']//a")
-            for menu in menus:
-                menu_id = menu.get_attribute('id')
-                menu_page = menu.get_attribute('menupage')
-                print(f"利用可能なメニュー: {menu.text} (ID: {menu_id}, MenuPage: {menu_page})")
-        except Exception as menu_e:
-            print(f"メニューの確認でエラー: {menu_e}")
-    
-except Exception as e:
-    print(f"エラーが発生しました: {e}")
-    driver.save_screenshot("/app/data/output/error_screenshot.png")
-    print("エラー時のスクリーンショットを保存しました: /app/data/output/error_screenshot.png")
-    
-finally:
-    driver.quit()
-    print("スクリプト実行完了")
\ No newline at end of file
+            driver.save_screenshot(os.path.join(OUTPUT_DIR, "error_screenshot.png"))
+            report(f"エラー時のスクリーンショットを保存しました: {os.path.join(OUTPUT_DIR, 'error_screenshot.png')}")
+        except Exception:
+            pass
+        return False
+    finally:
+        report(f"ステップ所要時間: {trace.summary()}")
+        try:
+            trace.write()
+        except OSError as e:
+            report(f"トレースの保存に失敗しました: {e}")
+
+
+def main(password: Optional[str] = None) -> bool:
+    """単体実行用: ブラウザを起動してリブートを実行し、終了時にブラウザを閉じる"""
+    driver = create_driver()
+    try:
+        return run_reboot(driver, ROUTER_IP, ROUTER_USER, password or ROUTER_PASS, DEBUG)
+    finally:
+        driver.quit()
+        print("スクリプト実行完了")
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Long-lived Selenium WebDriver session for router automation
+"""
+
+import threading
+import time
+from typing import Callable, Tuple
+
+import psutil
+from selenium.common.exceptions import WebDriverException
+
+import router_automation
+from utils import log
+
+class RouterDriverManager:
+    """ヘッドレスChromeを常駐させ、ルーター操作に使い回すクラス
+
+    実行のたびにヘルスチェックを行い、応答しない・クラッシュした・
+    メモリ使用量が閾値を超えた場合はブラウザを再起動する。
+    ログイン済みのセッションが残っていればログインを省略する。
+    """
+
+    def __init__(self, router_ip: str, username: str, password: str,
+                 driver_path: str = router_automation.CHROMEDRIVER_PATH,
+                 max_memory_mb: int = 1024):
+        self.router_ip = router_ip
+        self.username = username
+        self.password = password
+        self.driver_path = driver_path
+        self.max_memory_mb = max_memory_mb
+        self._driver = None
+        self.restarts = 0
+        # ブラウザは1つなので操作は直列化する
+        self._lock = threading.Lock()
+
+    def _memory_mb(self) -> float:
+        """chromedriverと配下のChromeプロセスの合計RSS（MB）"""
+        try:
+            root = psutil.Process(self._driver.service.process.pid)
+            processes = [root] + root.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes if p.is_running()) / (1024 * 1024)
+        except (psutil.Error, AttributeError):
+            return 0.0
+
+    def _is_healthy(self) -> bool:
+        if self._driver is None:
+            return False
+        try:
+            self._driver.execute_script("return 1")
+        except WebDriverException as e:
+            log(f"WebDriverが応答しません: {e}", "WARNING")
+            return False
+
+        memory = self._memory_mb()
+        if self.max_memory_mb and memory > self.max_memory_mb:
+            log(f"ブラウザのメモリ使用量が上限を超えました: {memory:.0f}MB > {self.max_memory_mb}MB", "WARNING")
+            return False
+        return True
+
+    def _start(self):
+        started = time.monotonic()
+        self._driver = router_automation.create_driver(self.driver_path)
+        log(f"ヘッドレスChromeを起動しました ({time.monotonic() - started:.1f}秒)")
+
+    def _quit(self):
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            except Exception as e:
+                log(f"WebDriverの終了でエラー: {e}", "WARNING")
+        self._driver = None
+
+    def _ensure_driver(self):
+        """ヘルスチェックを行い、必要ならブラウザを(再)起動"""
+        if self._driver is not None and not self._is_healthy():
+            self._quit()
+            self.restarts += 1
+        if self._driver is None:
+            self._start()
+        return self._driver
+
+    def warm(self):
+        """事前にブラウザを起動しておく"""
+        with self._lock:
+            self._ensure_driver()
+
+    def run_reboot(self, debug: bool, report: Callable[[str], None] = print) -> bool:
+        """常駐ブラウザでログインからリブートまでを実行"""
+        with self._lock:
+            try:
+                driver = self._ensure_driver()
+            except WebDriverException as e:
+                report(f"ブラウザの起動に失敗しました: {e}")
+                return False
+
+            try:
+                success = router_automation.run_reboot(driver, self.router_ip, self.username, self.password, debug, report)
+            except WebDriverException as e:
+                report(f"ブラウザでエラーが発生しました: {e}")
+                success = False
+
+            if success and not debug:
+                # リブート後はルーター側のセッションが消えるため、ブラウザは残してCookieのみ破棄
+                try:
+                    driver.delete_all_cookies()
+                    driver.get("about:blank")
+                except WebDriverException:
+                    self._quit()
+            return success
+
+    def status(self) -> Tuple[bool, float, int]:
+        """(起動中か, メモリ使用量MB, 再起動回数)"""
+        if self._driver is None:
+            return False, 0.0, self.restarts
+        return True, self._memory_mb(), self.restarts
+
+    def close(self):
+        with self._lock:
+            self._quit()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Browserless router automation over plain HTTP form posts
+"""
+
+import os
+import re
+import threading
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import requests
+
+import router_automation
+from router_automation import OUTPUT_DIR, StepTrace
+from utils import log
+
+# 管理画面のスクリプト内に埋め込まれたトークン
+#   getObj("Frm_Logintoken").value = "3";
+#   var _SESSION_TOKEN = "123456";
+_SCRIPT_VALUE_RE = re.compile(r'getObj\(\s*["\'](\w+)["\']\s*\)\.value\s*=\s*["\']([^"\']*)["\']')
+_SCRIPT_TOKEN_RE = re.compile(r'\bvar\s+(_?\w*TOKEN\w*)\s*=\s*["\']([^"\']*)["\']', re.IGNORECASE)
+
+class _PageScraper(HTMLParser):
+    """ページ内のフォームとID付き要素を収集する"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.forms: List[Dict] = []
+        self.elements: Dict[str, Dict[str, str]] = {}
+        self._form: Optional[Dict] = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {key: value or "" for key, value in attrs}
+        if attrs.get("id"):
+            self.elements[attrs["id"]] = dict(attrs, tag=tag)
+
+        if tag == "form":
+            self._form = {"action": attrs.get("action", ""), "method": attrs.get("method", "get").lower(),
+                          "id": attrs.get("id", ""), "inputs": []}
+            self.forms.append(self._form)
+        elif tag in ("input", "button", "select", "textarea") and self._form is not None:
+            self._form["inputs"].append(dict(attrs, tag=tag))
+
+    def handle_endtag(self, tag):
+        if tag == "form":
+            self._form = None
+
+class RouterPage:
+    """取得したページ（URL・HTML・フォーム・スクリプト内トークン）"""
+
+    def __init__(self, url: str, html: str):
+        self.url = url
+        self.html = html
+        scraper = _PageScraper()
+        scraper.feed(html)
+        self.forms = scraper.forms
+        self.elements = scraper.elements
+        self.script_values = dict(_SCRIPT_VALUE_RE.findall(html))
+        self.script_tokens = dict(_SCRIPT_TOKEN_RE.findall(html))
+
+    def has(self, element_id: str) -> bool:
+        return element_id in self.elements
+
+    def form_with(self, element_id: str) -> Optional[Dict]:
+        """指定IDの要素を含むフォーム"""
+        for form in self.forms:
+            if any(field.get("id") == element_id for field in form["inputs"]):
+                return form
+        return None
+
+    def form_data(self, form: Dict) -> Dict[str, str]:
+        """フォームの送信値（hidden値にスクリプトで設定されるトークンを反映）"""
+        data = {}
+        for field in form["inputs"]:
+            name = field.get("name")
+            if not name or field.get("type") in ("button", "submit", "reset"):
+                continue
+            value = self.script_values.get(field.get("id", ""), self.script_values.get(name, field.get("value", "")))
+            data[name] = value
+        for name, value in self.script_tokens.items():
+            if name in data or any(field.get("name") == name for field in form["inputs"]):
+                data[name] = value
+        return data
+
+class RouterHTTPDriver:
+    """ブラウザを使わずにログイン・管理&診断ページへの移動・リブートを行うクラス
+
+    Selenium版と同じ要素ID（Frm_Username, Frm_Password, LoginId, mgrAndDiag,
+    Btn_restart, confirmOK）を手がかりにフォームを解析し、hidden値と
+    スクリプト内のトークンを拾ってそのままPOSTする。セッションCookieは
+    実行をまたいで保持し、ログイン済みであればログインを省略する。
+    """
+
+    def __init__(self, router_ip: str, username: str, password: str, timeout: float = 10,
+                 menu_path: str = "/getpage.gch?pid=1002&nextpage={menupage}",
+                 reboot_fields: Optional[Dict[str, str]] = None):
+        self.router_ip = router_ip
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.menu_path = menu_path
+        self.reboot_fields = reboot_fields if reboot_fields is not None else {"IF_ACTION": "devrestart"}
+        self.base_url = router_ip if "://" in router_ip else f"http://{router_ip}"
+        self._session: Optional[requests.Session] = None
+        self.logins = 0
+        # セッションは1つなので操作は直列化する
+        self._lock = threading.Lock()
+
+    def _ensure_session(self) -> requests.Session:
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.headers["User-Agent"] = "netops-bot"
+        return self._session
+
+    def _fetch(self, method: str, url: str, data: Optional[Dict] = None) -> RouterPage:
+        response = self._ensure_session().request(method, url, data=data, timeout=self.timeout)
+        response.raise_for_status()
+        return RouterPage(response.url, response.text)
+
+    @staticmethod
+    def _save(page: RouterPage, name: str):
+        """Selenium版と同じ場所にHTMLを保存"""
+        with open(os.path.join(OUTPUT_DIR, f"{name}.html"), "w", encoding="utf-8") as f:
+            f.write(page.html)
+
+    def login(self, report: Callable[[str], None], trace: StepTrace) -> RouterPage:
+        """ルーター管理画面にログイン（セッションが残っていれば再利用）"""
+        with trace.step("open_login_page"):
+            report("ルーター管理画面にアクセス中...")
+            page = self._fetch("GET", self.base_url + "/")
+
+        if page.has("mainNavigator"):
+            report("ログイン済みのセッションを再利用します")
+            return page
+
+        with trace.step("login"):
+            form = page.form_with("Frm_Username")
+            if form is None:
+                raise RuntimeError("ログインフォーム（Frm_Username）が見つかりません")
+
+            data = page.form_data(form)
+            data[page.elements["Frm_Username"].get("name", "Username")] = self.username
+            password_name = page.elements.get("Frm_Password", {}).get("name", "Password")
+            data[password_name] = self.password
+            login_button = page.elements.get("LoginId", {})
+            if login_button.get("name"):
+                data[login_button["name"]] = login_button.get("value", "")
+
+            page = self._fetch(form["method"].upper(), urljoin(page.url, form["action"]), data)
+            if not page.has("mainNavigator"):
+                raise RuntimeError("ログインに失敗しました（メインナビゲーションが表示されません）")
+            self.logins += 1
+            report("ログイン完了")
+        return page
+
+    def open_admin_diag(self, page: RouterPage, report: Callable[[str], None], trace: StepTrace) -> RouterPage:
+        """管理&診断ページに移動"""
+        with trace.step("open_admin_diag"):
+            report("管理&診断メニューを探しています...")
+            menu = page.elements.get("mgrAndDiag")
+            if menu is None:
+                raise RuntimeError("管理&診断メニュー（mgrAndDiag）が見つかりません")
+
+            href = menu.get("href", "")
+            if href and href != "#" and not href.startswith("javascript"):
+                target = urljoin(page.url, href)
+            else:
+                target = urljoin(page.url, self.menu_path.format(menupage=menu.get("menupage", "")))
+
+            page = self._fetch("GET", target)
+            if not page.has("Btn_restart"):
+                raise RuntimeError("リブートボタン（Btn_restart）が見つかりません")
+            report("管理&診断ページに移動")
+
+        with trace.step("save_admin_diag_page"):
+            self._save(page, "admin_diag_page")
+        return page
+
+    def reboot(self, page: RouterPage, debug: bool, report: Callable[[str], None], trace: StepTrace) -> bool:
+        """リブートフォームを送信（DEBUGモードでは送信直前で止める）"""
+        with trace.step("click_reboot"):
+            report("リブートボタンを探しています...")
+            form = page.form_with("Btn_restart") or page.form_with("confirmOK")
+            if form is None:
+                raise RuntimeError("リブート用のフォームが見つかりません")
+            data = page.form_data(form)
+            data.update(self.reboot_fields)
+
+        # DEBUGモードでない場合のみ送信する（確認ダイアログのOKに相当）
+        if debug:
+            report("(デバッグモード: リブートの送信をスキップ)")
+            report(f"送信予定のフォーム: {urljoin(page.url, form['action'])} {sorted(data)}")
+            return False
+
+        with trace.step("confirm_reboot"):
+            report("リブート要求を送信します...")
+            try:
+                self._fetch(form["method"].upper(), urljoin(page.url, form["action"]), data)
+            except (requests.ConnectionError, requests.Timeout):
+                # 応答前にルーターが再起動を始めた場合
+                report("応答を待たずに接続が切断されました（リブート中）")
+            report("リブート要求を送信しました - ルーターリブート開始")
+
+        report("処理完了: ルーターリブートを実行しました")
+        return True
+
+    def warm(self):
+        """事前にセッションを用意しておく"""
+        with self._lock:
+            self._ensure_session()
+
+    def run_reboot(self, debug: bool, report: Callable[[str], None] = print) -> bool:
+        """HTTPでログインからリブートまでを実行"""
+        trace = StepTrace()
+        with self._lock:
+            try:
+                page = self.login(report, trace)
+                page = self.open_admin_diag(page, report, trace)
+                rebooted = self.reboot(page, debug, report, trace)
+                if rebooted:
+                    # リブート後はルーター側のセッションが消えるためCookieを破棄
+                    self._ensure_session().cookies.clear()
+                return True
+            except (requests.RequestException, RuntimeError, OSError) as e:
+                report(f"エラーが発生しました: {e}")
+                self._ensure_session().cookies.clear()
+                return False
+            finally:
+                report(f"ステップ所要時間: {trace.summary()}")
+                try:
+                    trace.write()
+                except OSError as e:
+                    report(f"トレースの保存に失敗しました: {e}")
+
+    def status(self) -> Tuple[bool, float, int]:
+        """(セッション有無, メモリ使用量MB, ログイン回数) — RouterDriverManagerと同じ形"""
+        return self._session is not None, 0.0, self.logins
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+
+def create_router_driver(kind: str, router_ip: str, username: str, password: str,
+                         selenium_config: Optional[Dict] = None, http_config: Optional[Dict] = None):
+    """設定（router.driver）に応じてルーター操作用ドライバーを生成"""
+    if kind == "http":
+        http_config = http_config or {}
+        log("ルーター操作にHTTPドライバーを使用します")
+        return RouterHTTPDriver(
+            router_ip, username, password,
+            timeout=http_config.get("timeout", 10),
+            menu_path=http_config.get("menu_path", "/getpage.gch?pid=1002&nextpage={menupage}"),
+            reboot_fields=http_config.get("reboot_fields")
+        )
+
+    from router_driver import RouterDriverManager
+    selenium_config = selenium_config or {}
+    return RouterDriverManager(
+        router_ip, username, password,
+        driver_path=selenium_config.get("driver_path", router_automation.CHROMEDRIVER_PATH),
+        max_memory_mb=selenium_config.get("max_memory_mb", 1024)
+    )
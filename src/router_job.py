@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Cancellable router jobs with line-by-line progress streaming
+"""
+
+import asyncio
+import os
+import signal
+import sys
+import time
+import uuid
+from typing import Callable, List, Optional
+
+import router_automation
+from metrics import ROUTER_JOB_SECONDS
+from router_automation import RouterJobCancelled
+from structured_log import log_context
+from utils import log
+
+class RouterJob:
+    """ルーター操作を1回実行するジョブ
+
+    mode="in_process" では常駐ドライバーをワーカースレッドで実行し、
+    reportコールバックの出力を1行ずつイベントループに渡す。
+    mode="subprocess" では router_automation.py を asyncio のサブプロセスとして
+    起動し、stdout/stderrを1行ずつ読み取る。どちらも cancel() で停止できる。
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    TIMEOUT = "timeout"
+
+    def __init__(self, mode: str = "in_process", on_line: Optional[Callable[[str], None]] = None):
+        self.id = uuid.uuid4().hex[:8]
+        self.mode = mode
+        self.state = self.PENDING
+        self.lines: List[str] = []
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._on_line = on_line
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._cancel_requested = False
+        self._cancel_raised = False
+
+    @property
+    def running(self) -> bool:
+        return self.state == self.RUNNING
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def _emit(self, line: str):
+        self.lines.append(line)
+        if self._on_line is not None:
+            try:
+                self._on_line(line)
+            except Exception as e:
+                log(f"進捗の通知でエラー: {e}", "WARNING")
+
+    def _reporter(self, loop: asyncio.AbstractEventLoop) -> Callable[[str], None]:
+        """ワーカースレッドから呼ばれるreportコールバック"""
+        def report(line: str):
+            if self._cancel_requested:
+                # 次のステップに進む前に1度だけ例外で処理を打ち切る
+                if not self._cancel_raised:
+                    self._cancel_raised = True
+                    raise RouterJobCancelled("ジョブがキャンセルされました")
+                return
+            loop.call_soon_threadsafe(self._emit, line)
+        def cancelled() -> bool:
+            # 待機中のステップからもキャンセル要求を確認する（router_automation.wait_until）
+            if self._cancel_requested:
+                # 例外はwait_until側で送出されるので、以降のreportでは送出しない
+                self._cancel_raised = True
+            return self._cancel_requested
+
+        report.cancelled = cancelled
+        return report
+
+    async def _run_in_process(self, workers, driver, debug: bool) -> bool:
+        report = self._reporter(asyncio.get_running_loop())
+        return await workers.run(driver.run_reboot, debug, report)
+
+    async def _run_subprocess(self, driver, debug: bool) -> bool:
+        env = dict(os.environ,
+                   ROUTER_IP=driver.router_ip,
+                   ROUTER_USER=driver.username,
+                   ROUTER_PASS=driver.password or "",
+                   DEBUG="true" if debug else "false",
+                   PYTHONUNBUFFERED="1")
+        self._process = await asyncio.create_subprocess_exec(
+            sys.executable, "-u", router_automation.__file__,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            env=env,
+            # Chromeの子プロセスもまとめて停止できるよう別プロセスグループで起動
+            start_new_session=True
+        )
+        try:
+            async for raw in self._process.stdout:
+                self._emit(raw.decode("utf-8", errors="replace").rstrip())
+            return await self._process.wait() == 0
+        finally:
+            # キャンセル・タイムアウトでkillした後も終了を待ち、ゾンビプロセスを残さない
+            if self._process.returncode is None:
+                self._kill_process()
+                await self._process.wait()
+
+    async def run(self, workers, driver, debug: bool, timeout: float = 300) -> bool:
+        """ジョブを実行（タイムアウト時はasyncio.TimeoutErrorを送出）"""
+        self.state = self.RUNNING
+        self.started_at = time.monotonic()
+        try:
+            # ワーカースレッドの処理を含め、このジョブのログにjob_idを付ける
+            with log_context(job_id=self.id):
+                if self.mode == "subprocess":
+                    coro = self._run_subprocess(driver, debug)
+                else:
+                    coro = self._run_in_process(workers, driver, debug)
+                success = await asyncio.wait_for(coro, timeout=timeout)
+        except asyncio.TimeoutError:
+            self.cancel()
+            self.state = self.TIMEOUT
+            raise
+        except RouterJobCancelled:
+            success = False
+        except BaseException:
+            self.state = self.FAILED
+            raise
+        finally:
+            self.finished_at = time.monotonic()
+            if self.state != self.RUNNING:
+                ROUTER_JOB_SECONDS.observe(self.elapsed, mode=self.mode, state=self.state)
+
+        if self._cancel_requested:
+            self.state = self.CANCELLED
+        else:
+            self.state = self.SUCCEEDED if success else self.FAILED
+        ROUTER_JOB_SECONDS.observe(self.elapsed, mode=self.mode, state=self.state)
+        return success and not self._cancel_requested
+
+    def _kill_process(self):
+        """サブプロセスをプロセスグループごとkill（終了の回収は_run_subprocessで行う）"""
+        if self._process is not None and self._process.returncode is None:
+            try:
+                os.killpg(self._process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                self._process.kill()
+
+    def cancel(self) -> bool:
+        """実行中のジョブを停止（サブプロセスはプロセスグループごとkill）"""
+        if self.state != self.RUNNING:
+            return False
+        self._cancel_requested = True
+        self._kill_process()
+        log(f"ルーター操作ジョブをキャンセルしました ({self.mode})", "WARNING", job_id=self.id)
+        return True
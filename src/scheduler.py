@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Min-heap cron scheduler that sleeps until the next fire time
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from datetime import datetime, tzinfo
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from croniter import croniter
+
+from metrics import SCHEDULER_LAG_SECONDS, SCHEDULER_RUNS
+from structured_log import log_context
+from tracing import start_trace
+from utils import atomic_write_json, log
+from worker_pool import BlockingWorkerPool
+
+JobCallback = Callable[[datetime], Awaitable[None]]
+
+def local_timezone() -> tzinfo:
+    """TZ環境変数のタイムゾーン（未設定ならシステムの現在のオフセット）"""
+    name = os.environ.get("TZ")
+    if name:
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            log(f"不明なタイムゾーンです: {name}", "WARNING")
+    return datetime.now().astimezone().tzinfo
+
+class ScheduleStore:
+    """ジョブごとの最終実行・次回実行時刻などをJSONファイルに保存するクラス
+
+    Bot停止中に予定時刻を過ぎたジョブを起動時に判定するために使う。
+    イベントループ上の更新は変更済みとして記録するだけにし、書き込み（fsync）は
+    保存タスクがワーカースレッドでまとめて行う。
+    """
+
+    def __init__(self, path: str, workers: Optional[BlockingWorkerPool] = None):
+        self.path = path
+        self.workers = workers
+        self._state: Dict[str, Dict[str, Any]] = self._load()
+        self._write_lock = threading.Lock()
+        # 変更ごとに進める世代番号（古い内容で新しい内容を上書きしないため）
+        self._generation = 0
+        self._saved_generation = 0
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f).get("jobs", {})
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            log(f"スケジュール状態ファイルを読み込めません: {self.path}: {e}", "WARNING")
+            return {}
+
+    def get(self, name: str) -> Dict[str, Any]:
+        return dict(self._state.get(name, {}))
+
+    @property
+    def dirty(self) -> bool:
+        return self._generation != self._saved_generation
+
+    def update(self, name: str, **fields):
+        """ジョブの状態を更新し、保存を予約（イベントループ外では即時保存）"""
+        self._state.setdefault(name, {}).update(fields)
+        self._generation += 1
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self.flush())
+
+    async def flush(self):
+        """未保存の変更をワーカースレッドで書き込む（実行中に増えた変更もまとめて保存）"""
+        loop = asyncio.get_running_loop()
+        while self.dirty:
+            generation, data = self._generation, self._snapshot()
+            if self.workers is not None:
+                await self.workers.run(self._write, generation, data)
+            else:
+                await loop.run_in_executor(None, self._write, generation, data)
+
+    def save(self):
+        """未保存の変更を呼び出し元のスレッドで書き込む（停止時用）"""
+        if self.dirty:
+            self._write(self._generation, self._snapshot())
+
+    def _snapshot(self) -> Dict[str, Any]:
+        return {"jobs": {name: dict(state) for name, state in self._state.items()}}
+
+    def _write(self, generation: int, data: Dict[str, Any]):
+        with self._write_lock:
+            if generation <= self._saved_generation:
+                return
+            try:
+                atomic_write_json(self.path, data)
+            except OSError as e:
+                log(f"スケジュール状態の保存に失敗しました: {e}", "ERROR")
+            # 失敗しても同じ内容で再試行し続けないよう保存済みとして扱う（次の更新で再度書き込む）
+            self._saved_generation = generation
+
+class ScheduledJob:
+    """スケジューラーに登録されたジョブ
+
+    overlap: 前回の実行中に次の時刻が来た場合の扱い
+        skip（実行しない）/ queue（終了後に1回だけ実行）/ replace（前回を中断して実行）
+    catch_up: Bot停止中に過ぎた実行時刻の扱い
+        skip（実行しない）/ run_once（起動時に1回だけ実行）
+    catch_up_window: run_onceで遡る上限（秒、Noneなら無制限）
+    """
+
+    OVERLAP_POLICIES = ("skip", "queue", "replace")
+    CATCH_UP_POLICIES = ("skip", "run_once")
+
+    def __init__(self, name: str, cron: str, callback: JobCallback, overlap: str = "skip",
+                 catch_up: str = "skip", catch_up_window: Optional[float] = None):
+        self.check_policies(overlap, catch_up)
+        self.name = name
+        self.cron = cron
+        self.callback = callback
+        self.overlap = overlap
+        self.catch_up = catch_up
+        self.catch_up_window = catch_up_window
+        self.queued: Optional[datetime] = None
+        self.last_status: Optional[str] = None
+        self.next_run: Optional[datetime] = None
+        self.last_run: Optional[datetime] = None
+        self.last_lag = 0.0
+        self.runs = 0
+        self.skipped = 0
+        # ヒープ上の古いエントリを見分けるための世代番号
+        self.version = 0
+        self.task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def check_policies(cls, overlap: str, catch_up: str):
+        if overlap not in cls.OVERLAP_POLICIES:
+            raise ValueError(f"無効なoverlapポリシーです: {overlap}")
+        if catch_up not in cls.CATCH_UP_POLICIES:
+            raise ValueError(f"無効なcatch_upポリシーです: {catch_up}")
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+class CronScheduler:
+    """次回実行時刻の最小ヒープで複数のcronジョブを管理するクラス
+
+    最も早いジョブの時刻まで眠り、ジョブの追加・変更・削除はヒープへの
+    push（O(log n)）と起床イベントで反映する。変更前のエントリは世代番号で
+    無効化し、取り出した時点で読み捨てる。実行時刻はタイムゾーン付きで
+    計算するため夏時間の切り替えにも追従し、次回時刻は予定時刻を基準に
+    求めるのでループの遅れが蓄積しない。
+    """
+
+    def __init__(self, timezone: Optional[tzinfo] = None, max_sleep: float = 60,
+                 store: Optional[ScheduleStore] = None):
+        self.timezone = timezone or local_timezone()
+        self.store = store
+        # 壁時計の補正（NTP・サスペンド）に備え、一度に眠る上限を設ける
+        self.max_sleep = max_sleep
+        self._jobs: Dict[str, ScheduledJob] = {}
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._counter = itertools.count()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def next_fire_time(self, cron: str, after: datetime) -> datetime:
+        """afterより後の次回実行時刻（タイムゾーン付き）"""
+        return croniter(cron, after.astimezone(self.timezone)).get_next(datetime)
+
+    def _push(self, job: ScheduledJob, fire_time: datetime):
+        job.version += 1
+        job.next_run = fire_time
+        heapq.heappush(self._heap, (fire_time.timestamp(), next(self._counter), job.name, job.version))
+        if self.store is not None:
+            self.store.update(job.name, cron=job.cron, next_run=fire_time.isoformat())
+        if self._wake is not None:
+            self._wake.set()
+
+    def _missed_run(self, job: ScheduledJob, now: datetime) -> Optional[datetime]:
+        """保存済みの次回実行時刻が、実行されないまま過ぎていればその時刻"""
+        if self.store is None:
+            return None
+        state = self.store.get(job.name)
+        if not state.get("next_run") or state.get("cron") != job.cron:
+            return None
+        scheduled = datetime.fromisoformat(state["next_run"])
+        last_run = datetime.fromisoformat(state["last_run"]) if state.get("last_run") else None
+        if scheduled <= now and (last_run is None or last_run < scheduled):
+            return scheduled
+        return None
+
+    def add(self, name: str, cron: str, callback: JobCallback, overlap: str = "skip", catch_up: str = "skip",
+            catch_up_window: Optional[float] = None, after: Optional[datetime] = None) -> ScheduledJob:
+        """ジョブを登録（同名のジョブは置き換え）
+
+        初回登録時は保存済みの状態を確認し、停止中に過ぎた実行時刻があれば
+        catch_upポリシーに従って1回だけ即時実行する。
+        """
+        if not croniter.is_valid(cron):
+            raise ValueError(f"無効なcron式です: {cron}")
+        job = self._jobs.get(name)
+        if job is None:
+            job = ScheduledJob(name, cron, callback, overlap, catch_up, catch_up_window)
+            if self.store is not None:
+                state = self.store.get(name)
+                job.last_status = state.get("last_status")
+                if state.get("last_run"):
+                    job.last_run = datetime.fromisoformat(state["last_run"])
+        else:
+            ScheduledJob.check_policies(overlap, catch_up)
+            job.cron, job.callback = cron, callback
+            job.overlap, job.catch_up, job.catch_up_window = overlap, catch_up, catch_up_window
+
+        now = after or datetime.now(self.timezone)
+        fire_time = self.next_fire_time(cron, now)
+        if name not in self._jobs:
+            missed = self._missed_run(job, now)
+            if missed is not None:
+                overdue = (now - missed).total_seconds()
+                if job.catch_up == "run_once" and (catch_up_window is None or overdue <= catch_up_window):
+                    log(f"停止中に実行されなかったジョブを実行します: {name} (予定 {missed.isoformat()})", "WARNING")
+                    fire_time = missed
+                else:
+                    log(f"停止中に実行されなかったジョブをスキップします: {name} (予定 {missed.isoformat()})", "WARNING")
+        self._jobs[name] = job
+
+        self._push(job, fire_time)
+        log(f"スケジュールを登録しました: {name} ({cron}) 次回 {job.next_run.isoformat()}")
+        return job
+
+    def remove(self, name: str) -> bool:
+        """ジョブを削除（ヒープ上のエントリは次に取り出した時に読み捨てる）"""
+        job = self._jobs.pop(name, None)
+        if job is None:
+            return False
+        job.version += 1
+        if self._wake is not None:
+            self._wake.set()
+        return True
+
+    def get(self, name: str) -> Optional[ScheduledJob]:
+        return self._jobs.get(name)
+
+    def jobs(self) -> List[ScheduledJob]:
+        """次回実行時刻順のジョブ一覧"""
+        return sorted(self._jobs.values(), key=lambda job: job.next_run.timestamp() if job.next_run else float("inf"))
+
+    def _peek(self) -> Optional[Tuple[float, int, str, int]]:
+        """無効になったエントリを捨て、最も早い有効なエントリを返す"""
+        while self._heap:
+            entry = self._heap[0]
+            job = self._jobs.get(entry[2])
+            if job is not None and job.version == entry[3]:
+                return entry
+            heapq.heappop(self._heap)
+        return None
+
+    def _fire(self, job: ScheduledJob, fire_time: datetime):
+        now = datetime.now(self.timezone)
+        job.last_lag = (now - fire_time).total_seconds()
+        SCHEDULER_LAG_SECONDS.observe(max(0.0, job.last_lag), job=job.name)
+
+        # 次回は予定時刻を基準に計算し、大きく遅れた場合は現在時刻以降に進める
+        next_run = self.next_fire_time(job.cron, fire_time)
+        if next_run <= now:
+            next_run = self.next_fire_time(job.cron, now)
+        self._push(job, next_run)
+
+        if job.running:
+            if job.overlap == "queue":
+                job.queued = fire_time
+                log(f"前回の実行が終わってから実行します: {job.name}")
+                return
+            if job.overlap == "skip":
+                job.skipped += 1
+                job.last_status = "skipped"
+                SCHEDULER_RUNS.inc(job=job.name, status="skipped")
+                if self.store is not None:
+                    self.store.update(job.name, last_status="skipped")
+                log(f"前回の実行が終わっていないためスキップしました: {job.name}", "WARNING")
+                return
+            log(f"前回の実行を中断して実行します: {job.name}", "WARNING")
+            job.task.cancel()
+
+        job.task = asyncio.get_running_loop().create_task(self._invoke(job, fire_time))
+
+    def _record(self, job: ScheduledJob, status: str, duration: float):
+        job.last_status = status
+        SCHEDULER_RUNS.inc(job=job.name, status=status)
+        if self.store is not None:
+            self.store.update(job.name, last_status=status, last_duration=round(duration, 3),
+                              last_finished=datetime.now(self.timezone).isoformat())
+
+    async def _invoke(self, job: ScheduledJob, fire_time: Optional[datetime]):
+        while fire_time is not None:
+            job.last_run = fire_time
+            job.runs += 1
+            if self.store is not None:
+                # 実行開始時点で記録し、実行中に再起動しても二重実行しないようにする
+                self.store.update(job.name, last_run=fire_time.isoformat())
+            job_id = f"{job.name}@{fire_time.isoformat(timespec='minutes')}"
+            started = time.monotonic()
+            try:
+                with log_context(job_id=job_id), start_trace(f"job:{job.name}"):
+                    await job.callback(fire_time)
+            except asyncio.CancelledError:
+                self._record(job, "cancelled", time.monotonic() - started)
+                raise
+            except Exception as e:
+                log(f"スケジュールされたジョブでエラー: {job.name}: {e}", "ERROR", job_id=job_id)
+                self._record(job, "error", time.monotonic() - started)
+            else:
+                self._record(job, "ok", time.monotonic() - started)
+            fire_time, job.queued = job.queued, None
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            entry = self._peek()
+            if entry is None:
+                await self._wake.wait()
+                continue
+
+            delay = entry[0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=min(delay, self.max_sleep))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            job = self._jobs[entry[2]]
+            self._fire(job, job.next_run)
+
+    def start(self):
+        """スケジューラーを開始（イベントループ上で呼び出す）"""
+        if self._task is not None and not self._task.done():
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        """スケジューラーと実行中のジョブを停止"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for job in self._jobs.values():
+            if job.running:
+                job.task.cancel()
+        if self.store is not None:
+            self.store.save()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Process-wide service container shared by all cogs
+"""
+
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import router_automation
+from bot_config import BotConfig, ConfigWatcher
+from dns_manager import CloudflareDNSManager
+from domain_list_manager import DomainListManager
+from metrics import MetricsServer
+from router_http import create_router_driver
+from scheduler import CronScheduler, ScheduleStore
+from structured_log import configure_from_config
+from utils import log
+from worker_pool import BlockingWorkerPool, get_worker_pool
+
+class ServiceContainer:
+    """Botプロセス内で共有するサービスを遅延生成して保持するクラス
+
+    設定・DNSマネージャー（HTTPクライアント・レコードインデックス・
+    ドメインリストを含む）・ワーカープール・ルーター操作ドライバー・
+    スケジューラーをそれぞれ1つだけ生成し、全Cogで同じインスタンスを使う。
+    """
+
+    def __init__(self, config_file: str = "bot_config.json"):
+        self.config_file = config_file
+        self._services: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def _get(self, name: str, factory: Callable[[], Any]) -> Any:
+        service = self._services.get(name)
+        if service is None:
+            with self._lock:
+                service = self._services.get(name)
+                if service is None:
+                    service = factory()
+                    self._services[name] = service
+        return service
+
+    @property
+    def config(self) -> BotConfig:
+        return self._get("config", self._create_config)
+
+    @property
+    def dns_manager(self) -> CloudflareDNSManager:
+        return self._get("dns_manager", lambda: CloudflareDNSManager(self.config))
+
+    @property
+    def domain_manager(self) -> DomainListManager:
+        return self.dns_manager.domain_manager
+
+    @property
+    def workers(self) -> BlockingWorkerPool:
+        return self._get("workers", lambda: get_worker_pool(self.config.worker_threads))
+
+    @property
+    def router_driver(self):
+        return self._get("router_driver", self._create_router_driver)
+
+    @property
+    def scheduler(self) -> CronScheduler:
+        return self._get("scheduler", lambda: CronScheduler(store=ScheduleStore(self.config.schedule_state_path, self.workers)))
+
+    def _create_config(self) -> BotConfig:
+        config = BotConfig(self.config_file)
+        # ログの閾値・書式は設定の再読み込み時にも反映する
+        configure_from_config(config)
+        config.add_listener(lambda snapshot: configure_from_config(config))
+        return config
+
+    def start_config_watcher(self) -> Optional[ConfigWatcher]:
+        """設定ファイルの監視を開始（discord.config_watch_intervalが0なら無効）"""
+        interval = self.config.get('discord.config_watch_interval', 2)
+        if not interval:
+            return None
+        return self._get("config_watcher", lambda: ConfigWatcher(self.config, interval)).start()
+
+    def start_metrics_server(self) -> Optional[MetricsServer]:
+        """メトリクスのHTTPエンドポイントを開始（metrics.portが0なら無効）"""
+        port = self.config.get('metrics.port', 9108)
+        if not port:
+            return None
+        host = self.config.get('metrics.host', '127.0.0.1') or '127.0.0.1'
+        try:
+            return self._get("metrics_server", lambda: MetricsServer(host, int(port)).start())
+        except OSError as e:
+            log(f"メトリクスのエンドポイントを開始できません: {host}:{port}: {e}", "ERROR")
+            return None
+
+    def _create_router_driver(self):
+        config = self.config
+        connection = config.get_router_connection_config()
+        return create_router_driver(
+            config.router.driver,
+            connection.get("ip") or router_automation.ROUTER_IP,
+            connection.get("username") or router_automation.ROUTER_USER,
+            connection.get("password") or router_automation.ROUTER_PASS,
+            selenium_config=config.get_router_selenium_config(),
+            http_config=config.get_router_http_config()
+        )
+
+    def created(self, name: str) -> bool:
+        """サービスが生成済みか"""
+        return name in self._services
+
+    async def aclose(self):
+        """生成済みのサービスを停止（接続プール・ブラウザ・スレッド）"""
+        if self.created("config_watcher"):
+            self._services["config_watcher"].stop()
+        if self.created("metrics_server"):
+            self._services["metrics_server"].stop()
+        if self.created("scheduler"):
+            self.scheduler.stop()
+        if self.created("dns_manager"):
+            await self.dns_manager.aclose()
+        if self.created("router_driver"):
+            try:
+                await self.workers.run(self.router_driver.close)
+            except Exception as e:
+                log(f"ルーター操作ドライバーの終了でエラー: {e}", "WARNING")
+        if self.created("workers"):
+            self.workers.shutdown()
+        log("共有サービスを停止しました")
+
+# プロセス全体で共有するコンテナ
+_shared_services: Optional[ServiceContainer] = None
+_shared_lock = threading.Lock()
+
+def get_services() -> ServiceContainer:
+    """共有のServiceContainerを取得"""
+    global _shared_services
+    with _shared_lock:
+        if _shared_services is None:
+            _shared_services = ServiceContainer()
+        return _shared_services
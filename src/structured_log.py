@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Queue-backed leveled logging with context fields and a recent-entry ring buffer
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+LOGGER_NAME = "netops"
+
+LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "CRITICAL": logging.CRITICAL,
+}
+
+# 処理単位の付加情報（domain・record_id・job_id など）
+_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("log_context", default={})
+
+@contextmanager
+def log_context(**fields) -> Iterator[Dict[str, Any]]:
+    """with内で出力するログに付加情報を付ける（asyncioタスク・ワーカーにも引き継がれる）"""
+    merged = {**_context.get(), **{key: value for key, value in fields.items() if value is not None}}
+    token = _context.set(merged)
+    try:
+        yield merged
+    finally:
+        _context.reset(token)
+
+def current_context() -> Dict[str, Any]:
+    return dict(_context.get())
+
+def level_number(level: str) -> int:
+    """レベル名を数値に変換（不明な名前はINFO扱い）"""
+    return LEVELS.get(str(level).upper(), logging.INFO)
+
+class TextFormatter(logging.Formatter):
+    """従来の `[時刻] LEVEL: message` 形式に付加情報を key=value で続ける"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        timestamp = datetime.fromtimestamp(record.created).strftime("%Y-%m-%d %H:%M:%S")
+        line = f"[{timestamp}] {record.levelname}: {record.getMessage()}"
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+class JsonFormatter(logging.Formatter):
+    """1行1オブジェクトのJSON形式"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(entry_from_record(record), ensure_ascii=False, default=str)
+
+def entry_from_record(record: logging.LogRecord) -> Dict[str, Any]:
+    entry = {
+        "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+        "level": record.levelname,
+        "message": record.getMessage(),
+        "thread": record.threadName,
+    }
+    entry.update(getattr(record, "fields", None) or {})
+    if record.exc_info:
+        entry["exception"] = logging.Formatter().formatException(record.exc_info)
+    return entry
+
+class RingBufferHandler(logging.Handler):
+    """直近のログを固定長で保持するハンドラ（/logs で参照する）"""
+
+    def __init__(self, capacity: int = 500):
+        super().__init__()
+        self._entries = deque(maxlen=capacity)
+
+    @property
+    def capacity(self) -> int:
+        return self._entries.maxlen
+
+    def resize(self, capacity: int):
+        with self.lock:
+            if capacity != self._entries.maxlen:
+                self._entries = deque(self._entries, maxlen=capacity)
+
+    def emit(self, record: logging.LogRecord):
+        entry = entry_from_record(record)
+        entry["levelno"] = record.levelno
+        with self.lock:
+            self._entries.append(entry)
+
+    def recent(self, limit: int = 20, level: str = "DEBUG", contains: Optional[str] = None) -> List[Dict[str, Any]]:
+        """level以上のログを新しいものからlimit件（古い順で返す）"""
+        threshold = level_number(level)
+        with self.lock:
+            entries = list(self._entries)
+        matched = []
+        for entry in reversed(entries):
+            if entry["levelno"] < threshold:
+                continue
+            if contains and not any(contains in str(value) for value in entry.values()):
+                continue
+            matched.append(entry)
+            if len(matched) >= limit:
+                break
+        return list(reversed(matched))
+
+class LogManager:
+    """netopsロガーの出力先を管理するクラス
+
+    呼び出し側はQueueHandlerに積むだけで戻り、書式化と出力は
+    QueueListenerのスレッドが行う。閾値未満のログは log() の入口で
+    捨てるため、無効なDEBUGログはほぼコストがかからない。
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(LOGGER_NAME)
+        self.logger.propagate = False
+        self.ring = RingBufferHandler()
+        self.level = logging.INFO
+        self.format = "text"
+        self.use_queue = True
+        self._lock = threading.Lock()
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        self._stream_handler: Optional[logging.Handler] = None
+        self._configured = False
+
+    def configure(self, level: str = "INFO", fmt: str = "text", ring_size: int = 500,
+                  use_queue: bool = True, stream=None):
+        """閾値・書式・リングバッファの大きさを設定（再設定可）
+
+        出力先の構成が変わらない場合は閾値・書式・リングバッファをその場で
+        差し替え、キューのリスナーを止めない（再読み込みのたびに呼ばれるため）。
+        """
+        with self._lock:
+            new_level = level_number(level)
+            new_format = "json" if str(fmt).lower() == "json" else "text"
+            self.ring.resize(max(1, int(ring_size)))
+
+            running = self._listener is not None if use_queue else self._stream_handler is not None
+            if self._configured and stream is None and use_queue == self.use_queue and running:
+                if new_format != self.format:
+                    self._stream_handler.setFormatter(JsonFormatter() if new_format == "json" else TextFormatter())
+                    self.format = new_format
+                if new_level != self.level:
+                    self.level = new_level
+                    self.logger.setLevel(new_level)
+                return
+
+            self._stop_listener()
+            self.level = new_level
+            self.format = new_format
+            self.use_queue = use_queue
+
+            stream_handler = logging.StreamHandler(stream or sys.stdout)
+            stream_handler.setFormatter(JsonFormatter() if self.format == "json" else TextFormatter())
+            self._stream_handler = stream_handler
+
+            for handler in list(self.logger.handlers):
+                self.logger.removeHandler(handler)
+            if use_queue:
+                log_queue: queue.SimpleQueue = queue.SimpleQueue()
+                self.logger.addHandler(_RecordQueueHandler(log_queue))
+                self._listener = logging.handlers.QueueListener(log_queue, stream_handler, self.ring,
+                                                                respect_handler_level=False)
+                self._listener.start()
+            else:
+                self.logger.addHandler(stream_handler)
+                self.logger.addHandler(self.ring)
+            self.logger.setLevel(self.level)
+            self._configured = True
+
+    def ensure_configured(self):
+        if not self._configured:
+            self.configure()
+
+    def _stop_listener(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def flush(self):
+        """キューに溜まったログを出力し切る（終了時）"""
+        with self._lock:
+            self._stop_listener()
+            if self._configured and self.use_queue:
+                # 以降のログは直接出力する
+                for handler in list(self.logger.handlers):
+                    self.logger.removeHandler(handler)
+                self.logger.addHandler(self._stream_handler)
+                self.logger.addHandler(self.ring)
+
+class _RecordQueueHandler(logging.handlers.QueueHandler):
+    """レコードをそのままキューに積む（書式化はリスナー側で行う）"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # メッセージの引数は呼び出し時点で確定させる
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+_manager = LogManager()
+atexit.register(_manager.flush)
+
+def get_log_manager() -> LogManager:
+    return _manager
+
+def configure_logging(level: str = "INFO", fmt: str = "text", ring_size: int = 500, use_queue: bool = True):
+    _manager.configure(level, fmt, ring_size, use_queue)
+
+def configure_from_config(config, use_queue: bool = True):
+    """設定の logging セクション（level・format・ring_size）を反映"""
+    settings = config.logging
+    configure_logging(settings.level, settings.format, settings.ring_size, use_queue)
+
+def is_enabled(level: str) -> bool:
+    """levelのログが出力されるか（組み立てが高価なDEBUGメッセージの前に確認する）"""
+    return level_number(level) >= _manager.level
+
+def emit(message: str, level: str = "INFO", fields: Optional[Dict[str, Any]] = None, exc_info=None):
+    """付加情報付きでログを出力（閾値未満なら何もしない）"""
+    levelno = LEVELS.get(level) or level_number(level)
+    if levelno < _manager.level:
+        return
+    _manager.ensure_configured()
+    context = _context.get()
+    if fields:
+        context = {**context, **{key: value for key, value in fields.items() if value is not None}}
+    _manager.logger.log(levelno, message, extra={"fields": context}, exc_info=exc_info)
+
+def recent_entries(limit: int = 20, level: str = "DEBUG", contains: Optional[str] = None) -> List[Dict[str, Any]]:
+    return _manager.ring.recent(limit, level, contains)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Lightweight span tracing with a per-trace wall-time breakdown by category
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils import log
+
+# 1つのトレースに記録するスパンの上限（超えた分は件数のみ数える）
+MAX_SPANS = 2000
+
+class Span:
+    """名前付きの計測区間（名前の先頭 `.` までが内訳のカテゴリ）"""
+
+    __slots__ = ("name", "attrs", "depth", "started", "ended")
+
+    def __init__(self, name: str, depth: int, attrs: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.depth = depth
+        self.started = time.perf_counter()
+        self.ended: Optional[float] = None
+
+    @property
+    def category(self) -> str:
+        return self.name.split(".", 1)[0]
+
+    @property
+    def duration(self) -> float:
+        return (self.ended or time.perf_counter()) - self.started
+
+class Trace:
+    """1回の処理（スラッシュコマンド等）に属するスパンを集めるクラス
+
+    内訳は各時点で最も深いスパンのカテゴリに経過時間を割り当てて求める。
+    並列に実行されたスパンは重複して数えないため、内訳の合計は
+    トレース全体の経過時間と一致する（どのスパンにも含まれない時間は other）。
+    """
+
+    def __init__(self, name: str, attrs: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.started_at = datetime.now()
+        self.root = Span(name, 0)
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> bool:
+        with self._lock:
+            if len(self.spans) >= MAX_SPANS:
+                self.dropped += 1
+                return False
+            self.spans.append(span)
+            return True
+
+    @property
+    def duration(self) -> float:
+        return self.root.duration
+
+    def breakdown(self) -> List[Tuple[str, float, int]]:
+        """(カテゴリ, 経過時間, スパン数) を経過時間の長い順で返す"""
+        end = self.root.ended or time.perf_counter()
+        with self._lock:
+            spans = [span for span in self.spans if span.ended is not None]
+
+        counts: Dict[str, int] = {}
+        events: List[Tuple[float, int, int, Span]] = []
+        for i, span in enumerate(spans):
+            counts[span.category] = counts.get(span.category, 0) + 1
+            events.append((span.started, 1, i, span))
+            events.append((min(span.ended, end), 0, i, span))
+        events.sort(key=lambda event: (event[0], event[1]))
+
+        totals: Dict[str, float] = {}
+        active: Dict[int, Span] = {}
+        previous = self.root.started
+        for at, is_start, index, span in events:
+            if at > previous:
+                category = max(active.values(), key=lambda s: s.depth).category if active else "other"
+                totals[category] = totals.get(category, 0.0) + (at - previous)
+                previous = at
+            if is_start:
+                active[index] = span
+            else:
+                active.pop(index, None)
+        if end > previous:
+            totals["other"] = totals.get("other", 0.0) + (end - previous)
+
+        return sorted(((category, seconds, counts.get(category, 0)) for category, seconds in totals.items()),
+                      key=lambda item: item[1], reverse=True)
+
+    def summary(self) -> str:
+        """1行の要約（ログ・Discord出力用）"""
+        parts = []
+        for category, seconds, count in self.breakdown():
+            parts.append(f"{category} {seconds:.2f}s" + (f"×{count}" if count > 1 else ""))
+        return ", ".join(parts) + f" (合計 {self.duration:.2f}s)"
+
+    def slowest(self, limit: int = 5) -> List[Span]:
+        with self._lock:
+            spans = [span for span in self.spans if span.ended is not None]
+        return sorted(spans, key=lambda span: span.duration, reverse=True)[:limit]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "duration": round(self.duration, 3),
+            "breakdown": {category: round(seconds, 3) for category, seconds, _ in self.breakdown()},
+            "spans": len(self.spans),
+            "dropped": self.dropped,
+            **self.attrs,
+        }
+
+# 実行中のトレースと、その中の現在のスパン
+_current: contextvars.ContextVar[Optional[Tuple[Trace, Span]]] = contextvars.ContextVar("trace_span", default=None)
+
+# 完了したトレース（/debug traces で参照する）
+_recent: deque = deque(maxlen=50)
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Optional[Span]]:
+    """現在のトレースに子スパンを追加（トレース外では何もしない）"""
+    current = _current.get()
+    if current is None:
+        yield None
+        return
+    trace, parent = current
+    child = Span(name, parent.depth + 1, attrs)
+    if not trace.add(child):
+        yield None
+        return
+    token = _current.set((trace, child))
+    try:
+        yield child
+    finally:
+        child.ended = time.perf_counter()
+        _current.reset(token)
+
+def traced(name: str) -> Callable:
+    """関数全体をスパンで囲むデコレーター（同期・非同期の両方に対応）"""
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@contextmanager
+def start_trace(name: str, slow_threshold: Optional[float] = None, **attrs) -> Iterator[Trace]:
+    """トレースを開始し、終了時に内訳をログに出力して履歴に残す
+
+    slow_thresholdを指定した場合、それより速く終わったトレースはDEBUGで出力する。
+    """
+    trace = Trace(name, attrs)
+    token = _current.set((trace, trace.root))
+    try:
+        yield trace
+    finally:
+        trace.root.ended = time.perf_counter()
+        _current.reset(token)
+        _recent.append(trace)
+        level = "DEBUG" if slow_threshold is not None and trace.duration < slow_threshold else "INFO"
+        log(f"所要時間: {name}: {trace.summary()}", level)
+
+def current_trace() -> Optional[Trace]:
+    current = _current.get()
+    return current[0] if current is not None else None
+
+def recent_traces(limit: int = 10) -> List[Trace]:
+    """新しい順のトレース"""
+    return list(_recent)[-limit:][::-1]
@@ -5,26 +5,57 @@ Utility functions for Cloudflare DNS Manager
 
 import requests
 import json
+import os
 import re
-from datetime import datetime
+import tempfile
 from typing import Dict, List, Optional, Tuple
 
-def log(message: str, level: str = "INFO"):
-    """ログメッセージの出力"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(f"[{timestamp}] {level}: {message}")
+from structured_log import emit
 
-def get_current_ip(ip_services: List[str]) -> Optional[str]:
-    """現在のIPアドレスを取得"""
-    for service in ip_services:
+class CloudflareAPIError(Exception):
+    """Cloudflare APIリクエストの失敗"""
+
+def log(message: str, level: str = "INFO", **fields):
+    """ログメッセージの出力（キュー経由で非同期に書き出す、fieldsは付加情報）"""
+    emit(message, level, fields)
+
+def get_current_ip(ip_services: List[str], force_refresh: bool = False) -> Optional[str]:
+    """現在のIPアドレスを取得（共有リゾルバ経由、結果は短時間キャッシュ）"""
+    from ip_resolver import get_ip_resolver
+    return get_ip_resolver(ip_services).resolve(force_refresh)
+
+def atomic_write_json(path: str, data, indent: int = 2):
+    """JSONを一時ファイルに書いてfsyncし、os.replaceで置き換える（途中で落ちても元のファイルが残る）"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
         try:
-            response = requests.get(service, timeout=10)
-            ip = response.text.strip()
-            if re.match(r'^(\d{1,3}\.){3}\d{1,3}$', ip):
-                return ip
-        except:
-            continue
-    return None
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    # リネーム自体を永続化するためディレクトリもfsync
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
 
 def validate_ipv4(ip: str) -> bool:
     """IPv4アドレスの形式を検証"""
@@ -35,40 +66,107 @@ def validate_ipv4(ip: str) -> bool:
     parts = ip.split('.')
     return all(0 <= int(part) <= 255 for part in parts)
 
+def full_record_name(name: str, domain: str) -> str:
+    """サブドメイン名から完全なレコード名を構築"""
+    if name.endswith(domain):
+        return name
+    return f"{name}.{domain}" if name != "@" else domain
+
 # 共有HTTPセッション（接続プール）
 _session = requests.Session()
 
-def make_request(method: str, url: str, headers: dict, data: Optional[Dict] = None, timeout: int = 30, max_retries: int = 3) -> Tuple[bool, Dict]:
+def make_request(method: str, url: str, headers: dict, data: Optional[Dict] = None, timeout: int = 30, max_retries: int = 3,
+                 rate_limiter=None, retry_policy=None) -> Tuple[bool, Dict]:
     """
     HTTPリクエストの実行（接続プール使用、リトライ機能付き）
     
     Args:
-        method: HTTPメソッド (GET, POST, PUT, DELETE)
+        method: HTTPメソッド (GET, POST, PUT, PATCH, DELETE)
         url: リクエストURL
         headers: HTTPヘッダー
         data: リクエストデータ
         timeout: タイムアウト値
-        max_retries: 最大リトライ回数
+        max_retries: 最大リトライ回数（retry_policy未指定時）
+        rate_limiter: 送信前にトークンを取得するTokenBucket（429受信時は全体を停止）
+        retry_policy: バックオフ方針のRetryPolicy
         
     Returns:
         Tuple[成功フラグ, レスポンスデータ]
     """
     import time
+    from rate_limiter import parse_retry_after
+    from retry import RetryPolicy, get_circuit_breaker
+    from metrics import API_RATE_LIMITED, API_REQUEST_SECONDS, API_REQUESTS, API_RETRIES, endpoint_label
+    from tracing import span
+    
+    method = method.upper()
+    if method not in ("GET", "POST", "PUT", "PATCH", "DELETE"):
+        return False, {"error": f"Unsupported method: {method}"}
     
-    for attempt in range(max_retries + 1):
+    policy = retry_policy or RetryPolicy(max_retries)
+    breaker = get_circuit_breaker(url)
+    endpoint = endpoint_label(url)
+    
+    for attempt in range(policy.max_retries + 1):
+        # 障害中のホストには送らずに即座に失敗させる
+        if not breaker.allow():
+            return False, {"error": f"Circuit open for {breaker.name}", "circuit_open": True}
+        
         try:
-            if method.upper() == "GET":
-                response = _session.get(url, headers=headers, timeout=timeout)
-            elif method.upper() == "POST":
-                response = _session.post(url, headers=headers, json=data, timeout=timeout)
-            elif method.upper() == "PUT":
-                response = _session.put(url, headers=headers, json=data, timeout=timeout)
-            elif method.upper() == "DELETE":
-                response = _session.delete(url, headers=headers, timeout=timeout)
-            else:
-                return False, {"error": f"Unsupported method: {method}"}
+            if rate_limiter is not None:
+                with span("ratelimit.wait"):
+                    rate_limiter.acquire()
+            
+            started = time.perf_counter()
+            try:
+                with span("cloudflare.request", method=method, endpoint=endpoint):
+                    response = _session.request(
+                        method, url, headers=headers, timeout=timeout,
+                        json=data if method in ("POST", "PUT", "PATCH") else None
+                    )
+            finally:
+                API_REQUEST_SECONDS.observe(time.perf_counter() - started, method=method, endpoint=endpoint)
+            API_REQUESTS.inc(method=method, endpoint=endpoint, status=response.status_code)
+            
+            if response.status_code == 429:
+                API_RATE_LIMITED.inc(method=method, endpoint=endpoint)
+                breaker.record_success()
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if attempt < policy.max_retries:
+                    breaker.record_retry()
+                    API_RETRIES.inc(method=method, endpoint=endpoint, reason="rate_limited")
+                    if rate_limiter is not None:
+                        rate_limiter.pause(retry_after)
+                    else:
+                        log(f"レート制限に達しました。{retry_after:.0f}秒後にリトライ", "WARNING")
+                        with span("ratelimit.wait"):
+                            time.sleep(retry_after)
+                    continue
+                return False, {"error": "Rate limited (HTTP 429)", "status_code": 429, "retry_after": retry_after}
+            
+            if response.status_code >= 400:
+                status_code = response.status_code
+                if policy.is_retryable_status(status_code):
+                    breaker.record_failure(f"HTTP {status_code}")
+                    if attempt < policy.max_retries:
+                        breaker.record_retry()
+                        API_RETRIES.inc(method=method, endpoint=endpoint, reason="status")
+                        with span("cloudflare.backoff"):
+                            wait_time = policy.sleep(attempt)
+                        log(f"リクエスト失敗 (試行 {attempt + 1}/{policy.max_retries + 1}): HTTP {status_code}, {wait_time:.1f}秒後にリトライ", "WARNING")
+                        continue
+                else:
+                    # 4xxはリクエスト側の問題なのでリトライしない
+                    breaker.record_success()
+                try:
+                    result = response.json()
+                except ValueError:
+                    result = {}
+                result.setdefault("error", f"HTTP {status_code}: {result.get('errors') or response.reason}")
+                result["status_code"] = status_code
+                return False, result
             
-            response.raise_for_status()
+            breaker.record_success()
             result = response.json()
             
             if result.get("success", False):
@@ -76,15 +174,23 @@ def make_request(method: str, url: str, headers: dict, data: Optional[Dict] = No
             else:
                 return False, result
                 
+        except json.JSONDecodeError as e:
+            return False, {"error": f"JSON decode error: {str(e)}"}
         except requests.exceptions.RequestException as e:
-            if attempt < max_retries:
-                wait_time = 2 ** attempt  # 指数バックオフ
-                log(f"リクエスト失敗 (試行 {attempt + 1}/{max_retries + 1}): {str(e)}, {wait_time}秒後にリトライ", "WARNING")
-                time.sleep(wait_time)
+            API_REQUESTS.inc(method=method, endpoint=endpoint, status="error")
+            breaker.record_failure(str(e))
+            if attempt < policy.max_retries:
+                breaker.record_retry()
+                API_RETRIES.inc(method=method, endpoint=endpoint, reason="network")
+                with span("cloudflare.backoff"):
+                    wait_time = policy.sleep(attempt)
+                log(f"リクエスト失敗 (試行 {attempt + 1}/{policy.max_retries + 1}): {str(e)}, {wait_time:.1f}秒後にリトライ", "WARNING")
                 continue
             return False, {"error": str(e)}
-        except json.JSONDecodeError as e:
-            return False, {"error": f"JSON decode error: {str(e)}"}
+        except BaseException:
+            # 想定外の例外ではhalf_openの試行枠を解放してから伝える
+            breaker.release()
+            raise
 
 def format_record_table(records: List[Dict]) -> str:
     """DNSレコードをテーブル形式でフォーマット"""
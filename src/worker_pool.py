@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Bounded worker pool for running blocking calls from Discord handlers
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+class BlockingWorkerPool:
+    """専用スレッドプールでブロッキング処理を実行するクラス
+
+    Cogのasyncハンドラから同期処理（HTTP呼び出し・ファイル書き込み）を
+    ここ経由で実行し、イベントループ（ハートビート）を止めないようにする。
+    キュー待ち件数と待ち時間を記録し、飽和状態を確認できるようにする。
+    """
+
+    def __init__(self, max_workers: int = 8, name: str = "netops-worker"):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._max_wait = 0.0
+        self._recent_waits = deque(maxlen=200)
+
+    def _wrap(self, func: Callable, args: tuple, kwargs: dict) -> Callable[[], Any]:
+        submitted_at = time.monotonic()
+        with self._lock:
+            self._queued += 1
+
+        def call():
+            wait = time.monotonic() - submitted_at
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._recent_waits.append(wait)
+                self._max_wait = max(self._max_wait, wait)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+
+        return call
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """ブロッキング関数をワーカースレッドで実行して結果を待つ（ログの付加情報も引き継ぐ）"""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, context.run, self._wrap(func, args, kwargs))
+
+    async def iterate(self, iterator: Iterator) -> AsyncIterator:
+        """同期イテレータ（ページングするジェネレータ等）を1要素ずつワーカーで進める"""
+        sentinel = object()
+        while True:
+            item = await self.run(next, iterator, sentinel)
+            if item is sentinel:
+                return
+            yield item
+
+    def stats(self) -> Dict[str, Any]:
+        """キュー待ち件数・実行中件数・待ち時間を取得"""
+        with self._lock:
+            waits = sorted(self._recent_waits)
+            return {
+                "max_workers": self.max_workers,
+                "active": self._active,
+                "queued": self._queued,
+                "completed": self._completed,
+                "avg_wait": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                "p95_wait": round(waits[int(len(waits) * 0.95) - 1], 3) if waits else 0.0,
+                "max_wait": round(self._max_wait, 3),
+            }
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+# プロセス全体で共有するワーカープール
+_shared_pool: Optional[BlockingWorkerPool] = None
+_shared_lock = threading.Lock()
+
+def get_worker_pool(max_workers: Optional[int] = None) -> BlockingWorkerPool:
+    """共有のBlockingWorkerPoolを取得（初回呼び出し時のサイズで生成）"""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = BlockingWorkerPool(max_workers or 8)
+        return _shared_pool
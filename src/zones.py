@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Zone registry that routes record names to Cloudflare zones
+"""
+
+import json
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlencode
+
+from record_index import ZoneRecordIndex
+from utils import atomic_write_json, full_record_name, log
+
+class Zone:
+    """1つのCloudflareゾーン（ドメイン・Zone ID・レコードインデックス）"""
+
+    def __init__(self, domain: str, zone_id: Optional[str] = None, ttl: int = 300):
+        self.domain = domain.lower().rstrip('.')
+        self.zone_id = zone_id
+        self.record_index = ZoneRecordIndex(ttl)
+
+    @property
+    def dns_records_path(self) -> str:
+        return f"/zones/{self.zone_id}/dns_records"
+
+    def contains(self, full_name: str) -> bool:
+        """完全なレコード名がこのゾーンに属するか"""
+        return full_name == self.domain or full_name.endswith(f".{self.domain}")
+
+    def full_name(self, name: str) -> str:
+        return full_record_name(name, self.domain)
+
+    def relative_name(self, full_name: str) -> str:
+        """ゾーンからの相対名（ゾーン頂点は@）"""
+        if full_name == self.domain:
+            return "@"
+        if full_name.endswith(f".{self.domain}"):
+            return full_name[:-len(self.domain) - 1]
+        return full_name
+
+    def __repr__(self) -> str:
+        return f"Zone({self.domain!r}, {self.zone_id!r})"
+
+class ZoneRegistry:
+    """設定されたゾーンを保持し、レコード名を担当ゾーンに振り分けるクラス
+
+    完全なレコード名は末尾が最も長く一致するゾーンに、どのゾーンにも
+    一致しない名前は既定ゾーン（最初のゾーン）の相対名として扱う。
+    Zone IDが設定されていないゾーンは /zones?name= で調べ、結果を
+    キャッシュファイルに保存して次回以降は問い合わせない。
+    """
+
+    def __init__(self, zones: Sequence[Tuple[str, Optional[str]]], cache_path: Optional[str] = None, ttl: int = 300):
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._zones: List[Zone] = []
+        self.configure(zones, ttl)
+
+    @property
+    def default(self) -> Zone:
+        return self._zones[0]
+
+    @property
+    def zones(self) -> List[Zone]:
+        return list(self._zones)
+
+    def __iter__(self):
+        return iter(list(self._zones))
+
+    def __len__(self) -> int:
+        return len(self._zones)
+
+    def _load_cache(self) -> Dict[str, str]:
+        if not self.cache_path:
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get("zones", {})
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            log(f"ゾーンキャッシュを読み込めません: {self.cache_path}: {e}", "WARNING")
+            return {}
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        cache = self._load_cache()
+        cache.update({zone.domain: zone.zone_id for zone in self._zones if zone.zone_id})
+        try:
+            atomic_write_json(self.cache_path, {"zones": cache})
+        except OSError as e:
+            log(f"ゾーンキャッシュの保存に失敗しました: {e}", "ERROR")
+
+    def configure(self, zones: Sequence[Tuple[str, Optional[str]]], ttl: int = 300):
+        """設定のゾーン一覧を反映（ドメインとZone IDが変わらないゾーンはインデックスを引き継ぐ）"""
+        cache = self._load_cache()
+        existing = {zone.domain: zone for zone in self._zones}
+        configured = []
+        for domain, zone_id in zones or [("example.com", None)]:
+            domain = domain.lower().rstrip('.')
+            zone_id = zone_id or cache.get(domain)
+            zone = existing.get(domain)
+            if zone is None or (zone_id and zone.zone_id != zone_id):
+                zone = Zone(domain, zone_id, ttl)
+            zone.record_index.ttl = ttl
+            configured.append(zone)
+        with self._lock:
+            self._zones = configured
+
+    def zone_for(self, name: str) -> Zone:
+        """レコード名（完全名または既定ゾーンからの相対名）の担当ゾーン"""
+        name = name.lower().rstrip('.')
+        matched = [zone for zone in self._zones if zone.contains(name)]
+        if not matched:
+            return self.default
+        return max(matched, key=lambda zone: len(zone.domain))
+
+    def route(self, name: str) -> Tuple[Zone, str]:
+        """担当ゾーンと完全なレコード名"""
+        zone = self.zone_for(name)
+        return zone, zone.full_name(name.lower().rstrip('.'))
+
+    def full_name(self, name: str) -> str:
+        return self.route(name)[1]
+
+    def list_name(self, zone: Zone, full_name: str) -> str:
+        """ドメインリストに保存する名前（既定ゾーンは相対名、それ以外は完全名）"""
+        return zone.relative_name(full_name) if zone is self.default else full_name
+
+    def get(self, domain: str) -> Optional[Zone]:
+        domain = domain.lower().rstrip('.')
+        for zone in self._zones:
+            if zone.domain == domain:
+                return zone
+        return None
+
+    def group(self, names: Sequence[str]) -> Dict[Zone, List[str]]:
+        """名前を担当ゾーンごとにまとめる（入力順を保つ）"""
+        grouped: Dict[Zone, List[str]] = {}
+        for name in names:
+            grouped.setdefault(self.zone_for(name), []).append(name)
+        return grouped
+
+    @staticmethod
+    def discovery_endpoint(zone: Zone) -> str:
+        return f"/zones?{urlencode({'name': zone.domain})}"
+
+    def record_discovery(self, zone: Zone, success: bool, response: Dict) -> bool:
+        """/zones?name= の応答からZone IDを設定してキャッシュに保存"""
+        results = (response.get('result') or []) if success else []
+        if not results:
+            log(f"Zone IDを取得できませんでした: {zone.domain}: {response.get('error') or response.get('errors') or '該当なし'}", "ERROR")
+            return False
+        zone.zone_id = results[0]['id']
+        log(f"Zone IDを取得しました: {zone.domain} -> {zone.zone_id}")
+        self._save_cache()
+        return True